@@ -26,7 +26,7 @@ class ProjectParticipantAdmin(admin.ModelAdmin):
     list_filter = ['role']
 
 # Задачи и комментарии
-from .models import Task, Comment, FileAttachment
+from .models import Task, Comment, FileAttachment, FileBlob, UploadSession
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
@@ -41,4 +41,41 @@ class CommentAdmin(admin.ModelAdmin):
 
 @admin.register(FileAttachment)
 class FileAttachmentAdmin(admin.ModelAdmin):
-    list_display = ['id', 'uploaded_by', 'task', 'uploaded_at']
\ No newline at end of file
+    list_display = ['id', 'filename', 'uploaded_by', 'task', 'uploaded_at']
+    raw_id_fields = ['blob']
+
+@admin.register(FileBlob)
+class FileBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'size', 'created_at']
+    search_fields = ['sha256']
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'filename', 'uploaded_by', 'task', 'received', 'size', 'updated_at']
+
+# Очередь фоновых задач
+from django.utils import timezone
+
+from .jobs import queue_stats
+from .models import Job
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'priority', 'attempts', 'created_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'name']
+    search_fields = ['dedup_key']
+    readonly_fields = ['result', 'last_error', 'locked_by', 'locked_until', 'created_at', 'started_at', 'finished_at']
+    actions = ['retry']
+
+    def changelist_view(self, request, extra_context=None):
+        # Над списком — глубина очереди и задержки (ожидание и выполнение) за последний час
+        extra_context = {**(extra_context or {}), 'queue_stats': queue_stats()}
+        return super().changelist_view(request, extra_context)
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry(self, request, queryset):
+        count = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.QUEUED, run_after=timezone.now(), attempts=0, finished_at=None, locked_until=None,
+        )
+        self.message_user(request, f'Поставлено в очередь: {count}.')
+
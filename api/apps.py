@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import instrumentation, signals  # noqa: F401
+        instrumentation.install()
+        # Регистрация обработчиков фоновых задач (@job)
+        from . import deletion, jobs, uploads  # noqa: F401
@@ -0,0 +1,196 @@
+"""
+Асинхронные варианты API чтения задач и проектов для запуска под ASGI.
+
+Представления не оборачиваются в sync_to_async целиком: аутентификация,
+проверка членства и чтение идут через асинхронный ORM, вывод строится
+тем же планом, что и быстрый путь синхронных списков (api/fastpath.py).
+Запись по-прежнему выполняется через синхронные эндпоинты /api/.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.cache import parse_etags
+from django.views.decorators.http import require_GET
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.utils.urls import replace_query_param
+
+from . import events
+from .authentication import get_cached_credentials, remember_credentials
+from .fastpath import build_values_plan, render_values
+from .membership import aget_project_ids, ais_project_member
+from .models import Project, Task
+from .pagination import KeysetPagination, decode_cursor, encode_cursor, get_position, keyset_filter
+from .serializers import ProjectSerializer, TaskSerializer
+from .views import make_etag
+
+
+def _json(data, status=200, headers=None):
+    # Формат как у DRF JSONRenderer: без экранирования юникода и без пробелов
+    return JsonResponse(
+        data, status=status, safe=False, headers=headers,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')},
+    )
+
+
+async def authenticate(request):
+    """Пользователь по заголовку "Authorization: Token <key>" или по сессии."""
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    if keyword == 'Token' and key:
+        key = key.strip()
+        credentials = get_cached_credentials(key)
+        if credentials is not None:
+            return credentials[0]
+        try:
+            token = await Token.objects.select_related('user').aget(key=key)
+        except Token.DoesNotExist:
+            return None
+        if not token.user.is_active:
+            return None
+        remember_credentials(key, token.user, token)
+        return token.user
+
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def _get_plan(request, serializer_class):
+    serializer = serializer_class(context={'request': Request(request)})
+    if serializer.get_expand(serializer.context['request']):
+        return None
+    return build_values_plan(serializer)
+
+
+async def _list(request, serializer_class, queryset):
+    plan = _get_plan(request, serializer_class)
+    if plan is None:
+        return _json({'detail': 'Параметр expand поддерживается только синхронным API.'}, status=400)
+
+    pagination = KeysetPagination()
+    ordering = pagination.ordering
+    page_size = pagination.get_page_size(Request(request))
+
+    queryset = queryset.order_by(*ordering)
+    token = request.GET.get(pagination.cursor_query_param)
+    if token:
+        position = decode_cursor(token, ordering, queryset.model)
+        if position is None:
+            return _json({'detail': pagination.invalid_cursor_message}, status=404)
+        queryset = queryset.filter(keyset_filter(ordering, position))
+
+    columns = {column for _, column, _ in plan} | set(ordering)
+    rows = [row async for row in queryset.values(*columns)[:page_size + 1]]
+
+    next_link = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_link = replace_query_param(
+            request.build_absolute_uri(), pagination.cursor_query_param,
+            encode_cursor(get_position(rows[-1], ordering)),
+        )
+    return _json({'next': next_link, 'results': render_values(rows, plan)})
+
+
+async def _detail(request, serializer_class, queryset, pk, project_field):
+    plan = _get_plan(request, serializer_class)
+    if plan is None:
+        return _json({'detail': 'Параметр expand поддерживается только синхронным API.'}, status=400)
+
+    columns = {column for _, column, _ in plan} | {'pk', 'updated_at', project_field}
+    row = await queryset.filter(pk=pk).values(*columns).afirst()
+    if row is None:
+        return _json({'detail': 'Страница не найдена.'}, status=404)
+    if not await ais_project_member(request.user, row[project_field]):
+        return _json({'detail': 'У вас недостаточно прав для выполнения данного действия.'}, status=403)
+
+    etag = make_etag(queryset.model, row['pk'], row['updated_at'])
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in etags or '*' in etags:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    return _json(render_values([row], plan)[0], headers={'ETag': etag})
+
+
+def _auth_required(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request.user = await authenticate(request)
+        if request.user is None:
+            return _json({'detail': 'Учетные данные не были предоставлены.'}, status=401,
+                         headers={'WWW-Authenticate': 'Token'})
+        return await view(request, *args, **kwargs)
+    return require_GET(wrapper)
+
+
+@_auth_required
+async def task_list_view(request):
+    project_ids = await aget_project_ids(request.user)
+    return await _list(request, TaskSerializer, Task.objects.filter(project_id__in=project_ids))
+
+
+@_auth_required
+async def task_detail_view(request, pk):
+    return await _detail(request, TaskSerializer, Task.objects.all(), pk, 'project_id')
+
+
+@_auth_required
+async def project_list_view(request):
+    project_ids = await aget_project_ids(request.user)
+    return await _list(request, ProjectSerializer, Project.objects.filter(id__in=project_ids))
+
+
+@_auth_required
+async def project_detail_view(request, pk):
+    return await _detail(request, ProjectSerializer, Project.objects.all(), pk, 'pk')
+
+
+def _format_event(event):
+    lines = [] if event.id is None else [f'id: {event.id}']
+    lines.append(f'event: {event.type}')
+    lines.append('data: ' + json.dumps(event.data, ensure_ascii=False, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+@_auth_required
+async def project_events_view(request, pk):
+    """
+    Поток Server-Sent Events с изменениями задач и новыми комментариями проекта.
+
+    Продолжение после разрыва — по заголовку Last-Event-ID (его отправляет
+    EventSource) или параметру last_event_id. Раз в PROJECT_EVENTS_HEARTBEAT
+    секунд без событий уходит комментарий-пинг; заодно перепроверяется членство,
+    и поток закрывается, если пользователя исключили из проекта.
+    """
+    if not await ais_project_member(request.user, pk):
+        return _json({'detail': 'У вас недостаточно прав для выполнения данного действия.'}, status=403)
+
+    backend = events.get_backend()
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    if not last_event_id:
+        # Позиция фиксируется сразу: генератор потока запустится позже, и события
+        # между ответом и первым чтением иначе были бы потеряны
+        last_event_id = await sync_to_async(backend.current_id)(pk)
+    heartbeat = getattr(settings, 'PROJECT_EVENTS_HEARTBEAT', 15)
+    user = request.user
+
+    async def stream():
+        yield 'retry: 3000\n\n'
+        async for event in backend.subscribe(pk, last_event_id, timeout=heartbeat):
+            if event is None:
+                if not await ais_project_member(user, pk, refresh=True):
+                    return
+                yield ': ping\n\n'
+                continue
+            yield _format_event(event)
+            if event.type == events.RESET:
+                return
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,66 @@
+import copy
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+from .cache import LRUCache
+
+# Токен -> (пользователь, токен). Общий для всех потоков процесса
+token_cache = LRUCache(
+    maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    timeout=getattr(settings, 'TOKEN_CACHE_TIMEOUT', 30),
+)
+
+
+def get_cached_credentials(key):
+    """(пользователь, токен) из кэша или None. Пользователь — копия, см. remember_credentials()."""
+    cached = token_cache.get(key)
+    if cached is None:
+        return None
+    user, token = cached
+    # На объект пользователя в рамках запроса кладутся данные (кэш членства),
+    # поэтому каждый запрос получает свою копию
+    return copy.copy(user), token
+
+
+def remember_credentials(key, user, token):
+    token_cache.set(key, (copy.copy(user), token))
+
+
+def invalidate_token(*keys):
+    """Сбрасывает токены сразу и ещё раз после коммита, как invalidate_membership()."""
+    token_cache.delete(*keys)
+    transaction.on_commit(lambda: token_cache.delete(*keys))
+
+
+def invalidate_user_tokens(user_id):
+    def matches(key, value):
+        return value[0].pk == user_id
+
+    token_cache.delete_where(matches)
+    transaction.on_commit(lambda: token_cache.delete_where(matches))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к БД на каждый вызов API.
+
+    Пара токен -> пользователь хранится в token_cache (LRU с TTL).
+    Записи сбрасываются сигналами при удалении токена (выход из API),
+    сохранении пользователя (смена пароля, деактивация) и его удалении.
+
+    Сигналы сбрасывают кэш только своего процесса и не приходят при
+    QuerySet.update() (например, массовой деактивации). В этих случаях
+    токен продолжает приниматься до истечения TOKEN_CACHE_TIMEOUT, поэтому
+    таймаут держится коротким.
+    """
+
+    def authenticate_credentials(self, key):
+        credentials = get_cached_credentials(key)
+        if credentials is None:
+            # Неверный токен и неактивный пользователь не кэшируются: super() бросает AuthenticationFailed
+            user, token = super().authenticate_credentials(key)
+            remember_credentials(key, user, token)
+            credentials = user, token
+        return credentials
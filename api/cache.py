@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш в памяти процесса с временем жизни записей.
+
+    В отличие от кэшей Django значения не сериализуются: get() возвращает
+    тот же объект, что был передан в set(). Ведёт счётчики попаданий,
+    промахов и вытеснений (stats()).
+    """
+
+    def __init__(self, maxsize=1024, timeout=300):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires = entry
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Удаляет записи, для которых predicate(key, value) истинно."""
+        with self._lock:
+            stale = [key for key, (value, _) in self._data.items() if predicate(key, value)]
+            for key in stale:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / requests, 4) if requests else None,
+            }
@@ -0,0 +1,95 @@
+"""
+Удаление проектов без долгой блокировки записи.
+
+project.delete() собирает каскад по всем задачам, комментариям, файлам и
+участникам и удаляет их одной транзакцией: в SQLite всё это время
+остальные запросы на запись ждут. Вместо этого delete_project() только
+отмечает проект удалённым (Project.objects его больше не видит, доступ
+к нему пропадает сразу), а фоновая задача projects.purge удаляет дочерние
+строки порциями по PROJECT_PURGE_BATCH_SIZE. Каждая порция — отдельная
+короткая транзакция, между порциями блокировка записи освобождается.
+
+Порции удаляются обычным QuerySet.delete(), поэтому сигналы сбрасывают кэши
+и ставят в очередь удаление файлов, как при любом удалении. Журнал удалений
+и события по отдельным строкам не пишутся (without_deletion_log()).
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import events
+from .generations import bump_generation
+from .jobs import enqueue, job
+from .membership import invalidate_membership
+from .models import (
+    Comment, DeletedObject, FileAttachment, Project, ProjectEvent, ProjectParticipant, Task, UploadSession,
+)
+from .signals import without_deletion_log
+from .uploads import remove_session_files
+
+
+def delete_project(project):
+    """Отмечает проект удалённым и ставит в очередь удаление его содержимого."""
+    with transaction.atomic():
+        marked = Project.all_objects.filter(pk=project.pk, deleted_at__isnull=True).update(deleted_at=timezone.now())
+        if not marked:
+            return
+        user_ids = {project.creator_id, *project.participants.values_list('user_id', flat=True)}
+        # Записи для /api/sync/: клиенты участников удаляют проект целиком. Строки
+        # участников, задач и комментариев потом удаляются без отдельных записей в журнале
+        DeletedObject.objects.bulk_create([
+            DeletedObject(kind=DeletedObject.Kind.PROJECT, object_id=project.pk, project_id=project.pk, user_id=user_id)
+            for user_id in user_ids
+        ])
+        # update() не отправляет сигналов: кэши сбрасываем сами
+        invalidate_membership(*user_ids)
+        bump_generation(project.pk)
+        events.publish(project.pk, events.RESET, {})
+        enqueue('projects.purge', {'project_id': project.pk}, dedup_key=f'project-purge:{project.pk}', priority=-1)
+
+
+def batch_size():
+    return getattr(settings, 'PROJECT_PURGE_BATCH_SIZE', 500)
+
+
+def _delete_in_batches(queryset, before_delete=None):
+    """
+    Удаляет строки queryset порциями, каждую в своей транзакции. Зависимые
+    строки удаляются раньше явно, так что каскад внутри порции пуст.
+    """
+    deleted = 0
+    pause = getattr(settings, 'PROJECT_PURGE_PAUSE', 0.05)
+    while True:
+        with transaction.atomic(), without_deletion_log():
+            ids = list(queryset.order_by().values_list('pk', flat=True)[:batch_size()])
+            if not ids:
+                return deleted
+            batch = queryset.model._base_manager.filter(pk__in=ids)
+            if before_delete is not None:
+                before_delete(batch)
+            batch.delete()
+        deleted += len(ids)
+        # Даём дождавшимся писателям взять блокировку до следующей порции
+        time.sleep(pause)
+
+
+@job('projects.purge', timeout=60 * 60)
+def purge_project(project_id):
+    """Удаляет содержимое проекта, отмеченного delete_project(), и сам проект. Можно перезапускать."""
+    if not Project.all_objects.filter(pk=project_id, deleted_at__isnull=False).exists():
+        return None
+    counts = {
+        'upload_sessions': _delete_in_batches(
+            UploadSession.objects.filter(task__project_id=project_id), remove_session_files,
+        ),
+        'files': _delete_in_batches(FileAttachment.objects.filter(task__project_id=project_id)),
+        'comments': _delete_in_batches(Comment.objects.filter(task__project_id=project_id)),
+        'tasks': _delete_in_batches(Task.objects.filter(project_id=project_id)),
+        'participants': _delete_in_batches(ProjectParticipant.objects.filter(project_id=project_id)),
+        'events': _delete_in_batches(ProjectEvent.objects.filter(project_id=project_id)),
+    }
+    with without_deletion_log():
+        Project.all_objects.filter(pk=project_id).delete()
+    return counts
@@ -0,0 +1,181 @@
+"""
+Отдача файлов задач с проверкой доступа (FileDownloadView).
+
+Режим задаётся FILE_DOWNLOAD_MODE:
+
+- 'python' — FileResponse. WSGI-сервер с wsgi.file_wrapper (gunicorn, uWSGI)
+  передаёт файл через os.sendfile без копирования в Python, в том числе
+  для запросов Range: файл уже установлен на начало диапазона, а длину
+  задаёт Content-Length. Рабочий процесс всё же занят до конца передачи.
+  Под ASGI файл читается порциями ASGI_CHUNK_SIZE в пуле потоков
+  (exports.aiter_chunks): синхронный итератор Django прочитал бы его
+  в память целиком.
+- 'x-accel' — nginx: ответ с X-Accel-Redirect на internal-location
+  FILE_DOWNLOAD_ACCEL_PREFIX, которая смотрит в MEDIA_ROOT. Django только
+  проверяет доступ, передачу, Range и докачку берёт на себя nginx.
+- 'x-sendfile' — то же для Apache (mod_xsendfile) и lighttpd: X-Sendfile
+  с абсолютным путём файла.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from .exports import aiter_chunks, is_asgi
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Размер порции при отдаче файла под ASGI: каждая порция — переход в поток
+ASGI_CHUNK_SIZE = 256 * 1024
+
+
+def download_mode():
+    return getattr(settings, 'FILE_DOWNLOAD_MODE', 'python')
+
+
+class RangeFile:
+    """
+    Открытый файл, из которого можно прочитать не больше length байт с позиции start.
+
+    fileno() отдаётся как есть: wsgi.file_wrapper передаёт файл через sendfile
+    с текущей позиции и ровно Content-Length байт. Атрибута name нет, чтобы
+    FileResponse не подставил в Content-Length размер всего файла.
+    """
+
+    def __init__(self, raw, start, length):
+        raw.seek(start)
+        self.raw = raw
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.raw.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.raw.fileno()
+
+    def close(self):
+        self.raw.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) включительно для заголовка Range с одним диапазоном, None —
+    если заголовка нет или он не поддерживается (отдаётся весь файл),
+    False — если диапазон за пределами файла (416).
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        # bytes=-N — последние N байт
+        length = int(end)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def file_etag(attachment, stat):
+    # У содержимого из FileBlob ETag — его SHA-256; у старых файлов — размер и время изменения
+    if attachment.blob_id is not None:
+        return quote_etag(attachment.blob.sha256)
+    raw = f'{stat.st_size}-{stat.st_mtime_ns}'
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def _if_range_passes(request, etag, last_modified):
+    value = request.headers.get('If-Range')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag and not etag.startswith('W/')
+    since = parse_http_date_safe(value)
+    return since is not None and int(last_modified) <= since
+
+
+def serve_attachment(request, attachment, as_attachment=True):
+    """Ответ с файлом вложения с учётом Range, If-None-Match/If-Modified-Since и режима отдачи."""
+    storage = attachment.file.storage
+    try:
+        path = storage.path(attachment.file.name)
+    except NotImplementedError:
+        # Удалённое хранилище (S3 и т.п.): отдаёт само по своей ссылке
+        return HttpResponseRedirect(attachment.file.url)
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404
+    size = stat.st_size
+    etag = file_etag(attachment, stat)
+    last_modified = stat.st_mtime
+    filename = attachment.display_name
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    def finish(response):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        # Файлы доступны только участникам проекта: общие кэши их хранить не должны
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return finish(conditional)
+
+    mode = download_mode()
+    if mode in ('x-accel', 'x-sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if mode == 'x-accel':
+            prefix = getattr(settings, 'FILE_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix + quote(attachment.file.name)
+        else:
+            response['X-Sendfile'] = path
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+        return finish(response)
+
+    byte_range = None
+    if request.headers.get('Range') and _if_range_passes(request, etag, last_modified):
+        byte_range = parse_range(request.headers['Range'], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return finish(response)
+
+    raw = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(raw, as_attachment=as_attachment, filename=filename, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(raw, start, end - start + 1),
+            status=206, as_attachment=as_attachment, filename=filename, content_type=content_type,
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    if is_asgi(request):
+        # Заголовки уже выставлены FileResponse, файл закроется вместе с ответом
+        filelike = response.file_to_stream
+        response.streaming_content = aiter_chunks(
+            iter(lambda: filelike.read(ASGI_CHUNK_SIZE), b''), thread_sensitive=False,
+        )
+    return finish(response)
@@ -0,0 +1,221 @@
+"""
+События доски проекта для потока Server-Sent Events.
+
+Изменения задач и новые комментарии публикуются сигналами моделей после
+коммита транзакции. Доставку подписчикам выполняет бэкенд из настройки
+PROJECT_EVENTS_BACKEND:
+
+* LocalBackend — pub/sub в памяти процесса. Подходит для одного процесса
+  (runserver, uvicorn без --workers).
+* DatabaseBackend — журнал ProjectEvent в БД, который подписчики опрашивают.
+  Нужен, когда запросы обслуживают несколько рабочих процессов.
+
+Каждое событие имеет id; клиент, переподключившись с Last-Event-ID, получает
+пропущенные события. Если их уже нет в истории, приходит событие reset —
+клиенту нужно перезагрузить состояние целиком.
+"""
+import asyncio
+import itertools
+import threading
+import uuid
+from collections import defaultdict, deque, namedtuple
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import ProjectEvent
+from .serializers import CommentSerializer, TaskSerializer
+
+TASK_CREATED = 'task.created'
+TASK_UPDATED = 'task.updated'
+TASK_STATUS = 'task.status'
+TASK_DELETED = 'task.deleted'
+COMMENT_CREATED = 'comment.created'
+RESET = 'reset'
+
+Event = namedtuple('Event', ['id', 'type', 'data'])
+
+# reset не получает id: Last-Event-ID клиента остаётся прежним
+_RESET_EVENT = Event(None, RESET, {})
+
+
+class _Subscriber:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Вызывается в потоке цикла событий подписчика
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class LocalBackend:
+    """
+    Pub/sub в памяти процесса.
+
+    Для каждого проекта хранятся последние history_size событий. Id события —
+    "<метка запуска>-<номер>", поэтому после перезапуска процесса старые
+    Last-Event-ID распознаются и клиент получает reset.
+    """
+    history_size = 200
+    queue_size = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._boot = uuid.uuid4().hex[:8]
+        self._counter = itertools.count(1)
+        self._seq = 0
+        self._history = defaultdict(deque)
+        # Номер последнего вытесненного из истории события проекта
+        self._evicted = {}
+        self._subscribers = defaultdict(set)
+
+    def current_id(self, project_id):
+        return f'{self._boot}-{self._seq}'
+
+    def publish(self, project_id, event_type, data):
+        with self._lock:
+            self._seq = next(self._counter)
+            event = Event(f'{self._boot}-{self._seq}', event_type, data)
+            history = self._history[project_id]
+            history.append((self._seq, event))
+            if len(history) > self.history_size:
+                self._evicted[project_id] = history.popleft()[0]
+            subscribers = list(self._subscribers[project_id])
+
+        for subscriber in subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+
+    def _replay(self, project_id, last_event_id):
+        if not last_event_id:
+            return []
+        boot, _, seq = last_event_id.partition('-')
+        if boot != self._boot or not seq.isdigit():
+            return [_RESET_EVENT]
+        seq = int(seq)
+        if seq < self._evicted.get(project_id, 0):
+            return [_RESET_EVENT]
+        return [event for event_seq, event in self._history[project_id] if event_seq > seq]
+
+    async def subscribe(self, project_id, last_event_id=None, timeout=15):
+        """
+        Асинхронный генератор событий проекта, начиная после last_event_id.
+        Если за timeout секунд событий не было, выдаёт None.
+        """
+        subscriber = _Subscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            backlog = self._replay(project_id, last_event_id)
+            self._subscribers[project_id].add(subscriber)
+        try:
+            for event in backlog:
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if subscriber.overflowed:
+                    # Клиент не успевает читать: часть событий потеряна
+                    yield _RESET_EVENT
+                    return
+                yield event
+        finally:
+            with self._lock:
+                self._subscribers[project_id].discard(subscriber)
+
+
+class DatabaseBackend:
+    """
+    Журнал событий в таблице ProjectEvent, общий для всех процессов.
+
+    Подписчик опрашивает журнал раз в poll_interval секунд. Записи старше
+    retention удаляются при публикации (раз в prune_every событий), самая
+    новая запись сохраняется всегда — по ней видно, что история обрезана.
+    SQLite выполняет записи строго по очереди, поэтому id событий
+    фиксируются в порядке возрастания и опрос по id > last не теряет событий.
+    """
+    poll_interval = 1.0
+    retention = timedelta(hours=1)
+    prune_every = 500
+
+    def __init__(self):
+        self._published = itertools.count(1)
+
+    def current_id(self, project_id):
+        last = ProjectEvent.objects.filter(project_id=project_id).order_by('-id').values_list('id', flat=True).first()
+        return str(last or 0)
+
+    def publish(self, project_id, event_type, data):
+        event = ProjectEvent.objects.create(project_id=project_id, type=event_type, data=data)
+        if next(self._published) % self.prune_every == 0:
+            ProjectEvent.objects.filter(
+                created_at__lt=timezone.now() - self.retention, id__lt=event.pk,
+            ).delete()
+
+    async def subscribe(self, project_id, last_event_id=None, timeout=15):
+        if last_event_id and last_event_id.isdigit():
+            last_id = int(last_event_id)
+            oldest = await ProjectEvent.objects.order_by('id').values_list('id', flat=True).afirst()
+            if oldest is not None and last_id + 1 < oldest:
+                yield _RESET_EVENT
+                return
+        else:
+            last_id = await (
+                ProjectEvent.objects.filter(project_id=project_id).order_by('-id').values_list('id', flat=True).afirst()
+            ) or 0
+
+        idle = 0.0
+        while True:
+            events = [
+                event async for event in ProjectEvent.objects.filter(project_id=project_id, id__gt=last_id)
+                .order_by('id').only('id', 'type', 'data')[:100]
+            ]
+            for event in events:
+                last_id = event.pk
+                yield Event(str(event.pk), event.type, event.data)
+            if events:
+                idle = 0.0
+                continue
+            if idle >= timeout:
+                idle = 0.0
+                yield None
+            await asyncio.sleep(self.poll_interval)
+            idle += self.poll_interval
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(getattr(settings, 'PROJECT_EVENTS_BACKEND', 'api.events.LocalBackend'))()
+
+
+def publish(project_id, event_type, data):
+    """Публикует событие после коммита текущей транзакции; ошибки доставки не ломают запрос."""
+    transaction.on_commit(lambda: get_backend().publish(project_id, event_type, data), robust=True)
+
+
+def publish_task(task, created=False):
+    """Событие создания или изменения задачи; смена статуса — отдельный тип task.status."""
+    data = TaskSerializer(task).data
+    previous_status = getattr(task, '_loaded_status', None)
+    if created:
+        event_type = TASK_CREATED
+    elif previous_status is not None and previous_status != task.status:
+        event_type = TASK_STATUS
+        data['previous_status'] = previous_status
+    else:
+        event_type = TASK_UPDATED
+    task._loaded_status = task.status
+    publish(task.project_id, event_type, dict(data))
+
+
+def publish_comment(comment):
+    publish(comment.task.project_id, COMMENT_CREATED, dict(CommentSerializer(comment).data))
@@ -0,0 +1,135 @@
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+from .models import Task, Comment, FileAttachment
+
+# Размер порции при чтении из БД и при отправке клиенту
+CHUNK_SIZE = 2000
+
+# Колонки выгрузки: (заголовок, поле для values_list)
+EXPORT_COLUMNS = {
+    'tasks': [
+        ('id', 'id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('status', 'status'),
+        ('assignee', 'assignee__username'),
+        ('due_date', 'due_date'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ],
+    'comments': [
+        ('id', 'id'),
+        ('task', 'task_id'),
+        ('author', 'author__username'),
+        ('content', 'content'),
+        ('created_at', 'created_at'),
+    ],
+    'files': [
+        ('id', 'id'),
+        ('task', 'task_id'),
+        ('file', 'file'),
+        ('uploaded_by', 'uploaded_by__username'),
+        ('uploaded_at', 'uploaded_at'),
+    ],
+}
+
+
+def get_export_queryset(project, kind):
+    """Queryset выгрузки: связи подтягиваются JOIN-ом, строки читаются порциями."""
+    if kind == 'tasks':
+        queryset = Task.objects.filter(project=project)
+    elif kind == 'comments':
+        queryset = Comment.objects.filter(task__project=project)
+    else:
+        queryset = FileAttachment.objects.filter(task__project=project)
+
+    fields = [field for _, field in EXPORT_COLUMNS[kind]]
+    return queryset.order_by('id').values_list(*fields).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _json_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _csv_value(value):
+    return '' if value is None else _json_value(value)
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(project, kind):
+    """Строки CSV одного вида объектов, сгруппированные по CHUNK_SIZE."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS[kind]])
+
+    lines = []
+    for row in get_export_queryset(project, kind):
+        lines.append(writer.writerow([_csv_value(value) for value in row]))
+        if len(lines) >= CHUNK_SIZE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def stream_ndjson(project, kinds=('tasks', 'comments', 'files')):
+    """По одному JSON-объекту на строку; вид объекта — в поле type."""
+    for kind in kinds:
+        headers = [header for header, _ in EXPORT_COLUMNS[kind]]
+        record_type = kind[:-1]
+
+        lines = []
+        for row in get_export_queryset(project, kind):
+            record = {'type': record_type}
+            record.update(zip(headers, map(_json_value, row)))
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+            if len(lines) >= CHUNK_SIZE:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+
+_DONE = object()
+
+
+async def aiter_chunks(chunks, thread_sensitive=True):
+    """
+    Асинхронный итератор по порциям синхронного генератора. Каждая порция
+    читается отдельным sync_to_async в одном потоке с открытым курсором БД.
+    Чтению файла общий поток не нужен: для него thread_sensitive=False.
+    """
+    chunks = iter(chunks)
+    step = sync_to_async(next, thread_sensitive=thread_sensitive)
+    try:
+        while (chunk := await step(chunks, _DONE)) is not _DONE:
+            yield chunk
+    finally:
+        # Клиент мог отключиться посреди выгрузки: закрываем курсор в его потоке
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close, thread_sensitive=thread_sensitive)()
+
+
+def is_asgi(request):
+    """Запрос (Django или DRF) пришёл через ASGI-обработчик."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+def streaming_content(request, chunks):
+    """
+    Тело StreamingHttpResponse для выгрузки. Синхронный итератор под ASGI
+    Django сначала читает целиком в список, и выгрузка держала бы в памяти
+    весь проект, поэтому под ASGI отдаётся асинхронный итератор.
+    """
+    if is_asgi(request):
+        return aiter_chunks(chunks)
+    return chunks
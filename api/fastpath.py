@@ -0,0 +1,60 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import PrimaryKeyRelatedField
+
+from .instrumentation import timed_function
+
+# Поля, для которых значение из БД уже совпадает с выводом сериализатора
+_PASSTHROUGH_FIELDS = (serializers.IntegerField, serializers.CharField)
+
+
+def _identity(value):
+    return value
+
+
+def build_values_plan(serializer):
+    """
+    План чтения для сериализатора модели: список (поле вывода, колонка .values(),
+    конвертер). Конвертеры — это to_representation полей самого сериализатора,
+    поэтому вывод совпадает с обычным путём. Возвращает None, если какое-то поле
+    нельзя получить из .values() (вложенный сериализатор, метод, свойство).
+    """
+    model = serializer.Meta.model
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.BaseSerializer) or '.' in field.source or field.source == '*':
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete:
+            return None
+
+        if isinstance(field, PrimaryKeyRelatedField):
+            # .values('fk') возвращает id связанного объекта — как и pk-only оптимизация DRF
+            if field.pk_field is not None:
+                return None
+            converter = _identity
+        elif type(field) in _PASSTHROUGH_FIELDS:
+            converter = _identity
+        elif isinstance(field, serializers.RelatedField):
+            return None
+        else:
+            converter = field.to_representation
+        plan.append((name, field.source, converter))
+    return plan
+
+
+@timed_function('ser')
+def render_values(rows, plan):
+    """Преобразует строки .values() в словари вывода по плану build_values_plan()."""
+    return [
+        {
+            name: None if (value := row[column]) is None else converter(value)
+            for name, column, converter in plan
+        }
+        for row in rows
+    ]
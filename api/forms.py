@@ -1,7 +1,27 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.urls import reverse
 from .models import CustomUser, Project, Task, Comment, FileAttachment, ProjectParticipant
 
+class UserAutocompleteWidget(forms.Widget):
+    """
+    Выбор пользователя с подсказками из /api/users/autocomplete/.
+    В отличие от <select>, не выводит список всех пользователей в страницу.
+    """
+    template_name = 'api/widgets/user_autocomplete.html'
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['url'] = self.url
+        # После ошибки валидации показываем имя уже выбранного пользователя
+        if value and str(value).isdigit():
+            context['widget']['label'] = CustomUser.objects.filter(pk=value).values_list('username', flat=True).first()
+        return context
+
 class BootstrapAuthenticationForm(AuthenticationForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -37,6 +57,10 @@ class ProjectForm(forms.ModelForm):
         self.fields['end_date'].input_formats = ['%Y-%m-%d']
 
 class TaskForm(forms.ModelForm):
+    # Версия задачи на момент открытия формы — защита от затирания параллельных правок
+    version = forms.CharField(widget=forms.HiddenInput, required=False)
+    version_conflict_message = 'Задачу уже изменил другой пользователь. Обновите страницу и повторите правку.'
+
     class Meta:
         model = Task
         fields = ['title', 'description', 'status', 'due_date', 'assignee']
@@ -58,6 +82,35 @@ class TaskForm(forms.ModelForm):
         if user and project and user != project.creator:
             self.fields.pop('assignee')
 
+        if self.instance.pk:
+            self.fields['version'].initial = self.instance.updated_at.isoformat()
+        else:
+            self.fields.pop('version')
+
+    def clean_version(self):
+        version = self.cleaned_data.get('version')
+        if self.instance.pk and version and version != self.instance.updated_at.isoformat():
+            raise forms.ValidationError(self.version_conflict_message)
+        return version
+
+    def check_version(self):
+        """
+        Сверяет версию со строкой в БД под блокировкой; вызывается в транзакции
+        перед save(). clean_version() сравнивает с задачей, прочитанной до
+        транзакции, и параллельная правка между ними иначе была бы затёрта.
+        """
+        version = self.cleaned_data.get('version')
+        if not self.instance.pk or not version:
+            return True
+        current = (
+            Task.objects.select_for_update().filter(pk=self.instance.pk)
+            .values_list('updated_at', flat=True).first()
+        )
+        if current is not None and current.isoformat() == version:
+            return True
+        self.add_error('version', self.version_conflict_message)
+        return False
+
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
@@ -93,10 +146,13 @@ class AddParticipantForm(forms.ModelForm):
         project = kwargs.pop('project', None)  # получаем проект из представления
         super().__init__(*args, **kwargs)
 
+        url = reverse('api-user-autocomplete')
         if project:
-            # Исключаем уже добавленных участников
+            # Исключаем уже добавленных участников (queryset нужен только для проверки выбора)
             existing_ids = project.participants.values_list('user_id', flat=True)
             self.fields['user'].queryset = CustomUser.objects.exclude(id__in=existing_ids)
+            url = f'{url}?project={project.pk}'
+        self.fields['user'].widget = UserAutocompleteWidget(url)
 
         # Красота для Bootstrap
         for field in self.fields.values():
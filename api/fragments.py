@@ -0,0 +1,86 @@
+"""
+Кэш HTML-фрагментов страниц проекта, задачи и дашборда.
+
+Ключ фрагмента включает поколения показанных в нём проектов
+(api/generations.py), поэтому при любом изменении проекта, его задач,
+комментариев, файлов или участников фрагмент просто перестаёт совпадать
+по ключу. Используется через тег {% fragment %} (api/templatetags/fragments.py).
+
+Фрагменты общие для всех пользователей, у которых совпадают vary-значения,
+поэтому всё, что зависит от пользователя (кнопки, формы, csrf-токен),
+рендерится вне кэшируемых блоков.
+"""
+import hashlib
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .generations import generation_key
+
+
+def _cache():
+    return caches[getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'default')]
+
+
+def default_timeout():
+    return getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600)
+
+
+class FragmentStats:
+    """Счётчики попаданий и промахов по именам фрагментов в текущем процессе."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def record(self, name, hit):
+        with self._lock:
+            (self.hits if hit else self.misses)[name] += 1
+
+    def reset(self):
+        with self._lock:
+            self.hits.clear()
+            self.misses.clear()
+
+    def stats(self):
+        with self._lock:
+            fragments = {
+                name: _summary(self.hits[name], self.misses[name])
+                for name in sorted(self.hits.keys() | self.misses.keys())
+            }
+            total = _summary(sum(self.hits.values()), sum(self.misses.values()))
+        return {**total, 'fragments': fragments}
+
+
+def _summary(hits, misses):
+    requests = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / requests, 4) if requests else None,
+    }
+
+
+fragment_stats = FragmentStats()
+
+
+def fragment_key(name, project_ids, vary=()):
+    """Ключ фрагмента: имя, поколения проектов и прочие значения, от которых зависит HTML."""
+    raw = '\x1f'.join(str(value) for value in vary)
+    vary_hash = hashlib.md5(raw.encode()).hexdigest()
+    return f'fragment:{name}:{generation_key(project_ids)}:{vary_hash}'
+
+
+def get_fragment(name, project_ids, vary=()):
+    """(ключ, HTML или None). Попадание или промах учитывается в fragment_stats."""
+    key = fragment_key(name, project_ids, vary)
+    content = _cache().get(key)
+    fragment_stats.record(name, hit=content is not None)
+    return key, content
+
+
+def set_fragment(key, content, timeout=None):
+    _cache().set(key, content, default_timeout() if timeout is None else timeout)
@@ -0,0 +1,65 @@
+"""
+Счётчики поколений проектов для инвалидации закэшированных фрагментов.
+
+Любое изменение проекта, его задач или участников увеличивает поколение
+проекта. Ключ фрагмента строится из поколений всех проектов, которые он
+показывает, поэтому устаревший фрагмент просто перестаёт запрашиваться
+и вытесняется кэшем сам.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    return caches[getattr(settings, 'GENERATION_CACHE_ALIAS', 'default')]
+
+
+def _key(project_id):
+    return f'project-gen:{project_id}'
+
+
+def _initial():
+    # Счётчик, вытесненный из кэша, начинается заново с нового значения,
+    # а не с нуля — иначе ключ мог бы совпасть с ключом старого фрагмента
+    return time.time_ns()
+
+
+def _bump(keys):
+    cache = _cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+
+
+def bump_generation(*project_ids):
+    """Увеличивает поколение проектов сразу и ещё раз после коммита транзакции."""
+    keys = [_key(project_id) for project_id in set(project_ids) if project_id is not None]
+    if keys:
+        _bump(keys)
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def get_generations(project_ids):
+    """{project_id: поколение} одним обращением к кэшу."""
+    cache = _cache()
+    keys = {_key(project_id): project_id for project_id in project_ids}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        value = _initial()
+        cache.add(key, value, None)
+        # add() не перезаписывает значение, появившееся из параллельного запроса
+        found[key] = cache.get(key, value)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def generation_key(project_ids):
+    """Короткий ключ, который меняется при изменении любого из проектов или их набора."""
+    generations = get_generations(project_ids)
+    raw = ','.join(f'{project_id}:{generations[project_id]}' for project_id in sorted(generations))
+    return hashlib.md5(raw.encode()).hexdigest()
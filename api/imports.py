@@ -0,0 +1,180 @@
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+
+from . import events
+from .generations import bump_generation
+from .membership import invalidate_membership
+from .models import CustomUser, ProjectParticipant, Task
+from .serializers import TaskBulkItemSerializer
+
+IMPORT_KINDS = ('tasks', 'participants')
+IMPORT_FORMATS = ('csv', 'jsonl')
+BATCH_SIZE = 1000
+
+
+def detect_format(filename):
+    """Формат файла по расширению: .csv или .jsonl/.ndjson."""
+    name = filename.lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+def read_rows(fileobj, file_format):
+    """
+    Построчно читает бинарный файл и выдаёт пары (номер строки, dict).
+    Строку, которую не удалось разобрать, выдаёт с ошибкой вместо словаря.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        # Первая строка — заголовок, данные начинаются со второй
+        for line_no, row in enumerate(csv.DictReader(text), start=2):
+            yield line_no, {key: value for key, value in row.items() if key and value not in ('', None)}
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, ValueError('Некорректный JSON.')
+            continue
+        yield line_no, row if isinstance(row, dict) else ValueError('Ожидался JSON-объект.')
+
+
+def _text_field(row, key, report, line_no):
+    """
+    Значение строкового поля строки или None, если поля нет.
+    В JSONL значением может оказаться список или объект — такая строка
+    попадает в отчёт об ошибках, а вместо значения возвращается False.
+    """
+    value = row.get(key)
+    if value is None or isinstance(value, str):
+        return value
+    report['errors'].append({'row': line_no, 'errors': {key: ['Ожидалась строка.']}})
+    return False
+
+
+def _resolve_usernames(names):
+    """Одним запросом сопоставляет имена пользователей с их id."""
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    return dict(CustomUser.objects.filter(username__in=names).values_list('username', 'id'))
+
+
+def _import_tasks(project, chunk, report, member_ids):
+    assignees = []
+    for line_no, row in chunk:
+        username = _text_field(row, 'assignee', report, line_no)
+        if username is not False:
+            assignees.append((line_no, row, username))
+    users = _resolve_usernames(username for _, _, username in assignees)
+    # Один экземпляр сериализатора на порцию: поля ModelSerializer строятся один раз
+    validator = TaskBulkItemSerializer()
+
+    tasks = []
+    for line_no, row, username in assignees:
+        assignee_id = users.get(username) if username else None
+        if username and assignee_id is None:
+            report['errors'].append({'row': line_no, 'errors': {'assignee': ['Пользователь не найден.']}})
+            continue
+        if assignee_id is not None and assignee_id not in member_ids:
+            report['errors'].append(
+                {'row': line_no, 'errors': {'assignee': ['Назначенный пользователь не состоит в проекте.']}}
+            )
+            continue
+
+        data = {key: row[key] for key in ('title', 'description', 'status', 'due_date') if key in row}
+        try:
+            validated = validator.run_validation({**data, 'project': project.pk, 'assignee': assignee_id})
+        except serializers.ValidationError as exc:
+            report['errors'].append({'row': line_no, 'errors': exc.detail})
+            continue
+        tasks.append(Task(**validated))
+
+    Task.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+    report['created'] += len(tasks)
+
+
+def _import_participants(project, chunk, report, member_ids):
+    rows = []
+    for line_no, row in chunk:
+        username = _text_field(row, 'username', report, line_no)
+        role = _text_field(row, 'role', report, line_no)
+        if username is not False and role is not False:
+            rows.append((line_no, username, role or ProjectParticipant.Role.STUDENT))
+    users = _resolve_usernames(username for _, username, _ in rows)
+    roles = set(ProjectParticipant.Role.values)
+
+    # Участников, добавленных после начала импорта, перечитываем внутри транзакции порции
+    member_ids.update(
+        project.participants.filter(user_id__in=users.values()).values_list('user_id', flat=True)
+    )
+
+    participants = []
+    for line_no, username, role in rows:
+        user_id = users.get(username)
+        if user_id is None:
+            report['errors'].append({'row': line_no, 'errors': {'username': ['Пользователь не найден.']}})
+        elif role not in roles:
+            report['errors'].append({'row': line_no, 'errors': {'role': ['Неизвестная роль.']}})
+        elif user_id in member_ids:
+            report['skipped'] += 1
+        else:
+            member_ids.add(user_id)
+            participants.append(ProjectParticipant(project=project, user_id=user_id, role=role))
+
+    # ignore_conflicts страхует от гонки с параллельным добавлением (unique_together):
+    # на SQLite транзакция порции IMMEDIATE, и конфликт здесь уже невозможен
+    ProjectParticipant.objects.bulk_create(participants, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    # bulk_create не отправляет сигналы — сбрасываем кэш членства сами
+    invalidate_membership(*(participant.user_id for participant in participants))
+    report['created'] += len(participants)
+
+
+def import_rows(project, rows, kind, batch_size=BATCH_SIZE):
+    """
+    Импортирует задачи или участников проекта из потока строк read_rows().
+
+    Строки обрабатываются порциями по batch_size: имена пользователей
+    разрешаются одним запросом на порцию, вставка — bulk_create, каждая
+    порция в своей транзакции. Возвращает отчёт с ошибками по строкам.
+    """
+    report = {'created': 0, 'skipped': 0, 'errors': []}
+    import_chunk = _import_tasks if kind == 'tasks' else _import_participants
+    member_ids = set(project.participants.values_list('user_id', flat=True))
+
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            break
+
+        valid = []
+        for line_no, row in chunk:
+            if isinstance(row, Exception):
+                report['errors'].append({'row': line_no, 'errors': {'non_field_errors': [str(row)]}})
+            else:
+                valid.append((line_no, row))
+
+        with transaction.atomic():
+            import_chunk(project, valid, report, member_ids)
+
+    if report['created']:
+        # bulk_create не отправляет сигналы
+        bump_generation(project.pk)
+    if kind == 'tasks' and report['created']:
+        # Поштучные события для тысяч задач бесполезны: просим клиентов перечитать доску
+        events.publish(project.pk, events.RESET, {})
+
+    report['errors'].sort(key=lambda error: error['row'])
+    return report
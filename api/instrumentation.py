@@ -0,0 +1,269 @@
+"""
+Стоимость запроса: число SQL-запросов, время БД, шаблонов и сериализаторов.
+
+RequestTimingMiddleware заводит на время запроса RequestMetrics в contextvar,
+а точки замера дописывают в неё:
+
+- БД — execute_wrapper, который ставится на каждое новое соединение
+  (сигнал connection_created) и ничего не делает вне запроса;
+- шаблоны — бэкенд TimedDjangoTemplates;
+- сериализаторы — TimedSerializerMixin (api/serializers.py) и fastpath.render_values.
+
+Время шаблонов и сериализаторов считается без запросов к БД внутри них
+(ленивые QuerySet выполняются как раз там), поэтому слагаемые не пересекаются.
+
+Итог уходит строкой JSON в лог api.requests и в агрегаты /metrics
+(api/metrics.py). Заголовок Server-Timing виден браузеру, поэтому он
+отправляется только при DEBUG или сотрудникам (is_staff).
+Запрос, превысивший REQUEST_QUERY_BUDGET или REQUEST_TIME_BUDGET,
+пишется с уровнем WARNING вместе с самыми частыми и самыми медленными SQL.
+
+Накладные расходы — два вызова perf_counter и обновление словаря на SQL-запрос;
+текст SQL хранится по одному экземпляру на различающийся запрос.
+"""
+import heapq
+import json
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import registry
+
+logger = logging.getLogger('api.requests')
+
+_current = ContextVar('request_metrics', default=None)
+
+# Сколько SQL показывать в записи о превышении бюджета и сколько различных хранить
+REPORTED_QUERIES = 5
+MAX_DISTINCT_QUERIES = 200
+
+# Метрики Server-Timing и их описания (значения заголовков — только ASCII)
+TIMINGS = (('db', 'Database'), ('tpl', 'Templates'), ('ser', 'Serializers'))
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'timings', 'statements', 'slowest', 'active')
+
+    def __init__(self):
+        self.queries = 0
+        self.timings = dict.fromkeys([name for name, _ in TIMINGS], 0.0)
+        # SQL -> [число выполнений, суммарное время]
+        self.statements = {}
+        # Куча (время, SQL) самых медленных выполнений
+        self.slowest = []
+        self.active = set()
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.timings['db'] += duration
+        stats = self.statements.get(sql)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += duration
+        elif len(self.statements) < MAX_DISTINCT_QUERIES:
+            self.statements[sql] = [1, duration]
+        if len(self.slowest) < REPORTED_QUERIES:
+            heapq.heappush(self.slowest, (duration, sql))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, sql))
+
+    def repeated(self):
+        top = heapq.nlargest(REPORTED_QUERIES, self.statements.items(), key=lambda item: item[1][0])
+        return [
+            {'sql': sql, 'count': count, 'ms': _ms(total)}
+            for sql, (count, total) in top if count > 1
+        ]
+
+
+def current():
+    """RequestMetrics текущего запроса или None вне RequestTimingMiddleware."""
+    return _current.get()
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+@contextmanager
+def timed(name):
+    """Добавляет время блока к метрике name без времени запросов к БД внутри блока."""
+    metrics = _current.get()
+    # Вложенные замеры той же метрики (шаблон внутри шаблона) не считаются дважды
+    if metrics is None or name in metrics.active:
+        yield
+        return
+    metrics.active.add(name)
+    db_before = metrics.timings['db']
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = perf_counter() - start - (metrics.timings['db'] - db_before)
+        metrics.timings[name] += elapsed
+        metrics.active.discard(name)
+
+
+def timed_function(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# БД
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, perf_counter() - start)
+
+
+def _attach_recorder(sender, connection, **kwargs):
+    # connection_created приходит при каждом переподключении того же DatabaseWrapper
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+# Шаблоны
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('tpl'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, который замеряет время отрисовки (TEMPLATES['BACKEND'])."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def install():
+    """Подключает замеры БД. Вызывается из ApiConfig.ready()."""
+    connection_created.connect(_attach_recorder, dispatch_uid='api.instrumentation')
+
+
+# Middleware
+
+def _budgets(url_name):
+    overrides = getattr(settings, 'REQUEST_BUDGET_OVERRIDES', {}).get(url_name, {})
+    return (
+        overrides.get('queries', getattr(settings, 'REQUEST_QUERY_BUDGET', 50)),
+        overrides.get('time', getattr(settings, 'REQUEST_TIME_BUDGET', 1.0)),
+    )
+
+
+class RequestTimingMiddleware:
+    """
+    Server-Timing и запись в лог api.requests для каждого запроса.
+
+    Для потоковых ответов (экспорт, SSE) учитывается только время до начала
+    передачи: тело формируется уже после выхода из middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        registry.request_started()
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            registry.request_ended()
+        self.finish(request, response, metrics, perf_counter() - start, getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        registry.request_started()
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+            registry.request_ended()
+        user = getattr(request, 'user', None)
+        # Ленивый пользователь AuthenticationMiddleware читает БД: в async — через auser().
+        # Async-представления с токеном подставляют в request.user готовый объект
+        if isinstance(user, SimpleLazyObject) and not settings.DEBUG:
+            user = await request.auser()
+        self.finish(request, response, metrics, perf_counter() - start, user)
+        return response
+
+    def finish(self, request, response, metrics, total, user=None):
+        # Время БД и число запросов по каждому адресу — подсказка для атакующего
+        if settings.DEBUG or getattr(user, 'is_staff', False):
+            timing = [
+                f'{name};dur={_ms(metrics.timings[name])};desc="{label}"' for name, label in TIMINGS
+            ]
+            timing.append(f'sql;desc="{metrics.queries} queries"')
+            timing.append(f'total;dur={_ms(total)}')
+            response['Server-Timing'] = ', '.join(timing)
+
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        query_budget, time_budget = _budgets(url_name)
+        over_budget = []
+        if metrics.queries > query_budget:
+            over_budget.append('queries')
+        if total > time_budget:
+            over_budget.append('time')
+
+        registry.observe_request(url_name, request.method, response.status_code, total, metrics.queries)
+
+        record = {
+            'url_name': url_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'total_ms': _ms(total),
+            'db_ms': _ms(metrics.timings['db']),
+            'template_ms': _ms(metrics.timings['tpl']),
+            'serializer_ms': _ms(metrics.timings['ser']),
+        }
+        if over_budget:
+            record['over_budget'] = over_budget
+            record['repeated_sql'] = metrics.repeated()
+            record['slowest_sql'] = [
+                {'sql': sql, 'ms': _ms(duration)} for duration, sql in sorted(metrics.slowest, reverse=True)
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        elif logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record, ensure_ascii=False))
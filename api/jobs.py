@@ -0,0 +1,254 @@
+"""
+Очередь фоновых задач в базе данных (модель Job).
+
+Обработчик регистрируется декоратором @job('имя') и получает payload как
+именованные аргументы. enqueue() пишет задачу в той же транзакции, что и
+запрос, поэтому задача появляется только вместе с изменениями, ради которых
+поставлена. Выполняет задачи команда manage.py run_jobs.
+
+- Приоритет: сначала задачи с большим priority, затем по run_after.
+- Повторы: при исключении задача возвращается в очередь с экспоненциальной
+  задержкой, пока не исчерпает max_attempts.
+- Видимость: взятая задача занята до locked_until; если обработчик умер,
+  не завершив её, после этого срока её возьмёт другой.
+- Идемпотентность: пока задача с dedup_key стоит в очереди, повторная
+  постановка с тем же ключом возвращает её же. Если она уже выполняется,
+  обработчик мог пройти проверку, ради которой её ставят снова, поэтому
+  задача отмечается rerun и после завершения возвращается в очередь.
+- Завершение записывается условным UPDATE по номеру попытки: обработчик,
+  у которого задачу забрали по истечении срока видимости, не затрёт
+  результат следующей попытки.
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Case, Count, F, Value, When
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+MAX_RETRY_DELAY = 60 * 60
+
+
+class JobSpec:
+    def __init__(self, func, name, max_attempts, timeout):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+
+def job(name, max_attempts=None, timeout=None):
+    """
+    Регистрирует обработчик фоновой задачи:
+
+        @job('uploads.complete', timeout=3600)
+        def complete(session_id): ...
+
+    timeout — срок видимости: сколько задача может выполняться, прежде чем
+    её сочтут брошенной (по умолчанию JOB_VISIBILITY_TIMEOUT).
+    """
+    def register(func):
+        _registry[name] = JobSpec(
+            func, name,
+            max_attempts or getattr(settings, 'JOB_MAX_ATTEMPTS', 5),
+            timeout or getattr(settings, 'JOB_VISIBILITY_TIMEOUT', 300),
+        )
+        return func
+    return register
+
+
+def get_spec(name):
+    return _registry[name]
+
+
+def enqueue(name, payload=None, *, priority=0, delay=None, dedup_key=None, user=None):
+    """Ставит задачу в очередь. Возвращает Job — новую или уже стоящую с тем же dedup_key."""
+    spec = get_spec(name)
+    fields = {
+        'name': name,
+        'payload': payload or {},
+        'priority': priority,
+        'run_after': timezone.now() + (delay or timedelta()),
+        'max_attempts': spec.max_attempts,
+        'user': user,
+    }
+    if dedup_key is None:
+        return Job.objects.create(**fields)
+    while True:
+        try:
+            with transaction.atomic():
+                return Job.objects.create(dedup_key=dedup_key, **fields)
+        except IntegrityError:
+            pass
+        existing = Job.objects.filter(
+            dedup_key=dedup_key, status__in=[Job.Status.QUEUED, Job.Status.RUNNING],
+        ).first()
+        if existing is None:
+            # Задача с этим ключом успела завершиться между вставкой и выборкой
+            continue
+        if existing.status == Job.Status.QUEUED:
+            return existing
+        if Job.objects.filter(pk=existing.pk, status=Job.Status.RUNNING).update(rerun=True):
+            return existing
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claimable_jobs(now):
+    return (
+        Job.objects.filter(status=Job.Status.QUEUED, run_after__lte=now)
+        .order_by('-priority', 'run_after', 'id')
+    )
+
+
+def requeue_expired(now=None):
+    """Возвращает в очередь задачи, чей срок видимости истёк. Возвращает их число."""
+    now = now or timezone.now()
+    expired = Job.objects.filter(status=Job.Status.RUNNING, locked_until__lt=now)
+    failed = expired.filter(attempts__gte=F('max_attempts'), rerun=False).update(
+        status=Job.Status.FAILED, finished_at=now, locked_until=None,
+        last_error='Превышен срок выполнения.',
+    )
+    # Исчерпавшая попытки задача с rerun выполняется заново с первой попытки
+    requeued = expired.update(
+        status=Job.Status.QUEUED, locked_until=None, run_after=now, rerun=False,
+        attempts=Case(
+            When(attempts__gte=F('max_attempts'), then=Value(0)), default=F('attempts'),
+            output_field=Job._meta.get_field('attempts'),
+        ),
+    )
+    return failed + requeued
+
+
+def claim(limit, worker=None):
+    """
+    Берёт до limit задач. Каждая захватывается условным UPDATE по статусу,
+    поэтому несколько обработчиков никогда не возьмут одну задачу дважды.
+    """
+    now = timezone.now()
+    worker = worker or worker_id()
+    claimed = []
+    candidates = claimable_jobs(now).values_list('id', 'name')[:limit * 2]
+    for job_id, name in candidates:
+        if len(claimed) >= limit:
+            break
+        spec = _registry.get(name)
+        timeout = spec.timeout if spec else getattr(settings, 'JOB_VISIBILITY_TIMEOUT', 300)
+        taken = Job.objects.filter(pk=job_id, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, attempts=F('attempts') + 1, locked_by=worker,
+            locked_until=now + timedelta(seconds=timeout), started_at=now,
+        )
+        if taken:
+            claimed.append(job_id)
+    return claimed
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(2 ** attempts, MAX_RETRY_DELAY))
+
+
+def _finish(job, **changes):
+    """
+    Записывает итог попытки, если задача всё ещё взята этой попыткой.
+    Задача с rerun вместо завершения возвращается в очередь. False — задачу
+    уже забрали (истёк срок видимости), итог отброшен.
+    """
+    rerun = {
+        'status': Job.Status.QUEUED, 'run_after': timezone.now(), 'finished_at': None, 'attempts': 0,
+    }
+    updates = {'rerun': False, 'locked_until': None}
+    for name, value in rerun.items():
+        field = Job._meta.get_field(name)
+        default = Value(changes.pop(name), output_field=field) if name in changes else F(name)
+        updates[name] = Case(When(rerun=True, then=Value(value, output_field=field)), default=default)
+    updates.update(changes)
+    return bool(Job.objects.filter(
+        pk=job.pk, status=Job.Status.RUNNING, attempts=job.attempts, locked_by=job.locked_by,
+    ).update(**updates))
+
+
+def execute(job_id):
+    """Выполняет взятую задачу и записывает результат. Вызывается в потоке или процессе обработчика."""
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=job_id)
+        spec = _registry.get(job.name)
+        try:
+            if spec is None:
+                raise LookupError(f'Неизвестная задача {job.name!r}')
+            result = spec.func(**job.payload)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Фоновая задача %s #%s завершилась с ошибкой', job.name, job.pk)
+            now = timezone.now()
+            if spec is not None and job.attempts < job.max_attempts:
+                _finish(job, status=Job.Status.QUEUED, run_after=now + retry_delay(job.attempts), last_error=error)
+            else:
+                _finish(job, status=Job.Status.FAILED, finished_at=now, last_error=error)
+            return False
+        return _finish(job, status=Job.Status.DONE, finished_at=timezone.now(), result=result)
+    finally:
+        close_old_connections()
+
+
+def purge_finished(max_age=None):
+    """Удаляет завершённые задачи старше max_age (по умолчанию JOB_RETENTION)."""
+    if max_age is None:
+        max_age = timedelta(seconds=getattr(settings, 'JOB_RETENTION', 7 * 24 * 60 * 60))
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.Status.DONE, Job.Status.FAILED], finished_at__lt=timezone.now() - max_age,
+    ).delete()
+    return deleted
+
+
+def queue_stats(window=timedelta(hours=1), sample=1000):
+    """Глубина очереди по статусам и задачам, задержки выполнения за последний window."""
+    now = timezone.now()
+    depth = {}
+    active = (
+        Job.objects.filter(status__in=[Job.Status.QUEUED, Job.Status.RUNNING])
+        .values_list('name', 'status').annotate(count=Count('id')).order_by()
+    )
+    for name, status, count in active:
+        depth.setdefault(name, {Job.Status.QUEUED: 0, Job.Status.RUNNING: 0})[status] = count
+
+    recent = list(
+        Job.objects.filter(status=Job.Status.DONE, finished_at__gte=now - window)
+        .order_by('-finished_at').values_list('created_at', 'started_at', 'finished_at')[:sample]
+    )
+    waits = sorted((started - created).total_seconds() for created, started, _ in recent)
+    runs = sorted((finished - started).total_seconds() for _, started, finished in recent)
+    return {
+        'depth': depth,
+        'queued': sum(counts[Job.Status.QUEUED] for counts in depth.values()),
+        'running': sum(counts[Job.Status.RUNNING] for counts in depth.values()),
+        'failed': Job.objects.filter(status=Job.Status.FAILED, finished_at__gte=now - window).count(),
+        'done': len(recent),
+        'wait': _percentiles(waits),
+        'run': _percentiles(runs),
+    }
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    def at(fraction):
+        return round(values[min(int(len(values) * fraction), len(values) - 1)], 3)
+    return {'p50': at(0.5), 'p95': at(0.95), 'p99': at(0.99), 'max': round(values[-1], 3)}
+
+
+@job('jobs.purge_finished')
+def purge_finished_job():
+    return {'deleted': purge_finished()}
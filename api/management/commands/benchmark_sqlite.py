@@ -0,0 +1,113 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+from django.db.utils import ConnectionHandler
+
+from api.routers import READER, WRITER
+
+ROWS = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочное сравнение SQLite: настройки драйвера по умолчанию (журнал отката, DEFERRED) '
+        'против профиля из settings.DATABASES (WAL, PRAGMA, BEGIN IMMEDIATE, отдельное соединение для чтения).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Потоков, изменяющих строки.')
+        parser.add_argument('--readers', type=int, default=8, help='Потоков, читающих строки.')
+        parser.add_argument('--duration', type=float, default=5.0, help='Длительность каждого прогона, секунд.')
+
+    def handle(self, *args, writers, readers, duration, **options):
+        base = settings.DATABASES[WRITER]
+        plain = {'ENGINE': base['ENGINE']}
+        profiles = {
+            'по умолчанию': {WRITER: plain, READER: plain},
+            'settings.DATABASES': {
+                WRITER: base,
+                READER: settings.DATABASES.get(READER, base),
+            },
+        }
+        for title, databases in profiles.items():
+            with tempfile.TemporaryDirectory() as directory:
+                name = os.path.join(directory, 'benchmark.sqlite3')
+                handler = ConnectionHandler({
+                    alias: {**databases[alias], 'NAME': name} for alias in (WRITER, READER)
+                })
+                stats = self.run(handler, writers, readers, duration)
+            self.stdout.write(
+                f'{title}: записей {stats["writes"] / duration:.0f}/с, '
+                f'чтений {stats["reads"] / duration:.0f}/с, '
+                f'ошибок блокировки {stats["locked"]}'
+            )
+
+    def run(self, handler, writers, readers, duration):
+        with handler[WRITER].cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+            cursor.executemany('INSERT INTO item (id, value) VALUES (%s, 0)', [(i,) for i in range(ROWS)])
+        handler.close_all()
+
+        stats = {'writes': 0, 'reads': 0, 'locked': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def count(key):
+            with lock:
+                stats[key] += 1
+
+        def write():
+            connection = handler[WRITER]
+            connection.ensure_connection()
+            # Как transaction.atomic(): BEGIN с transaction_mode соединения
+            begin = f'BEGIN {connection.transaction_mode or "DEFERRED"}'
+            while time.monotonic() < deadline:
+                item = random.randrange(ROWS)
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(begin)
+                        try:
+                            # Чтение перед записью: в DEFERRED-транзакции блокировка
+                            # повышается посреди транзакции и может не дождаться очереди
+                            cursor.execute('SELECT value FROM item WHERE id = %s', [item])
+                            value = cursor.fetchone()[0]
+                            cursor.execute('UPDATE item SET value = %s WHERE id = %s', [value + 1, item])
+                            cursor.execute('COMMIT')
+                        except Exception:
+                            cursor.execute('ROLLBACK')
+                            raise
+                except OperationalError:
+                    count('locked')
+                else:
+                    count('writes')
+            connection.close()
+
+        def read():
+            connection = handler[READER]
+            while time.monotonic() < deadline:
+                start = random.randrange(ROWS)
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(
+                            'SELECT COUNT(*), SUM(value) FROM item WHERE id BETWEEN %s AND %s', [start, start + 100],
+                        )
+                        cursor.fetchone()
+                except OperationalError:
+                    count('locked')
+                else:
+                    count('reads')
+            connection.close()
+
+        threads = [threading.Thread(target=write) for _ in range(writers)]
+        threads += [threading.Thread(target=read) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats
@@ -0,0 +1,106 @@
+import re
+from datetime import date
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from api.jobs import claimable_jobs
+from api.models import CustomUser, Job, Project, ProjectParticipant, Task
+from api.views import (
+    BOARD_ORDERING, TaskListCreateView, filter_project_tasks, get_board_queryset, get_column_queryset,
+    get_dashboard_projects,
+)
+from api.pagination import keyset_filter
+
+# Строка плана SQLite вида "SCAN api_task" — полный проход по таблице.
+# "SCAN ... USING [COVERING] INDEX" тоже читает всю таблицу, только через индекс.
+# "SCAN task_search VIRTUAL TABLE INDEX ..." — поиск по индексу FTS5, не полный проход.
+# "SCAN (subquery-N)" и "SCAN qualify" — проход по уже выбранным строкам подзапроса
+# (фильтр по оконной функции), а не по таблице.
+FULL_SCAN_RE = re.compile(r'\bSCAN (?!CONSTANT ROW|\(subquery-|qualify\b)(\S+)(?!\S| VIRTUAL TABLE)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN QUERY PLAN для запросов project_tasks_view, '
+        'project_detail_view, TaskListCreateView.get_queryset, dashboard_view, task_detail_view и run_jobs '
+        'и завершается с ошибкой при полном сканировании таблицы.'
+    )
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+
+        # Планы строим на временных данных: транзакция откатывается в конце
+        with transaction.atomic():
+            failures = self.check_plans(self.create_fixture())
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(f'Полное сканирование таблицы в запросах: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Все запросы используют индексы.'))
+
+    def create_fixture(self):
+        creator = CustomUser.objects.create_user(username='__query_plan_creator')
+        member = CustomUser.objects.create_user(username='__query_plan_member')
+        project = Project.objects.create(
+            title='query plan', description='', creator=creator,
+            start_date=date.today(), end_date=date.today(),
+        )
+        ProjectParticipant.objects.create(project=project, user=member)
+        task = Task.objects.create(project=project, title='query plan', assignee=member)
+        return SimpleNamespace(member=member, project=project, task=task)
+
+    def get_querysets(self, fixture):
+        project, task = fixture.project, fixture.task
+        assignee_id = str(fixture.member.pk)
+
+        view = TaskListCreateView()
+        view.request = SimpleNamespace(user=fixture.member)
+        view.kwargs = {}
+
+        tasks = filter_project_tasks(project)
+        return {
+            'project_tasks_view': tasks,
+            'project_tasks_view[count]': tasks.values('pk'),
+            'project_tasks_view[status]': filter_project_tasks(project, status_filter=Task.Status.DONE),
+            'project_tasks_view[assignee]': filter_project_tasks(project, assignee_id=assignee_id),
+            'project_tasks_view[status+assignee]': filter_project_tasks(
+                project, status_filter=Task.Status.TODO, assignee_id=assignee_id,
+            ),
+            'project_tasks_view[search]': filter_project_tasks(project, query='query plan'),
+            'TaskListCreateView.get_queryset': view.get_queryset(),
+            'project_detail_view[board]': get_board_queryset(project),
+            'project_board_column_view': get_column_queryset(project, Task.Status.TODO).filter(
+                keyset_filter(BOARD_ORDERING, [task.created_at, task.pk]),
+            ),
+            'dashboard_view': get_dashboard_projects(fixture.member, {project.pk}, date.today()),
+            'task_detail_view[task]': Task.objects.filter(pk=task.pk),
+            'task_detail_view[comments]': task.comments.select_related('author'),
+            'task_detail_view[files]': task.files.select_related('uploaded_by'),
+            'run_jobs[claim]': claimable_jobs(timezone.now()).values_list('id', 'name')[:8],
+            'run_jobs[requeue]': Job.objects.filter(status=Job.Status.RUNNING, locked_until__lt=timezone.now()),
+        }
+
+    def check_plans(self, fixture):
+        failures = []
+        for name, queryset in self.get_querysets(fixture).items():
+            plan = self.explain(queryset)
+            scans = FULL_SCAN_RE.findall(plan)
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f'{name}: SCAN {", ".join(scans)}'))
+            else:
+                self.stdout.write(f'{name}: OK')
+            if self.verbosity > 1:
+                self.stdout.write(plan)
+        return failures
+
+    def explain(self, queryset):
+        # QuerySet.explain() ломается на запросах с фильтром по оконной функции:
+        # Django оборачивает их в подзапрос и ставит префикс EXPLAIN не туда
+        sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
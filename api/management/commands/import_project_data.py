@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import BATCH_SIZE, IMPORT_FORMATS, IMPORT_KINDS, detect_format, import_rows, read_rows
+from api.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Импортирует задачи или участников проекта из CSV/JSONL-файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project_id', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=IMPORT_KINDS, default='tasks')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, dest='file_format',
+                            help='По умолчанию определяется по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            project = Project.objects.get(pk=options['project_id'])
+        except Project.DoesNotExist:
+            raise CommandError('Проект не найден.')
+
+        file_format = options['file_format'] or detect_format(options['path'])
+        if file_format is None:
+            raise CommandError('Не удалось определить формат файла, укажите --format.')
+
+        with open(options['path'], 'rb') as fileobj:
+            report = import_rows(project, read_rows(fileobj, file_format), options['kind'], options['batch_size'])
+
+        for error in report['errors']:
+            self.stderr.write(f"Строка {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано: {report['created']}, пропущено: {report['skipped']}, ошибок: {len(report['errors'])}"
+        ))
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.uploads import purge_stale_uploads
+
+
+class Command(BaseCommand):
+    help = 'Удаляет брошенные загрузки файлов по частям вместе с их недокачанными файлами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours', type=float, default=None,
+            help='Возраст последней части, после которого загрузка считается брошенной '
+                 '(по умолчанию UPLOAD_SESSION_TTL).',
+        )
+
+    def handle(self, *args, hours=None, **options):
+        max_age = timedelta(hours=hours) if hours is not None else None
+        count = purge_stale_uploads(max_age)
+        self.stdout.write(self.style.SUCCESS(f'Удалено загрузок: {count}.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс задач и комментариев (SQLite FTS5).'
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError('Полнотекстовый индекс поддерживается только для SQLite.')
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано задач: {count}.'))
@@ -0,0 +1,97 @@
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api import jobs
+
+# Служебные задачи, которые обработчик ставит сам раз в MAINTENANCE_INTERVAL
+MAINTENANCE_JOBS = ('jobs.purge_finished', 'uploads.purge_stale')
+MAINTENANCE_INTERVAL = 60 * 60
+REQUEUE_INTERVAL = 30
+
+
+def _init_process():
+    # Процесс пула: при spawn Django ещё не настроен, при fork унаследованные
+    # соединения с БД принадлежат родителю
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Обработчик очереди фоновых задач (api/jobs.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'JOB_WORKERS', 4),
+            help='Сколько задач выполнять одновременно.',
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Пул процессов вместо потоков — для задач, нагружающих процессор.',
+        )
+        parser.add_argument(
+            '--poll', type=float, default=getattr(settings, 'JOB_POLL_INTERVAL', 1.0),
+            help='Пауза между опросами пустой очереди, секунд.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить всё, что есть в очереди, и завершиться.',
+        )
+
+    def handle(self, *args, workers, processes, poll, burst, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        if processes:
+            connections.close_all()
+            executor = ProcessPoolExecutor(workers, initializer=_init_process)
+        else:
+            executor = ThreadPoolExecutor(workers, thread_name_prefix='job')
+        worker = jobs.worker_id()
+        self.stdout.write(f'Обработчик {worker}: {workers} {"процессов" if processes else "потоков"}.')
+
+        running = set()
+        last_requeue = last_maintenance = float('-inf')
+        try:
+            while not self.stopping:
+                now = time.monotonic()
+                if now - last_requeue >= REQUEUE_INTERVAL:
+                    jobs.requeue_expired()
+                    last_requeue = now
+                if not burst and now - last_maintenance >= MAINTENANCE_INTERVAL:
+                    for name in MAINTENANCE_JOBS:
+                        jobs.enqueue(name, dedup_key=name, priority=-10)
+                    last_maintenance = now
+
+                claimed = jobs.claim(workers - len(running), worker) if len(running) < workers else []
+                running.update(executor.submit(jobs.execute, job_id) for job_id in claimed)
+                if burst and not running:
+                    break
+                if running:
+                    done, running = wait(running, timeout=0 if claimed else poll, return_when=FIRST_COMPLETED)
+                    self.report(done)
+                elif not claimed:
+                    time.sleep(poll)
+        finally:
+            # Взятые задачи доделываются; новые не берутся
+            self.report(wait(running).done)
+            executor.shutdown()
+            connections.close_all()
+
+    def report(self, futures):
+        # Ошибки самих задач execute() записывает в Job; здесь — сбои вне задачи (БД, пул процессов)
+        for future in futures:
+            error = future.exception()
+            if error is not None:
+                self.stderr.write(f'Сбой обработчика: {error!r}')
+
+    def stop(self, signum, frame):
+        self.stopping = True
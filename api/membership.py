@@ -0,0 +1,176 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .metrics import registry
+from .models import Project, ProjectParticipant
+
+# Роль создателя проекта в карте ролей (создатель может не быть участником)
+CREATOR = 'creator'
+
+# Снимок членства пользователя: {project_id: роль участника} и id созданных проектов
+Membership = namedtuple('Membership', ['roles', 'created'])
+
+_EMPTY = Membership({}, frozenset())
+_REQUEST_ATTR = '_project_membership'
+
+
+def _cache():
+    return caches[getattr(settings, 'MEMBERSHIP_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(user_id):
+    return f'membership:{user_id}'
+
+
+def _load(user_id):
+    roles = dict(
+        ProjectParticipant.objects.filter(user_id=user_id, project__deleted_at__isnull=True)
+        .values_list('project_id', 'role')
+    )
+    created = frozenset(
+        Project.objects.filter(creator_id=user_id).values_list('id', flat=True)
+    )
+    return Membership(roles, created)
+
+
+async def _aload(user_id):
+    roles = {
+        project_id: role
+        async for project_id, role in ProjectParticipant.objects.filter(
+            user_id=user_id, project__deleted_at__isnull=True,
+        ).values_list('project_id', 'role')
+    }
+    created = frozenset([
+        project_id async for project_id in Project.objects.filter(creator_id=user_id).values_list('id', flat=True)
+    ])
+    return Membership(roles, created)
+
+
+def get_membership(user):
+    """
+    Возвращает членство пользователя во всех проектах.
+
+    В рамках запроса результат запоминается на объекте пользователя,
+    между запросами — хранится в кэше MEMBERSHIP_CACHE_ALIAS не дольше
+    MEMBERSHIP_CACHE_TIMEOUT. invalidate_membership() сбрасывает запись
+    в этом кэше; если он в памяти процесса (LocMemCache), соседние рабочие
+    процессы увидят изменение только по истечении таймаута.
+    """
+    if user is None or not user.is_authenticated:
+        return _EMPTY
+
+    membership = getattr(user, _REQUEST_ATTR, None)
+    if membership is not None:
+        return membership
+
+    cache = _cache()
+    key = _cache_key(user.pk)
+    membership = cache.get(key)
+    registry.record_cache('membership', hit=membership is not None)
+    if membership is None:
+        membership = _load(user.pk)
+        cache.set(key, membership, getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 10))
+
+    setattr(user, _REQUEST_ATTR, membership)
+    return membership
+
+
+async def aget_membership(user, refresh=False):
+    """
+    Асинхронный вариант get_membership() для async-представлений.
+    refresh=True читает членство из БД в обход и объекта пользователя, и кэша —
+    для долгих соединений, которые должны заметить исключение из проекта,
+    даже если его сделал другой рабочий процесс. Прочитанное кладётся в кэш.
+    """
+    if user is None or not user.is_authenticated:
+        return _EMPTY
+
+    membership = None if refresh else getattr(user, _REQUEST_ATTR, None)
+    if membership is not None:
+        return membership
+
+    cache = _cache()
+    key = _cache_key(user.pk)
+    # LocMemCache не делает ввода-вывода: обращаемся к нему напрямую, без перехода в поток
+    local = isinstance(cache, LocMemCache)
+    if not refresh:
+        membership = cache.get(key) if local else await cache.aget(key)
+        registry.record_cache('membership', hit=membership is not None)
+    if membership is None:
+        membership = await _aload(user.pk)
+        timeout = getattr(settings, 'MEMBERSHIP_CACHE_TIMEOUT', 10)
+        if local:
+            cache.set(key, membership, timeout)
+        else:
+            await cache.aset(key, membership, timeout)
+
+    setattr(user, _REQUEST_ATTR, membership)
+    return membership
+
+
+def get_project_roles(user):
+    """
+    Карта {project_id: роль} для всех проектов пользователя.
+    Для созданных проектов роль — CREATOR.
+    """
+    membership = get_membership(user)
+    roles = dict(membership.roles)
+    roles.update(dict.fromkeys(membership.created, CREATOR))
+    return roles
+
+
+def get_project_ids(user):
+    """Id всех проектов, где пользователь создатель или участник."""
+    membership = get_membership(user)
+    return membership.created.union(membership.roles)
+
+
+async def aget_project_ids(user):
+    membership = await aget_membership(user)
+    return membership.created.union(membership.roles)
+
+
+def _project_id(project):
+    return project if isinstance(project, int) else project.pk
+
+
+def get_project_role(user, project):
+    """Роль пользователя в проекте или None, если он не имеет к нему отношения."""
+    membership = get_membership(user)
+    project_id = _project_id(project)
+    if project_id in membership.created:
+        return CREATOR
+    return membership.roles.get(project_id)
+
+
+def is_participant(user, project):
+    """Есть ли у пользователя запись ProjectParticipant в проекте."""
+    return _project_id(project) in get_membership(user).roles
+
+
+def is_project_member(user, project):
+    """Пользователь — создатель или участник проекта."""
+    return get_project_role(user, project) is not None
+
+
+async def ais_project_member(user, project, refresh=False):
+    membership = await aget_membership(user, refresh=refresh)
+    project_id = _project_id(project)
+    return project_id in membership.created or project_id in membership.roles
+
+
+def invalidate_membership(*user_ids):
+    """
+    Сбрасывает кэш членства указанных пользователей.
+
+    Сброс повторяется после коммита транзакции, чтобы параллельный запрос
+    не успел закэшировать ещё не зафиксированное состояние.
+    """
+    keys = [_cache_key(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        _cache().delete_many(keys)
+        transaction.on_commit(lambda: _cache().delete_many(keys))
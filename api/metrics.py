@@ -0,0 +1,287 @@
+"""
+Агрегированные метрики запросов в формате Prometheus (/metrics).
+
+RequestTimingMiddleware (api/instrumentation.py) передаёт сюда итог каждого
+запроса: число запросов по имени URL, методу и статусу, гистограммы времени
+ответа и числа SQL-запросов, число выполняющихся запросов. К ним добавляются
+попадания и промахи кэшей токенов, членства и фрагментов.
+
+Каждый процесс считает свои метрики в памяти. Если задан METRICS_DIR,
+процесс не чаще раза в METRICS_FLUSH_INTERVAL секунд записывает снимок
+в METRICS_DIR/<pid>-<время запуска>.json, а /metrics складывает снимки всех
+процессов: так любой рабочий процесс отдаёт сумму по всему развёртыванию.
+Время запуска в имени не даёт новому процессу с тем же pid затереть снимок
+завершившегося. Счётчики завершившихся процессов продолжают учитываться,
+выполняющиеся запросы — только у живых. Каталог очищается при перезапуске развёртывания, как и
+у multiprocess-режима prometheus_client.
+
+Без METRICS_DIR /metrics показывает только текущий процесс (runserver).
+"""
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+from .authentication import token_cache
+from .fragments import fragment_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Имя URL для запросов, не сопоставленных ни с одним маршрутом: путь в метку
+# не попадает, чтобы число рядов не росло от случайных адресов
+UNMATCHED_ROUTE = '<unmatched>'
+
+HELP = {
+    'http_requests_total': ('counter', 'Обработанные запросы.'),
+    'http_request_duration_seconds': ('histogram', 'Время ответа, секунд.'),
+    'http_request_db_queries': ('histogram', 'SQL-запросов на запрос.'),
+    'http_requests_in_flight': ('gauge', 'Выполняющиеся запросы.'),
+    'cache_requests_total': ('counter', 'Обращения к кэшам.'),
+    'cache_hit_ratio': ('gauge', 'Доля попаданий в кэш.'),
+}
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', None)
+
+
+def _buckets(setting, default):
+    return tuple(getattr(settings, setting, default))
+
+
+class ProcessMetrics:
+    """Метрики текущего процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        # Время запуска в миллисекундах: вместе с pid однозначно задаёт процесс
+        self.started = int(time.time() * 1000)
+        # (имя, метки) -> значение; метки — кортеж пар (имя, значение)
+        self.counters = defaultdict(float)
+        # (имя, метки) -> [счётчики по корзинам, сумма, число]
+        self.histograms = {}
+        self.in_flight = 0
+        self.flushed_at = 0.0
+
+    def _check_fork(self):
+        # После fork (gunicorn --preload) потомок не должен повторять счётчики родителя
+        if self.pid != os.getpid():
+            self._reset()
+
+    def _observe(self, name, labels, buckets, value):
+        histogram = self.histograms.get((name, labels))
+        if histogram is None:
+            histogram = self.histograms[(name, labels)] = [[0] * len(buckets), 0.0, 0]
+        index = bisect_left(buckets, value)
+        if index < len(buckets):
+            histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+    def request_started(self):
+        with self._lock:
+            self._check_fork()
+            self.in_flight += 1
+
+    def request_ended(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def observe_request(self, route, method, status, duration, queries):
+        route = (('route', route or UNMATCHED_ROUTE),)
+        with self._lock:
+            self._check_fork()
+            self.counters[('http_requests_total', route + (('method', method), ('status', str(status))))] += 1
+            self._observe(
+                'http_request_duration_seconds', route,
+                _buckets('METRICS_LATENCY_BUCKETS', LATENCY_BUCKETS), duration,
+            )
+            self._observe(
+                'http_request_db_queries', route,
+                _buckets('METRICS_QUERY_BUCKETS', QUERY_BUCKETS), queries,
+            )
+        self.maybe_flush()
+
+    def record_cache(self, cache, hit):
+        key = ('cache_requests_total', (('cache', cache), ('result', 'hit' if hit else 'miss')))
+        with self._lock:
+            self._check_fork()
+            self.counters[key] += 1
+
+    def snapshot(self):
+        with self._lock:
+            self._check_fork()
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [
+                [name, list(labels), list(buckets), total, count]
+                for (name, labels), (buckets, total, count) in self.histograms.items()
+            ]
+            in_flight = self.in_flight
+        # У LRU-кэша токенов и кэша фрагментов свои накопительные счётчики в процессе
+        token = token_cache.stats()
+        fragments = fragment_stats.stats()
+        for cache, stats in (('token', token), ('fragments', fragments)):
+            for result, count in (('hit', stats['hits']), ('miss', stats['misses'])):
+                counters.append(['cache_requests_total', [('cache', cache), ('result', result)], count])
+        return {
+            'pid': self.pid,
+            'started': self.started,
+            'counters': counters,
+            'histograms': histograms,
+            'gauges': [['http_requests_in_flight', [], in_flight]],
+        }
+
+    def maybe_flush(self):
+        directory = metrics_dir()
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 1.0)
+        if directory and time.monotonic() - self.flushed_at >= interval:
+            self.flush(directory)
+
+    def flush(self, directory=None):
+        """Записывает снимок процесса в METRICS_DIR/<pid>-<started>.json (атомарно, через rename)."""
+        directory = directory or metrics_dir()
+        if not directory:
+            return
+        self.flushed_at = time.monotonic()
+        snapshot = self.snapshot()
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as target:
+            json.dump(snapshot, target)
+        os.replace(temporary, os.path.join(directory, f'{snapshot["pid"]}-{snapshot["started"]}.json'))
+
+
+registry = ProcessMetrics()
+atexit.register(registry.flush)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _identity(snapshot):
+    return snapshot['pid'], snapshot.get('started', 0)
+
+
+def collect():
+    """Снимки всех процессов: свой — из памяти, остальные — из METRICS_DIR."""
+    own = registry.snapshot()
+    snapshots = [own]
+    directory = metrics_dir()
+    if not directory:
+        return snapshots
+    # pid -> время запуска последнего процесса с этим pid; живым может быть только он
+    latest = {own['pid']: own['started']}
+    others = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path) as source:
+                snapshot = json.load(source)
+        except (OSError, ValueError):
+            continue
+        if _identity(snapshot) == _identity(own):
+            continue
+        others.append(snapshot)
+        pid, started = _identity(snapshot)
+        latest[pid] = max(latest.get(pid, started), started)
+    for snapshot in others:
+        pid, started = _identity(snapshot)
+        snapshot['alive'] = started == latest[pid] and pid != own['pid'] and _alive(pid)
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def merge(snapshots):
+    counters = defaultdict(float)
+    histograms = {}
+    gauges = defaultdict(float)
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, buckets, total, count in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+        if snapshot.get('alive', True):
+            for name, labels, value in snapshot['gauges']:
+                gauges[(name, tuple(map(tuple, labels)))] += value
+
+    # Доля попаданий — по суммам за всё время, для графиков удобнее rate() по cache_requests_total
+    caches = defaultdict(lambda: {'hit': 0.0, 'miss': 0.0})
+    for (name, labels), value in counters.items():
+        if name == 'cache_requests_total':
+            labels = dict(labels)
+            caches[labels['cache']][labels['result']] += value
+    for cache, results in caches.items():
+        requests = results['hit'] + results['miss']
+        if requests:
+            gauges[('cache_hit_ratio', (('cache', cache),))] = results['hit'] / requests
+    return counters, histograms, gauges
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _bucket_bounds(name):
+    if name == 'http_request_duration_seconds':
+        return _buckets('METRICS_LATENCY_BUCKETS', LATENCY_BUCKETS)
+    return _buckets('METRICS_QUERY_BUCKETS', QUERY_BUCKETS)
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus 0.0.4."""
+    counters, histograms, gauges = merge(collect())
+    series = defaultdict(list)
+    for (name, labels), value in sorted(counters.items()):
+        series[name].append(f'{name}{_labels(labels)} {_number(value)}')
+    for (name, labels), value in sorted(gauges.items()):
+        series[name].append(f'{name}{_labels(labels)} {_number(value)}')
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        cumulative = 0
+        for bound, bucket in zip(_bucket_bounds(name), buckets):
+            cumulative += bucket
+            series[name].append(f'{name}_bucket{_labels(labels, [("le", _number(bound))])} {cumulative}')
+        series[name].append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {count}')
+        series[name].append(f'{name}_sum{_labels(labels)} {_number(total)}')
+        series[name].append(f'{name}_count{_labels(labels)} {count}')
+
+    lines = []
+    for name, (kind, description) in HELP.items():
+        if name not in series:
+            continue
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(series[name])
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alter_fileattachment_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['task', '-created_at'], name='comment_task_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fileattachment',
+            index=models.Index(fields=['task', '-uploaded_at'], name='file_task_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectparticipant',
+            index=models.Index(fields=['user', 'project', 'role'], name='participant_user_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status'], name='task_project_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'due_date'], name='task_project_due_idx'),
+        ),
+    ]
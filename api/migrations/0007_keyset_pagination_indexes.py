@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fileattachment',
+            index=models.Index(fields=['uploaded_at', 'id'], name='file_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_at', 'id'], name='project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'id'], name='task_created_idx'),
+        ),
+    ]
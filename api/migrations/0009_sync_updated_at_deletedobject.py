@@ -0,0 +1,54 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:20
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_project_updated_at_task_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedObject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('task', 'Задача'), ('comment', 'Комментарий'), ('participant', 'Участник проекта')], max_length=20, verbose_name='Тип объекта')),
+                ('object_id', models.BigIntegerField(verbose_name='Id объекта')),
+                ('project_id', models.BigIntegerField(verbose_name='Id проекта')),
+                ('user_id', models.BigIntegerField(blank=True, null=True, verbose_name='Id пользователя')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Удалено')),
+            ],
+            options={
+                'verbose_name': 'Удалённый объект',
+                'verbose_name_plural': 'Удалённые объекты',
+                'indexes': [models.Index(fields=['deleted_at', 'id'], name='deleted_object_deleted_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Изменено'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='projectparticipant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Изменено'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['updated_at', 'id'], name='comment_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='projectparticipant',
+            index=models.Index(fields=['updated_at', 'id'], name='participant_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+        ),
+    ]
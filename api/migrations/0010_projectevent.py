@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_sync_updated_at_deletedobject'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.BigIntegerField(verbose_name='Id проекта')),
+                ('type', models.CharField(max_length=30, verbose_name='Тип события')),
+                ('data', models.JSONField(verbose_name='Данные')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+            ],
+            options={
+                'verbose_name': 'Событие проекта',
+                'verbose_name_plural': 'События проектов',
+                'indexes': [models.Index(fields=['project_id', 'id'], name='project_event_project_idx'), models.Index(fields=['created_at'], name='project_event_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+from django.db import migrations
+
+# Полнотекстовый индекс задач (SQLite FTS5): rowid = id задачи,
+# comments — тексты всех комментариев задачи через пробел.
+# Триггеры поддерживают индекс и для bulk_create/bulk_update, и для raw SQL.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE task_search USING fts5(
+        title, description, comments, project_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER task_search_ai AFTER INSERT ON api_task BEGIN
+        INSERT INTO task_search (rowid, title, description, comments, project_id)
+        VALUES (NEW.id, NEW.title, NEW.description, '', NEW.project_id);
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_au AFTER UPDATE OF title, description, project_id ON api_task BEGIN
+        UPDATE task_search
+        SET title = NEW.title, description = NEW.description, project_id = NEW.project_id
+        WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER task_search_ad AFTER DELETE ON api_task BEGIN
+        DELETE FROM task_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER comment_search_ai AFTER INSERT ON api_comment BEGIN
+        UPDATE task_search
+        SET comments = (SELECT group_concat(content, ' ') FROM api_comment WHERE task_id = NEW.task_id)
+        WHERE rowid = NEW.task_id;
+    END
+    """,
+    """
+    CREATE TRIGGER comment_search_au AFTER UPDATE OF content, task_id ON api_comment BEGIN
+        UPDATE task_search
+        SET comments = coalesce((SELECT group_concat(content, ' ') FROM api_comment WHERE task_id = task_search.rowid), '')
+        WHERE rowid IN (OLD.task_id, NEW.task_id);
+    END
+    """,
+    """
+    CREATE TRIGGER comment_search_ad AFTER DELETE ON api_comment BEGIN
+        UPDATE task_search
+        SET comments = coalesce((SELECT group_concat(content, ' ') FROM api_comment WHERE task_id = OLD.task_id), '')
+        WHERE rowid = OLD.task_id;
+    END
+    """,
+    """
+    INSERT INTO task_search (rowid, title, description, comments, project_id)
+    SELECT t.id, t.title, t.description,
+           coalesce((SELECT group_concat(c.content, ' ') FROM api_comment c WHERE c.task_id = t.id), ''),
+           t.project_id
+    FROM api_task t
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS comment_search_ad',
+    'DROP TRIGGER IF EXISTS comment_search_au',
+    'DROP TRIGGER IF EXISTS comment_search_ai',
+    'DROP TRIGGER IF EXISTS task_search_ad',
+    'DROP TRIGGER IF EXISTS task_search_au',
+    'DROP TRIGGER IF EXISTS task_search_ai',
+    'DROP TABLE IF EXISTS task_search',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 есть только в SQLite; на других СУБД поиск работает через icontains
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_projectevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
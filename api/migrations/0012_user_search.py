@@ -0,0 +1,76 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:10
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# Триграммный индекс FTS5 для поиска по подстроке без учёта регистра (в т.ч. кириллицы):
+# lower() в SQLite приводит к нижнему регистру только ASCII. rowid = id пользователя.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE user_search USING fts5(
+        username, email, user_group, tokenize = 'trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER user_search_ai AFTER INSERT ON api_customuser BEGIN
+        INSERT INTO user_search (rowid, username, email, user_group)
+        VALUES (NEW.id, NEW.username, NEW.email, coalesce(NEW."group", ''));
+    END
+    """,
+    """
+    CREATE TRIGGER user_search_au AFTER UPDATE OF username, email, "group" ON api_customuser BEGIN
+        UPDATE user_search
+        SET username = NEW.username, email = NEW.email, user_group = coalesce(NEW."group", '')
+        WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER user_search_ad AFTER DELETE ON api_customuser BEGIN
+        DELETE FROM user_search WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    INSERT INTO user_search (rowid, username, email, user_group)
+    SELECT id, username, email, coalesce("group", '') FROM api_customuser
+    """,
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS user_search_ad',
+    'DROP TRIGGER IF EXISTS user_search_au',
+    'DROP TRIGGER IF EXISTS user_search_ai',
+    'DROP TABLE IF EXISTS user_search',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_task_search'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('username'), name='user_username_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='user_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(django.db.models.functions.text.Lower('group'), name='user_group_lower_idx'),
+        ),
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_user_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['project', 'status', 'created_at', 'id'], name='task_board_column_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_project_status_idx',
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:19
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_task_board_column_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('file', models.FileField(max_length=255, upload_to='blobs/', verbose_name='Файл')),
+                ('size', models.BigIntegerField(verbose_name='Размер')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+            options={
+                'verbose_name': 'Содержимое файла',
+                'verbose_name_plural': 'Содержимое файлов',
+            },
+        ),
+        migrations.AddField(
+            model_name='fileattachment',
+            name='filename',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Имя файла'),
+        ),
+        migrations.AlterField(
+            model_name='fileattachment',
+            name='file',
+            field=models.FileField(max_length=255, upload_to='uploads/', verbose_name='Файл'),
+        ),
+        migrations.AddField(
+            model_name='fileattachment',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='attachments', to='api.fileblob', verbose_name='Содержимое'),
+        ),
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('size', models.BigIntegerField(verbose_name='Размер')),
+                ('received', models.BigIntegerField(default=0, verbose_name='Принято')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Начата')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлена')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='api.task', verbose_name='Задача')),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Загружает')),
+            ],
+            options={
+                'verbose_name': 'Загрузка файла',
+                'verbose_name_plural': 'Загрузки файлов',
+                'indexes': [models.Index(fields=['updated_at'], name='upload_session_updated_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_fileblob_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Задача')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('status', models.CharField(choices=[('queued', 'В очереди'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Ошибка')], default='queued', max_length=10, verbose_name='Статус')),
+                ('priority', models.SmallIntegerField(default=0, verbose_name='Приоритет')),
+                ('dedup_key', models.CharField(blank=True, max_length=200, null=True, verbose_name='Ключ идемпотентности')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5, verbose_name='Максимум попыток')),
+                ('run_after', models.DateTimeField(verbose_name='Не раньше')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Занята до')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Обработчик')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Результат')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начата')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершена')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Поставил')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'indexes': [models.Index(fields=['status', '-priority', 'run_after', 'id'], name='job_claim_idx'), models.Index(fields=['status', 'locked_until'], name='job_locked_idx'), models.Index(fields=['finished_at'], name='job_finished_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('dedup_key',), name='job_active_dedup_key_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удалено'),
+        ),
+        migrations.AlterField(
+            model_name='deletedobject',
+            name='kind',
+            field=models.CharField(choices=[('task', 'Задача'), ('comment', 'Комментарий'), ('participant', 'Участник проекта'), ('project', 'Проект')], max_length=20, verbose_name='Тип объекта'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_project_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='rerun',
+            field=models.BooleanField(default=False, verbose_name='Повторить после завершения'),
+        ),
+    ]
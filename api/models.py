@@ -1,6 +1,9 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 
 # Create your models here.
@@ -32,15 +35,29 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = _('Пользователь')
         verbose_name_plural = _('Пользователи')
+        # Префиксный поиск для автодополнения (api/search.py: search_users)
+        indexes = [
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+            models.Index(Lower('group'), name='user_group_lower_idx'),
+        ]
 
 # Проект
+class ActiveProjectManager(models.Manager):
+    """Проекты без отметки об удалении; удалённые дочищает фоновая задача (api/deletion.py)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class Project(models.Model):
     class Status(models.TextChoices):
         DRAFT = 'draft', _('Черновик')
         ACTIVE = 'active', _('Активный')
         COMPLETED = 'completed', _('Завершённый')
 
-    objects = models.Manager()
+    objects = ActiveProjectManager()
+    all_objects = models.Manager()
     title = models.CharField(max_length=200, verbose_name=_('Название проекта'))
     description = models.TextField(verbose_name=_('Описание проекта'))
     creator = models.ForeignKey(
@@ -58,6 +75,8 @@ class Project(models.Model):
         verbose_name=_('Статус проекта')
     )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Создано'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Изменено'))
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name=_('Удалено'))
 
     def __str__(self):
         return self.title
@@ -65,6 +84,10 @@ class Project(models.Model):
     class Meta:
         verbose_name = _('Проект')
         verbose_name_plural = _('Проекты')
+        indexes = [
+            # Курсорная пагинация API по (created_at, id)
+            models.Index(fields=['created_at', 'id'], name='project_created_idx'),
+        ]
 
 # Участник проекта
 class ProjectParticipant(models.Model):
@@ -77,6 +100,7 @@ class ProjectParticipant(models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='participants', verbose_name=_('Проект'))
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name=_('Пользователь'))
     role = models.CharField(max_length=20, choices=Role.choices, default=Role.STUDENT, verbose_name=_('Роль в проекте'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Изменено'))
 
     def __str__(self):
         return f"{self.user} — {self.project} ({self.role})"
@@ -85,6 +109,11 @@ class ProjectParticipant(models.Model):
         verbose_name = _('Участник проекта')
         verbose_name_plural = _('Участники проекта')
         unique_together = ('project', 'user')
+        indexes = [
+            # Покрывающий индекс для загрузки карты ролей пользователя
+            models.Index(fields=['user', 'project', 'role'], name='participant_user_role_idx'),
+            models.Index(fields=['updated_at', 'id'], name='participant_updated_idx'),
+        ]
 
 # Задача
 class Task(models.Model):
@@ -118,13 +147,29 @@ class Task(models.Model):
     )
     due_date = models.DateField(null=True, blank=True, verbose_name=_('Срок выполнения'))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Создано'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Изменено'))
 
     def __str__(self):
         return f"{self.title} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Статус на момент загрузки — чтобы отличить смену статуса от прочих правок (api/events.py)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+
     class Meta:
         verbose_name = _('Задача')
         verbose_name_plural = _('Задачи')
+        indexes = [
+            # Колонка доски: задачи проекта с одним статусом в порядке создания
+            models.Index(fields=['project', 'status', 'created_at', 'id'], name='task_board_column_idx'),
+            models.Index(fields=['assignee', 'status'], name='task_assignee_status_idx'),
+            models.Index(fields=['project', 'due_date'], name='task_project_due_idx'),
+            models.Index(fields=['created_at', 'id'], name='task_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+        ]
 
 # Комментарий
 class Comment(models.Model):
@@ -132,20 +177,47 @@ class Comment(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='Автор')
     content = models.TextField(verbose_name='Комментарий')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Изменено')
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['task', '-created_at'], name='comment_task_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='comment_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Комментарий от {self.author} к '{self.task.title}'"
 
 
+# Содержимое файла, адресуемое SHA-256: одинаковые загрузки хранятся один раз (api/uploads.py)
+class FileBlob(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name='SHA-256')
+    file = models.FileField(upload_to='blobs/', max_length=255, verbose_name='Файл')
+    size = models.BigIntegerField(verbose_name='Размер')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+
+    class Meta:
+        verbose_name = 'Содержимое файла'
+        verbose_name_plural = 'Содержимое файлов'
+
+    def __str__(self):
+        return self.sha256
+
+
 # Прикрепленный файл
 class FileAttachment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='files', verbose_name='Задача')
-    file = models.FileField(upload_to='uploads/', verbose_name='Файл')
+    # Для файлов с содержимым в blob здесь тот же путь, что и в blob.file
+    file = models.FileField(upload_to='uploads/', max_length=255, verbose_name='Файл')
+    # Пусто у файлов, загруженных до появления FileBlob
+    blob = models.ForeignKey(
+        FileBlob, on_delete=models.PROTECT, null=True, blank=True,
+        related_name='attachments', verbose_name='Содержимое',
+    )
+    filename = models.CharField(max_length=255, blank=True, verbose_name='Имя файла')
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='Загрузил')
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата загрузки')
 
@@ -153,7 +225,135 @@ class FileAttachment(models.Model):
         ordering = ['-uploaded_at']
         verbose_name = 'Файл задачи'
         verbose_name_plural = 'Файлы задачи'
+        indexes = [
+            models.Index(fields=['task', '-uploaded_at'], name='file_task_uploaded_idx'),
+            models.Index(fields=['uploaded_at', 'id'], name='file_uploaded_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.file.name} ({self.task.title})"
+        return f"{self.display_name} ({self.task.title})"
+
+    @property
+    def display_name(self):
+        return self.filename or self.file.name.rsplit('/', 1)[-1]
+
+
+# Незавершённая загрузка файла по частям (/api/uploads/)
+class UploadSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name='Задача')
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='Загружает')
+    filename = models.CharField(max_length=255, verbose_name='Имя файла')
+    size = models.BigIntegerField(verbose_name='Размер')
+    # Сколько байт от начала файла уже принято; части принимаются строго по порядку
+    received = models.BigIntegerField(default=0, verbose_name='Принято')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Начата')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлена')
+
+    class Meta:
+        verbose_name = 'Загрузка файла'
+        verbose_name_plural = 'Загрузки файлов'
+        indexes = [
+            models.Index(fields=['updated_at'], name='upload_session_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
 
+# Журнал удалений для синхронизации клиентов (/api/sync/)
+class DeletedObject(models.Model):
+    class Kind(models.TextChoices):
+        TASK = 'task', 'Задача'
+        COMMENT = 'comment', 'Комментарий'
+        PARTICIPANT = 'participant', 'Участник проекта'
+        # Проект удалён целиком: по записи на каждого, у кого был доступ
+        PROJECT = 'project', 'Проект'
+
+    kind = models.CharField(max_length=20, choices=Kind.choices, verbose_name='Тип объекта')
+    object_id = models.BigIntegerField(verbose_name='Id объекта')
+    # Проект и пользователь хранятся без внешних ключей: они могут быть уже удалены
+    project_id = models.BigIntegerField(verbose_name='Id проекта')
+    user_id = models.BigIntegerField(null=True, blank=True, verbose_name='Id пользователя')
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name='Удалено')
+
+    class Meta:
+        verbose_name = 'Удалённый объект'
+        verbose_name_plural = 'Удалённые объекты'
+        indexes = [
+            models.Index(fields=['deleted_at', 'id'], name='deleted_object_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+
+# События проектов для DatabaseBackend потока /api/async/projects/<id>/events/
+class ProjectEvent(models.Model):
+    project_id = models.BigIntegerField(verbose_name='Id проекта')
+    type = models.CharField(max_length=30, verbose_name='Тип события')
+    data = models.JSONField(verbose_name='Данные')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
+
+    class Meta:
+        verbose_name = 'Событие проекта'
+        verbose_name_plural = 'События проектов'
+        indexes = [
+            models.Index(fields=['project_id', 'id'], name='project_event_project_idx'),
+            models.Index(fields=['created_at'], name='project_event_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} #{self.pk}"
+
+
+# Фоновая задача (api/jobs.py, manage.py run_jobs)
+class Job(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    name = models.CharField(max_length=100, verbose_name='Задача')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Параметры')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED, verbose_name='Статус')
+    # Больше — раньше
+    priority = models.SmallIntegerField(default=0, verbose_name='Приоритет')
+    # Повторная постановка с тем же ключом, пока задача не завершена, возвращает существующую
+    dedup_key = models.CharField(max_length=200, null=True, blank=True, verbose_name='Ключ идемпотентности')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')
+    max_attempts = models.PositiveSmallIntegerField(default=5, verbose_name='Максимум попыток')
+    run_after = models.DateTimeField(verbose_name='Не раньше')
+    # Выполняющаяся задача, не завершённая к этому времени, считается брошенной и берётся снова
+    locked_until = models.DateTimeField(null=True, blank=True, verbose_name='Занята до')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='Обработчик')
+    # Задачу с тем же dedup_key поставили, пока эта выполнялась: после завершения она выполнится ещё раз
+    rerun = models.BooleanField(default=False, verbose_name='Повторить после завершения')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Поставил',
+    )
+    result = models.JSONField(null=True, blank=True, verbose_name='Результат')
+    last_error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создана')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начата')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершена')
+
+    class Meta:
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(fields=['status', '-priority', 'run_after', 'id'], name='job_claim_idx'),
+            models.Index(fields=['status', 'locked_until'], name='job_locked_idx'),
+            models.Index(fields=['finished_at'], name='job_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'], condition=models.Q(status__in=['queued', 'running']),
+                name='job_active_dedup_key_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
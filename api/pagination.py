@@ -0,0 +1,160 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db.models import DateTimeField, Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(position):
+    """Кодирует позицию (значения полей сортировки) в непрозрачный токен."""
+    values = [value.isoformat() if isinstance(value, date) else value for value in position]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_token(token, length):
+    """Список значений из токена без проверки типов. None, если токен некорректен."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(values, list) or len(values) != length:
+        return None
+    return values
+
+
+def position_from_values(model, ordering, values):
+    """
+    Приводит значения из токена к типам полей сортировки модели.
+    None, если значение не подходит полю: в условие WHERE такое попасть не должно.
+    """
+    position = []
+    for field_name, value in zip(ordering, values):
+        # Только строки и числа: null, списки и объекты курсор не порождает
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            return None
+        field = model._meta.get_field(field_name.lstrip('-'))
+        try:
+            value = field.to_python(value)
+            # Валидаторы полей-чисел отсекают значения вне диапазона INTEGER
+            field.run_validators(value)
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            return None
+        if value is None:
+            return None
+        if isinstance(field, DateTimeField) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        position.append(value)
+    return position
+
+
+def decode_cursor(token, ordering, model):
+    """Декодирует токен курсора в значения полей ordering. None, если токен некорректен."""
+    values = decode_token(token, len(ordering))
+    if values is None:
+        return None
+    return position_from_values(model, ordering, values)
+
+
+def get_position(obj, ordering):
+    """Значения полей сортировки для модели или словаря из .values()."""
+    names = [field.lstrip('-') for field in ordering]
+    if isinstance(obj, dict):
+        return [obj[name] for name in names]
+    return [getattr(obj, name) for name in names]
+
+
+def keyset_filter(ordering, position):
+    """
+    Условие "строго после позиции" для сортировки ordering:
+    (a, b) > (x, y)  ->  a >= x AND (a > x OR (a = x AND b > y)).
+    """
+    condition = None
+    for field, value in reversed(list(zip(ordering, position))):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        after = Q(**{f'{name}__{lookup}': value})
+        condition = after if condition is None else after | (Q(**{name: value}) & condition)
+
+    if len(ordering) > 1:
+        # Отдельное условие по первому полю даёт диапазонный поиск по индексу
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        condition = Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & condition
+    return condition
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация по (created_at, id).
+
+    Страница выбирается условием WHERE по значениям последней строки
+    предыдущей страницы, поэтому стоимость запроса не зависит от её номера.
+    Представление может задать свой порядок через атрибут keyset_ordering.
+    """
+    ordering = ('created_at', 'id')
+    page_size = api_settings.PAGE_SIZE or 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            position = decode_cursor(token, self.ordering, queryset.model)
+            if position is None:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(keyset_filter(self.ordering, position))
+
+        # Лишняя строка показывает, есть ли следующая страница
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        self.next_position = get_position(results[-1], self.ordering) if self.has_next else None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from .models import ProjectParticipant
+from .membership import is_project_member
 
 class IsProjectParticipantOrCreator(permissions.BasePermission):
     """
@@ -7,10 +7,7 @@ class IsProjectParticipantOrCreator(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        if request.user == obj.creator:
-            return True
-
-        return ProjectParticipant.objects.filter(project=obj, user=request.user).exists()
+        return is_project_member(request.user, obj.pk)
 
 class IsTaskProjectParticipant(permissions.BasePermission):
     """
@@ -18,8 +15,4 @@ class IsTaskProjectParticipant(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        project = obj.project
-        if request.user == project.creator:
-            return True
-
-        return ProjectParticipant.objects.filter(project=project, user=request.user).exists()
+        return is_project_member(request.user, obj.project_id)
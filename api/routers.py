@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import connections
+
+WRITER = 'default'
+READER = 'replica'
+
+
+class ReadReplicaRouter:
+    """
+    Чтение — через соединение READER, запись — через WRITER.
+
+    Оба смотрят в один файл SQLite в режиме WAL, поэтому отставания нет:
+    читатель видит всё зафиксированное. Внутри транзакции на WRITER чтение
+    остаётся на нём же — только так видны собственные незафиксированные
+    изменения (и так же работают тесты: TestCase держит транзакцию открытой).
+    """
+
+    def db_for_read(self, model, **hints):
+        if READER not in settings.DATABASES or connections[WRITER].in_atomic_block:
+            return WRITER
+        return READER
+
+    def db_for_write(self, model, **hints):
+        return WRITER
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Объекты, прочитанные через READER, — те же строки, что и на WRITER
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == WRITER
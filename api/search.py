@@ -0,0 +1,209 @@
+"""
+Полнотекстовый поиск задач по названию, описанию и комментариям
+и автодополнение пользователей.
+
+В SQLite используются таблицы FTS5 task_search (миграция 0011) и user_search
+(миграция 0012), которые поддерживают триггеры. На других СУБД таблиц нет,
+и поиск сводится к icontains без ранжирования.
+"""
+import html
+import re
+import string
+import sys
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+
+from .models import CustomUser, Task
+
+SEARCH_TABLE = 'task_search'
+# Веса bm25 для колонок title, description, comments
+WEIGHTS = (10.0, 4.0, 1.0)
+MAX_TERMS = 16
+
+# Маркеры подсветки из FTS5: текст экранируется целиком, затем маркеры заменяются на <mark>
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+_WORD_RE = re.compile(r'\w+')
+
+USER_SEARCH_TABLE = 'user_search'
+AUTOCOMPLETE_LIMIT = 20
+AUTOCOMPLETE_FIELDS = ('username', 'email', 'group')
+# Триграммный индекс ищет подстроки не короче трёх символов
+TRIGRAM_MIN_LENGTH = 3
+# lower() в SQLite меняет регистр только у ASCII — префикс готовим так же
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+REBUILD_SQL = [
+    f'DELETE FROM {SEARCH_TABLE}',
+    f"""
+    INSERT INTO {SEARCH_TABLE} (rowid, title, description, comments, project_id)
+    SELECT t.id, t.title, t.description,
+           coalesce((SELECT group_concat(c.content, ' ') FROM api_comment c WHERE c.task_id = t.id), ''),
+           t.project_id
+    FROM api_task t
+    """,
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')",
+]
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Запрос пользователя -> выражение FTS5 MATCH: все слова должны встретиться,
+    каждое ищется как префикс. Операторы FTS5 из ввода не пропускаются.
+    """
+    words = _WORD_RE.findall(text or '')[:MAX_TERMS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _highlight(value):
+    return html.escape(value or '').replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+
+def filter_tasks_by_text(queryset, text):
+    """Оставляет в queryset задачи, подходящие под поисковый запрос (без ранжирования)."""
+    match = build_match_query(text)
+    if not match or not fts_available():
+        return queryset.filter(
+            Q(title__icontains=text) | Q(description__icontains=text) | Q(comments__content__icontains=text)
+        ).distinct()
+    return queryset.filter(id__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [match]))
+
+
+def search_tasks(text, project_ids, limit=20, offset=0):
+    """
+    Ранжированный поиск задач в проектах project_ids.
+
+    Возвращает словари с полями id, project, project_title, title, status,
+    title_highlight и snippet (HTML: текст экранирован, совпадения в <mark>), rank.
+    """
+    match = build_match_query(text)
+    project_ids = list(project_ids)
+    if not match or not project_ids:
+        return []
+    if not fts_available():
+        return _search_tasks_fallback(text, project_ids, limit, offset)
+
+    placeholders = ', '.join(['%s'] * len(project_ids))
+    weights = ', '.join(map(str, WEIGHTS))
+    sql = f"""
+        SELECT t.id, t.project_id, p.title, t.title, t.status,
+               highlight({SEARCH_TABLE}, 0, %s, %s),
+               snippet({SEARCH_TABLE}, -1, %s, %s, '…', 16),
+               bm25({SEARCH_TABLE}, {weights}) AS rank
+        FROM {SEARCH_TABLE}
+        JOIN api_task t ON t.id = {SEARCH_TABLE}.rowid
+        JOIN api_project p ON p.id = t.project_id
+        WHERE {SEARCH_TABLE} MATCH %s AND {SEARCH_TABLE}.project_id IN ({placeholders})
+        ORDER BY rank
+        LIMIT %s OFFSET %s
+    """
+    params = [_MARK_OPEN, _MARK_CLOSE, _MARK_OPEN, _MARK_CLOSE, match, *project_ids, limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'id': task_id,
+            'project': project_id,
+            'project_title': project_title,
+            'title': title,
+            'status': status,
+            'title_highlight': _highlight(title_highlight),
+            'snippet': _highlight(snippet),
+            'rank': rank,
+        }
+        for task_id, project_id, project_title, title, status, title_highlight, snippet, rank in rows
+    ]
+
+
+def _search_tasks_fallback(text, project_ids, limit, offset):
+    tasks = filter_tasks_by_text(Task.objects.filter(project_id__in=project_ids), text)
+    rows = tasks.order_by('-updated_at', 'id').values('id', 'project_id', 'project__title', 'title', 'status')
+    return [
+        {
+            'id': row['id'],
+            'project': row['project_id'],
+            'project_title': row['project__title'],
+            'title': row['title'],
+            'status': row['status'],
+            'title_highlight': html.escape(row['title']),
+            'snippet': '',
+            'rank': None,
+        }
+        for row in rows[offset:offset + limit]
+    ]
+
+
+def rebuild_index():
+    """Перестраивает индекс с нуля. Возвращает число проиндексированных задач."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        for statement in REBUILD_SQL:
+            cursor.execute(statement)
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def _prefix_range(prefix):
+    """
+    Границы [low, high) строк, начинающихся с prefix, — диапазон по индексу.
+    Последний символ prefix, равный максимальной кодовой точке, увеличить нельзя:
+    он отбрасывается, и верхней границей становится следующая строка для остатка.
+    None — верхней границы нет (prefix из одних таких символов).
+    """
+    stripped = prefix.rstrip(chr(sys.maxunicode))
+    if not stripped:
+        return prefix, None
+    return prefix, stripped[:-1] + chr(ord(stripped[-1]) + 1)
+
+
+def search_users(term, queryset=None, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Пользователи для автодополнения, не более limit.
+
+    Сначала — совпадения по началу username, email и группы (диапазон по
+    индексам lower(...), уже отсортированный), затем — по подстроке через
+    триграммный индекс user_search. Каждый запрос ограничен limit, поэтому
+    стоимость не зависит от числа пользователей.
+    """
+    term = (term or '').strip()
+    if not term:
+        return []
+    if queryset is None:
+        queryset = CustomUser.objects.all()
+    columns = ('id', 'username', 'group', 'role')
+
+    prefix = term.translate(_ASCII_LOWER) if fts_available() else term.lower()
+    low, high = _prefix_range(prefix)
+    found = {}
+    for field in AUTOCOMPLETE_FIELDS:
+        if len(found) >= limit:
+            break
+        rows = (
+            queryset.exclude(pk__in=list(found)).alias(key=Lower(field))
+            .filter(key__gte=low, **({'key__lt': high} if high is not None else {}))
+            .order_by('key').values(*columns)[:limit - len(found)]
+        )
+        found.update((row['id'], row) for row in rows)
+
+    if len(found) < limit and len(term) >= TRIGRAM_MIN_LENGTH:
+        rest = queryset.exclude(pk__in=list(found))
+        if fts_available():
+            # FTS5 отдаёт совпадения по возрастанию rowid и останавливается на LIMIT;
+            # запас покрывает строки, которые отсеет queryset (уже участники проекта)
+            match = '"' + term.replace('"', '""') + '"'
+            rest = rest.filter(id__in=RawSQL(
+                f'SELECT rowid FROM {USER_SEARCH_TABLE} WHERE {USER_SEARCH_TABLE} MATCH %s LIMIT %s',
+                [match, limit * 5],
+            ))
+        else:
+            rest = rest.filter(Q(username__icontains=term) | Q(email__icontains=term) | Q(group__icontains=term))
+        found.update((row['id'], row) for row in rest.order_by('username').values(*columns)[:limit - len(found)])
+
+    return list(found.values())
@@ -1,30 +1,153 @@
 from rest_framework import serializers
-from django.core.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from django.urls import reverse
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.contrib.auth.password_validation import validate_password
 
-from .models import CustomUser, Project, ProjectParticipant, Task, Comment, FileAttachment
+from .models import CustomUser, Project, ProjectParticipant, Task, Comment, FileAttachment, DeletedObject, UploadSession, Job
+from .instrumentation import timed
+from .membership import is_participant, is_project_member
+from .uploads import attach_file, chunk_max_size
+
+def _split_param(request, name):
+    value = request.query_params.get(name) if request is not None else None
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+# Время сериализации в Server-Timing и логе запросов (api/instrumentation.py)
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed('ser'):
+            return super().data
+
+class TimedSerializerMixin:
+    """Добавляет время serializer.data к метрике 'ser', в том числе для many=True."""
+
+    @property
+    def data(self):
+        with timed('ser'):
+            return super().data
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        # Свой list_serializer_class в Meta не подменяется
+        if type(serializer) is serializers.ListSerializer:
+            serializer.__class__ = TimedListSerializer
+        return serializer
+
+# Выборочные поля и раскрытие связей
+class DynamicFieldsMixin:
+    """
+    ?fields=id,title — оставляет в ответе только перечисленные поля (для GET).
+    ?expand=assignee — выводит связь из expandable_fields вложенным объектом
+    вместо первичного ключа.
+    """
+    # {'поле': класс вложенного сериализатора}
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Параметры запроса читает только корневой сериализатор (или child у many=True),
+        # вложенным сериализаторам контекст в конструктор не передаётся
+        request = kwargs.get('context', {}).get('request')
+        self._expand = self.get_expand(request)
+
+        fields = self.get_sparse_fields(request)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def get_sparse_fields(cls, request):
+        if request is None or request.method not in SAFE_METHODS:
+            return []
+        return [name for name in _split_param(request, 'fields') if name in cls.Meta.fields]
+
+    @classmethod
+    def get_expand(cls, request):
+        return [name for name in _split_param(request, 'expand') if name in cls.expandable_fields]
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request, required=()):
+        """
+        Подгружает раскрываемые связи через select_related и ограничивает
+        SELECT запрошенными полями через only(). required — поля, которые
+        нужны представлению помимо сериализатора (например, для сортировки).
+        """
+        expand = cls.get_expand(request)
+        fields = cls.get_sparse_fields(request)
+        if fields:
+            expand = [name for name in expand if name in fields]
+        if expand:
+            queryset = queryset.select_related(*expand)
+        if not fields:
+            return queryset
+
+        model = cls.Meta.model
+        load = {'pk', *required}
+        for name in fields:
+            source = cls._declared_fields[name].source if name in cls._declared_fields else name
+            source = source or name
+            try:
+                field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                load.add(source)
+            if name in expand:
+                nested = cls.expandable_fields[name].Meta
+                load.update(
+                    f'{source}__{nested_name}' for nested_name in nested.fields
+                    if nested_name in {f.name for f in nested.model._meta.concrete_fields}
+                )
+        return queryset.only(*load)
+
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        for name in self._expand:
+            if name in rep:
+                related = getattr(instance, name)
+                rep[name] = self._get_expanded_serializer(name).to_representation(related) if related else None
+        return rep
+
+    def _get_expanded_serializer(self, name):
+        # Вложенный сериализатор создаётся один раз на список, а не на каждую строку
+        cache = self.__dict__.setdefault('_expanded_serializers', {})
+        if name not in cache:
+            cache[name] = self.expandable_fields[name]()
+        return cache[name]
 
 # Пользователь
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['id', 'username', 'email', 'role', 'group']
 
 # Проект
-class ProjectSerializer(serializers.ModelSerializer):
-    creator = CustomUserSerializer(read_only=True)
+class ProjectSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
+    creator = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    expandable_fields = {
+        'creator': CustomUserSerializer,
+    }
 
     class Meta:
         model = Project
-        fields = ['id', 'title', 'description', 'creator', 'start_date', 'end_date', 'status', 'created_at']
+        fields = ['id', 'title', 'description', 'creator', 'start_date', 'end_date', 'status', 'created_at', 'updated_at']
 
 # Участник проекта
-class ProjectParticipantSerializer(serializers.ModelSerializer):
+class ProjectParticipantSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all())
 
+    expandable_fields = {
+        'user': CustomUserSerializer,
+        'project': ProjectSerializer,
+    }
+
     class Meta:
         model = ProjectParticipant
-        fields = ['id', 'project', 'user', 'role']
+        fields = ['id', 'project', 'user', 'role', 'updated_at']
         extra_kwargs = {
             'project': {'required': False},
         }
@@ -40,61 +163,135 @@ class ProjectParticipantSerializer(serializers.ModelSerializer):
 
         return data
 
-    def to_representation(self, instance):
-        rep = super().to_representation(instance)
-        user = instance.user
-        rep['user'] = {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'role': user.role,
-            'group': user.group,
-        }
-        return rep
-
 # Задача
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(TimedSerializerMixin, DynamicFieldsMixin, serializers.ModelSerializer):
     assignee = serializers.PrimaryKeyRelatedField(queryset=CustomUser.objects.all(), allow_null=True)
     project = serializers.PrimaryKeyRelatedField(queryset=Project.objects.all())
 
+    expandable_fields = {
+        'assignee': CustomUserSerializer,
+        'project': ProjectSerializer,
+    }
+
     class Meta:
         model = Task
-        fields = ['id', 'title', 'description', 'project', 'assignee', 'status', 'due_date', 'created_at']
+        fields = ['id', 'title', 'description', 'project', 'assignee', 'status', 'due_date', 'created_at', 'updated_at']
 
     def validate(self, data):
         request = self.context['request']
         user = request.user
-        project = data.get('project')
+        project = data.get('project') or getattr(self.instance, 'project_id', None)
 
         # 1. Проверяем, имеет ли право пользователь создавать задачи в этом проекте
-        is_creator = (project.creator == user)
-        is_participant = ProjectParticipant.objects.filter(project=project, user=user).exists()
-
-        if not (is_creator or is_participant):
+        if not is_project_member(user, project):
             raise serializers.ValidationError("Вы не являетесь участником проекта.")
 
         # 2. Проверяем, что assignee — участник того же проекта
         assignee = data.get('assignee')
-        if assignee and not ProjectParticipant.objects.filter(project=project, user=assignee).exists():
+        if assignee and not is_participant(assignee, project):
             raise serializers.ValidationError("Назначенный пользователь не состоит в проекте.")
 
         return data
 
+# Элемент пакетной операции над задачами
+class TaskBulkItemSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Поля задачи для /api/tasks/bulk/. Связи принимаются как id без запроса
+    к БД на каждый элемент — членство проверяется в TaskBulkView сразу для всего пакета.
+    """
+    project = serializers.IntegerField(source='project_id')
+    assignee = serializers.IntegerField(source='assignee_id', allow_null=True, required=False)
+
+    class Meta:
+        model = Task
+        fields = ['title', 'description', 'project', 'assignee', 'status', 'due_date']
+
 # Комментарий
-class CommentSerializer(serializers.ModelSerializer):
-    user = CustomUserSerializer(read_only=True)
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    author = serializers.PrimaryKeyRelatedField(read_only=True)
 
     class Meta:
         model = Comment
-        fields = ['id', 'task', 'user', 'content', 'created_at']
+        fields = ['id', 'task', 'author', 'content', 'created_at', 'updated_at']
+
+    def validate_task(self, task):
+        if not is_project_member(self.context['request'].user, task.project_id):
+            raise serializers.ValidationError("Вы не являетесь участником проекта.")
+        return task
+
+# Запись журнала удалений (для /api/sync/)
+class DeletedObjectSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    type = serializers.CharField(source='kind')
+    id = serializers.IntegerField(source='object_id')
+    project = serializers.IntegerField(source='project_id')
+
+    class Meta:
+        model = DeletedObject
+        fields = ['type', 'id', 'project', 'deleted_at']
 
 # Прикрепленный файл
-class FileAttachmentSerializer(serializers.ModelSerializer):
-    user = CustomUserSerializer(read_only=True)
+class FileAttachmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    uploaded_by = CustomUserSerializer(read_only=True)
+    sha256 = serializers.CharField(source='blob.sha256', read_only=True, default=None)
+    size = serializers.IntegerField(source='blob.size', read_only=True, default=None)
+    download_url = serializers.SerializerMethodField()
 
     class Meta:
         model = FileAttachment
-        fields = ['id', 'file', 'user', 'uploaded_at', 'project', 'task']
+        fields = ['id', 'file', 'filename', 'sha256', 'size', 'download_url', 'uploaded_by', 'uploaded_at', 'task']
+        read_only_fields = ['filename']
+        # Ссылка на MEDIA_URL не раздаётся: файлы отдаёт только FileDownloadView
+        extra_kwargs = {'file': {'write_only': True}}
+
+    def get_download_url(self, attachment):
+        url = reverse('api-file-download', args=[attachment.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def validate_task(self, task):
+        if not is_project_member(self.context['request'].user, task.project_id):
+            raise serializers.ValidationError("Вы не являетесь участником проекта.")
+        return task
+
+    def create(self, validated_data):
+        # Содержимое сохраняется один раз на все одинаковые файлы (api/uploads.py)
+        return attach_file(validated_data['task'], validated_data['uploaded_by'], validated_data['file'])
+
+# Загрузка файла по частям
+class UploadSessionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    chunk_max_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'task', 'filename', 'size', 'received', 'chunk_max_size', 'created_at']
+        read_only_fields = ['received', 'created_at']
+
+    def get_chunk_max_size(self, session):
+        return chunk_max_size()
+
+    def validate_size(self, size):
+        if size <= 0:
+            raise serializers.ValidationError("Размер файла должен быть больше нуля.")
+        return size
+
+    def validate_task(self, task):
+        if not is_project_member(self.context['request'].user, task.project_id):
+            raise serializers.ValidationError("Вы не являетесь участником проекта.")
+        return task
+
+# Фоновая задача
+class JobSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        # Трассировка ошибки (last_error) видна только в админке
+        fields = ['id', 'name', 'status', 'attempts', 'result', 'created_at', 'started_at', 'finished_at', 'url']
+
+    def get_url(self, job):
+        url = reverse('api-job-detail', args=[job.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
 
 # Регистрация пользователя
 class RegisterSerializer(serializers.ModelSerializer):
@@ -0,0 +1,257 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import events
+from .authentication import invalidate_token, invalidate_user_tokens
+from .generations import bump_generation
+from .jobs import enqueue
+from .membership import invalidate_membership
+from .models import CustomUser, Project, ProjectParticipant, Task, Comment, FileAttachment, DeletedObject
+
+
+# Кэш членства в проектах
+_UNKNOWN = object()
+
+
+def _owner_field(sender):
+    return 'creator_id' if sender is Project else 'user_id'
+
+
+@receiver(post_init, sender=Project)
+@receiver(post_init, sender=ProjectParticipant)
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=ProjectParticipant)
+def remember_loaded_owner(sender, instance, **kwargs):
+    # Через __dict__: отложенное поле (only/defer) не загружается, а остаётся неизвестным
+    instance._loaded_owner_id = instance.__dict__.get(_owner_field(sender), _UNKNOWN)
+
+
+@receiver(pre_save, sender=Project)
+@receiver(pre_save, sender=ProjectParticipant)
+def remember_previous_owner(sender, instance, **kwargs):
+    # Запоминаем прежнего создателя/участника, чтобы сбросить и его кэш. Для строки,
+    # прочитанной из БД, он известен с загрузки; запрос нужен только объекту,
+    # созданному в коде с уже существующим pk, или если поле было отложено
+    field = _owner_field(sender)
+    loaded = _UNKNOWN if instance._state.adding else instance._loaded_owner_id
+    if loaded is _UNKNOWN:
+        loaded = None
+        if instance.pk:
+            loaded = sender._base_manager.filter(pk=instance.pk).values_list(field, flat=True).first()
+    instance._previous_owner_id = loaded if loaded != getattr(instance, field) else None
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def invalidate_creator_membership(sender, instance, **kwargs):
+    invalidate_membership(instance.creator_id, getattr(instance, '_previous_owner_id', None))
+
+
+@receiver(post_save, sender=ProjectParticipant)
+@receiver(post_delete, sender=ProjectParticipant)
+def invalidate_participant_membership(sender, instance, **kwargs):
+    invalidate_membership(instance.user_id, getattr(instance, '_previous_owner_id', None))
+
+
+# Поколения проектов для кэша фрагментов (api/generations.py). bulk_create/bulk_update
+# сигналов не отправляют — TaskBulkView и импорт увеличивают поколение сами
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def bump_project_generation(sender, instance, **kwargs):
+    bump_generation(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=ProjectParticipant)
+@receiver(post_delete, sender=ProjectParticipant)
+def bump_related_project_generation(sender, instance, **kwargs):
+    bump_generation(instance.project_id)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=FileAttachment)
+@receiver(post_delete, sender=FileAttachment)
+def bump_task_project_generation(sender, instance, origin=None, **kwargs):
+    bump_generation(_task_project_id(sender, instance, origin))
+
+
+# Кэш токенов API (api/authentication.py)
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_saved_user_tokens(sender, instance, update_fields=None, **kwargs):
+    # Вход через сессию обновляет только last_login — кэш токенов от этого не устаревает
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidate_user_tokens(instance.pk)
+
+
+# Журнал удалений для /api/sync/. Содержимое проекта, уже отмеченного удалённым
+# (api/deletion.py), удаляется без записей и событий по строкам: клиенты получили
+# запись о проекте целиком и событие RESET
+_quiet_deletion = ContextVar('quiet_deletion', default=False)
+
+
+@contextmanager
+def without_deletion_log():
+    token = _quiet_deletion.set(True)
+    try:
+        yield
+    finally:
+        _quiet_deletion.reset(token)
+
+
+@receiver(post_delete, sender=Task)
+def log_task_deletion(sender, instance, origin=None, **kwargs):
+    _log_deletion(origin, DeletedObject(
+        kind=DeletedObject.Kind.TASK, object_id=instance.pk, project_id=instance.project_id,
+    ))
+
+
+@receiver(post_delete, sender=Comment)
+def log_comment_deletion(sender, instance, origin=None, **kwargs):
+    project_id = _task_project_id(sender, instance, origin)
+    if project_id is not None:
+        _log_deletion(origin, DeletedObject(
+            kind=DeletedObject.Kind.COMMENT, object_id=instance.pk, project_id=project_id,
+        ))
+
+
+@receiver(post_delete, sender=ProjectParticipant)
+def log_participant_deletion(sender, instance, origin=None, **kwargs):
+    # user_id нужен, чтобы сам исключённый участник узнал о потере доступа к проекту
+    _log_deletion(origin, DeletedObject(
+        kind=DeletedObject.Kind.PARTICIPANT, object_id=instance.pk,
+        project_id=instance.project_id, user_id=instance.user_id,
+    ))
+
+
+# События доски проекта (SSE). bulk_create/bulk_update сигналов не отправляют —
+# TaskBulkView и импорт публикуют события сами
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, **kwargs):
+    events.publish_task(instance, created=created)
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    if _quiet_deletion.get():
+        return
+    events.publish(instance.project_id, events.TASK_DELETED, {'id': instance.pk})
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_created(sender, instance, created, **kwargs):
+    if created:
+        events.publish_comment(instance)
+
+
+# Фоновые задачи (api/jobs.py)
+@receiver(post_delete, sender=FileAttachment)
+def collect_unused_blob(sender, instance, **kwargs):
+    # Содержимое удаляется с задержкой: его ещё может подхватить идущая загрузка того же файла
+    if instance.blob_id is not None:
+        enqueue(
+            'files.collect_blob', {'blob_id': instance.blob_id},
+            dedup_key=f'blob:{instance.blob_id}', delay=timedelta(minutes=10), priority=-5,
+        )
+    elif instance.file:
+        # Файл, загруженный до FileBlob, принадлежит только этому вложению
+        name, storage = instance.file.name, instance.file.storage
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+
+# Каскадное удаление. Collector сначала отправляет pre_delete для всех удаляемых
+# строк, затем удаляет модели от зависимых к origin (объекту или QuerySet, с
+# которого начато удаление) и отправляет post_delete. Состояние удаления хранится
+# на origin: проекты задач, известные из pre_delete, — чтобы не искать проект
+# для каждого комментария и вложения, — и записи журнала удалений, которые
+# сохраняются одним bulk_create после post_delete последней строки модели origin.
+# Если порядок моделей другой (циклические связи), записи пишутся сразу
+_ORIGIN_MODELS = (CustomUser, Project, Task, Comment, ProjectParticipant)
+
+
+def _origin_model(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model
+    return type(origin) if origin is not None else None
+
+
+def _scope(origin):
+    scope = getattr(origin, '_deletion_scope', None)
+    if scope is None and _origin_model(origin) in _ORIGIN_MODELS:
+        scope = {'pending': 0, 'projects': {}, 'log': []}
+        origin._deletion_scope = scope
+    return scope
+
+
+def _task_project_id(sender, instance, origin):
+    """Проект задачи комментария или вложения; задача при каскадном удалении ещё не удалена."""
+    if sender.task.is_cached(instance):
+        return instance.task.project_id
+    if isinstance(origin, Project):
+        return origin.pk
+    if isinstance(origin, Task) and origin.pk == instance.task_id:
+        return origin.project_id
+    scope = getattr(origin, '_deletion_scope', None)
+    projects = scope['projects'] if scope is not None else {}
+    if instance.task_id not in projects:
+        projects[instance.task_id] = (
+            Task.objects.filter(pk=instance.task_id).values_list('project_id', flat=True).first()
+        )
+    return projects[instance.task_id]
+
+
+def _log_deletion(origin, entry):
+    if _quiet_deletion.get():
+        return
+    scope = getattr(origin, '_deletion_scope', None)
+    if scope is not None and scope['pending'] > 0:
+        scope['log'].append(entry)
+    else:
+        entry.save()
+
+
+@receiver(pre_delete, sender=CustomUser)
+@receiver(pre_delete, sender=Project)
+@receiver(pre_delete, sender=Task)
+@receiver(pre_delete, sender=Comment)
+@receiver(pre_delete, sender=ProjectParticipant)
+def start_deletion(sender, instance, origin=None, **kwargs):
+    scope = _scope(origin)
+    if scope is None:
+        return
+    if sender is _origin_model(origin):
+        scope['pending'] += 1
+    if sender is Task:
+        scope['projects'][instance.pk] = instance.project_id
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=ProjectParticipant)
+def finish_deletion(sender, instance, origin=None, **kwargs):
+    # Подключён последним: журнал записывается после всех обработчиков этой строки
+    scope = getattr(origin, '_deletion_scope', None)
+    if scope is None or sender is not _origin_model(origin):
+        return
+    scope['pending'] -= 1
+    if scope['pending'] <= 0:
+        del origin._deletion_scope
+        if scope['log']:
+            DeletedObject.objects.bulk_create(scope['log'])
@@ -0,0 +1,54 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..fragments import get_fragment, set_fragment
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, projects, vary, timeout):
+        self.nodelist = nodelist
+        self.name = name
+        self.projects = projects
+        self.vary = vary
+        self.timeout = timeout
+
+    def render(self, context):
+        projects = self.projects.resolve(context)
+        project_ids = [projects] if isinstance(projects, (int, str)) else list(projects)
+        vary = [value.resolve(context) for value in self.vary]
+        key, content = get_fragment(self.name.resolve(context), project_ids, vary)
+        if content is None:
+            content = self.nodelist.render(context)
+            timeout = self.timeout.resolve(context) if self.timeout is not None else None
+            set_fragment(key, content, timeout)
+        return mark_safe(content)
+
+
+@register.tag('fragment')
+def do_fragment(parser, token):
+    """
+    Кэширует содержимое блока до изменения проектов (api/fragments.py):
+
+        {% fragment "board" project.pk %}...{% endfragment %}
+        {% fragment "dashboard" project_ids user.pk today timeout=600 %}...{% endfragment %}
+
+    Второй аргумент — id проекта или список id; остальные — значения,
+    от которых ещё зависит HTML блока. timeout по умолчанию — FRAGMENT_CACHE_TIMEOUT.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' требует имя фрагмента и проект(ы)")
+    timeout = None
+    if bits[-1].startswith('timeout='):
+        timeout = parser.compile_filter(bits.pop()[len('timeout='):])
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+        timeout,
+    )
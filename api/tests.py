@@ -1,3 +1,1567 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, router, transaction
+from django.db.utils import ConnectionHandler
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from . import async_views, events, membership, metrics
+from .authentication import token_cache
+from .deletion import delete_project, purge_project
+from .exports import aiter_chunks, stream_csv
+from .imports import import_rows, read_rows
+from .forms import TaskForm
+from .fragments import fragment_stats
+from .instrumentation import timed
+from .jobs import _finish, claim, enqueue, execute, job, requeue_expired, retry_delay
+from .membership import ais_project_member, invalidate_membership, is_project_member
+from .models import (
+    Comment, CustomUser, DeletedObject, FileAttachment, FileBlob, Job, Project, ProjectEvent, ProjectParticipant,
+    Task, UploadSession,
+)
+from .pagination import encode_cursor
+from .search import _prefix_range, build_match_query, search_tasks, search_users
+from .serializers import ProjectSerializer, TaskSerializer, TimedListSerializer
+from .uploads import collect_blob, complete_upload
+from .views import (
+    FileDownloadView, ProjectExportView, SyncView, TaskDetailView, get_board, get_dashboard_projects, get_etag,
+)
+
+
+class FastListParityTests(TestCase):
+    """Быстрый путь списков (api/fastpath.py) даёт тот же вывод, что и сериализаторы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='Описание', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        ProjectParticipant.objects.create(project=cls.project, user=cls.student)
+        for i in range(7):
+            Task.objects.create(
+                project=cls.project,
+                title=f'Задача {i}',
+                description='' if i % 2 else 'Описание задачи',
+                assignee=cls.student if i % 3 else None,
+                status=Task.Status.values[i % 3],
+                due_date=date(2025, 10, 1) + timedelta(days=i) if i % 2 else None,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def serialize(self, serializer_class, queryset, query=''):
+        request = Request(APIRequestFactory().get('/' + query))
+        return serializer_class(queryset.order_by('created_at', 'id'), many=True, context={'request': request}).data
+
+    def test_task_list_matches_serializer(self):
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.json()['results'], self.serialize(TaskSerializer, Task.objects.all()))
+
+    def test_task_list_with_sparse_fields_matches_serializer(self):
+        query = '?fields=id,title,status,assignee,due_date'
+        response = self.client.get('/api/tasks/' + query)
+        self.assertEqual(response.json()['results'], self.serialize(TaskSerializer, Task.objects.all(), query))
+
+    def test_project_list_matches_serializer(self):
+        response = self.client.get('/api/projects/')
+        self.assertEqual(response.json()['results'], self.serialize(ProjectSerializer, Project.objects.all()))
+
+    def test_paginated_walk_matches_serializer(self):
+        results, url = [], '/api/tasks/?page_size=3'
+        while url:
+            page = self.client.get(url).json()
+            results.extend(page['results'])
+            url = page['next']
+        self.assertEqual(results, self.serialize(TaskSerializer, Task.objects.all()))
+
+
+class CursorValidationTests(TestCase):
+    """Подделанный курсор даёт 404 «Неверный курсор», а не ошибку сервера."""
+
+    BAD_CURSORS = [
+        ['abc', 1],
+        [{'a': 1}, 1],
+        [None, None],
+        ['2025-09-01T00:00:00+00:00', 'x'],
+        ['2025-09-01T00:00:00+00:00', 2 ** 70],
+        [True, 1],
+        [[1], 1],
+        [1, 1],
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        Task.objects.create(project=cls.project, title='Задача')
+
+    @staticmethod
+    def token(values):
+        return encode_cursor(values)
+
+    def test_task_list_rejects_bad_cursors(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for values in self.BAD_CURSORS + ['%%%', 'W10']:
+            token = values if isinstance(values, str) else self.token(values)
+            with self.subTest(values=values):
+                response = client.get('/api/tasks/', {'cursor': token})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'detail': 'Неверный курсор.'})
+
+    def test_async_task_list_rejects_bad_cursors(self):
+        token = Token.objects.create(user=self.user)
+        for values in self.BAD_CURSORS:
+            with self.subTest(values=values):
+                response = self.client.get(
+                    '/api/async/tasks/', {'cursor': self.token(values)},
+                    HTTP_AUTHORIZATION=f'Token {token.key}',
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_board_column_rejects_bad_cursors(self):
+        self.client.force_login(self.user)
+        for values in self.BAD_CURSORS:
+            with self.subTest(values=values):
+                response = self.client.get(
+                    f'/projects/{self.project.pk}/board/{Task.Status.TODO}/', {'cursor': self.token(values)},
+                )
+                self.assertEqual(response.status_code, 404)
+
+    def test_valid_cursor_still_pages(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        task = Task.objects.get()
+        response = client.get('/api/tasks/', {'cursor': self.token([task.created_at - timedelta(seconds=1), 0])})
+        self.assertEqual([item['id'] for item in response.json()['results']], [task.pk])
+
+
+class BoardQueryTests(TestCase):
+    """Доска проекта строится за постоянное число запросов при любом числе задач."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.students = [CustomUser.objects.create_user(f'student{i}', password='password123') for i in range(3)]
+        cls.small = cls.create_project('Маленький', tasks=3)
+        cls.large = cls.create_project('Большой', tasks=130)
+
+    @classmethod
+    def create_project(cls, title, tasks):
+        project = Project.objects.create(
+            title=title, description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        for student in cls.students:
+            ProjectParticipant.objects.create(project=project, user=student)
+        Task.objects.bulk_create([
+            Task(
+                project=project, title=f'Задача {i}',
+                status=Task.Status.TODO if i % 5 else Task.Status.DONE,
+                assignee=cls.students[i % len(cls.students)],
+            )
+            for i in range(tasks)
+        ])
+        return project
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # Прогрев кэша членства, чтобы сравнивались только запросы самой доски;
+        # кэш фрагментов, наоборот, сбрасываем, чтобы доска строилась заново
+        self.client.get(f'/projects/{self.small.pk}/view/')
+        caches[settings.FRAGMENT_CACHE_ALIAS].clear()
+
+    def test_board_is_one_query(self):
+        with self.assertNumQueries(1):
+            columns = get_board(self.large)
+            # Исполнители уже загружены select_related
+            [task.assignee.username for column in columns for task in column['tasks']]
+
+    def test_page_query_count_does_not_depend_on_project_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(f'/projects/{self.small.pk}/view/')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(f'/projects/{self.large.pk}/view/')
+        self.assertEqual(len(small), len(large))
+        self.assertContains(response, 'data-board-more')
+
+    def test_columns_are_capped_and_counted(self):
+        columns = {column['status']: column for column in get_board(self.large, limit=50)}
+        todo = columns[Task.Status.TODO]
+        self.assertEqual(todo['total'], 104)
+        self.assertEqual(len(todo['tasks']), 50)
+        self.assertIsNotNone(todo['cursor'])
+        self.assertEqual(columns[Task.Status.DONE]['total'], 26)
+        self.assertIsNone(columns[Task.Status.DONE]['cursor'])
+        self.assertEqual(columns[Task.Status.IN_PROGRESS]['tasks'], [])
+
+    def test_column_pages_cover_whole_column(self):
+        column = next(column for column in get_board(self.large) if column['status'] == Task.Status.TODO)
+        ids = [task.pk for task in column['tasks']]
+        cursor = column['cursor']
+        while cursor:
+            response = self.client.get(
+                f'/projects/{self.large.pk}/board/{Task.Status.TODO}/', {'cursor': cursor},
+            )
+            page = response.context['column']
+            ids.extend(task.pk for task in page['tasks'])
+            cursor = page['cursor']
+
+        expected = Task.objects.filter(project=self.large, status=Task.Status.TODO).order_by('created_at', 'id')
+        self.assertEqual(ids, list(expected.values_list('pk', flat=True)))
+
+
+class FragmentCacheTests(TestCase):
+    """Фрагменты доски общие для пользователей и сбрасываются сменой поколения проекта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        ProjectParticipant.objects.create(project=cls.project, user=cls.student)
+        cls.task = Task.objects.create(project=cls.project, title='Задача', assignee=cls.user)
+
+    def setUp(self):
+        caches[settings.FRAGMENT_CACHE_ALIAS].clear()
+        fragment_stats.reset()
+        self.url = f'/projects/{self.project.pk}/view/'
+
+    def board_stats(self):
+        return fragment_stats.stats()['fragments']['project-board']
+
+    def test_repeat_render_is_cache_hit(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(self.url)
+        with CaptureQueriesContext(connection) as second:
+            response = self.client.get(self.url)
+        self.assertContains(response, 'Задача')
+        self.assertEqual((self.board_stats()['hits'], self.board_stats()['misses']), (1, 1))
+        self.assertLess(len(second), len(first))
+
+    def test_generation_bump_invalidates_fragment(self):
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+        self.task.title = 'Переименованная'
+        self.task.save()
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Переименованная')
+        self.assertEqual((self.board_stats()['hits'], self.board_stats()['misses']), (0, 2))
+
+    def test_task_controls_are_rendered_outside_fragment(self):
+        edit_url = f'/tasks/{self.task.pk}/edit/'
+        self.client.force_login(self.user)
+        self.client.get(self.url)
+        # Фрагмент автора проекта достаётся участнику, но кнопок правки в нём нет
+        self.client.force_login(self.student)
+        response = self.client.get(self.url)
+        self.assertEqual(self.board_stats()['hits'], 1)
+        self.assertNotContains(response, edit_url)
+        self.assertContains(response, '<template id="task-actions">')
+        self.assertContains(response, 'const canEditAll = false;')
+
+
+class DashboardTests(TestCase):
+    """Сводка дашборда — один агрегирующий запрос на все проекты пользователя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.busy = Project.objects.create(
+            title='С задачами', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        cls.empty = Project.objects.create(
+            title='Пустой', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        cls.today = date(2025, 10, 15)
+        past, future = cls.today - timedelta(days=1), cls.today + timedelta(days=1)
+        Task.objects.bulk_create([
+            Task(project=cls.busy, title='Просрочена', status=Task.Status.TODO, assignee=cls.user, due_date=past),
+            Task(project=cls.busy, title='Без срока', status=Task.Status.TODO, assignee=cls.user),
+            Task(project=cls.busy, title='В работе', status=Task.Status.IN_PROGRESS, assignee=cls.student,
+                 due_date=future),
+            Task(project=cls.busy, title='Готова', status=Task.Status.DONE, assignee=cls.user, due_date=past),
+        ])
+        cls.project_time = timezone.now() - timedelta(days=10)
+        cls.task_time = timezone.now() - timedelta(days=1)
+        Project.objects.filter(pk__in=[cls.busy.pk, cls.empty.pk]).update(updated_at=cls.project_time)
+        Task.objects.filter(project=cls.busy).update(updated_at=cls.project_time)
+        Task.objects.filter(project=cls.busy, title='В работе').update(updated_at=cls.task_time)
+
+    def test_summary_in_one_query(self):
+        with self.assertNumQueries(1):
+            projects = list(get_dashboard_projects(self.user, [self.busy.pk, self.empty.pk], self.today))
+
+        summary = [
+            (project.pk, project.todo_count, project.in_progress_count, project.done_count,
+             project.overdue_count, project.my_open_count, project.last_activity)
+            for project in projects
+        ]
+        self.assertEqual(summary, [
+            (self.busy.pk, 2, 1, 1, 1, 2, self.task_time),
+            # Проект без задач: нули, а последнее изменение — его собственное
+            (self.empty.pk, 0, 0, 0, 0, 0, self.project_time),
+        ])
+
+    def test_my_open_count_depends_on_user(self):
+        busy, = get_dashboard_projects(self.student, [self.busy.pk], self.today)
+        self.assertEqual((busy.my_open_count, busy.overdue_count), (1, 1))
+
+
+class ReadReplicaRouterTests(TransactionTestCase):
+    """Чтение вне транзакции — через replica, в транзакции и запись — через default."""
+    databases = {'default', 'replica'}
+
+    def test_routing(self):
+        user = CustomUser.objects.create_user('student', password='password123')
+        self.assertEqual(user._state.db, 'default')
+        self.assertEqual(router.db_for_write(Task), 'default')
+
+        replica_user = CustomUser.objects.get(pk=user.pk)
+        self.assertEqual(replica_user._state.db, 'replica')
+        with transaction.atomic():
+            # Внутри транзакции видны собственные незафиксированные изменения
+            CustomUser.objects.filter(pk=user.pk).update(group='ИВТ-21')
+            in_transaction = CustomUser.objects.get(pk=user.pk)
+            self.assertEqual((in_transaction._state.db, in_transaction.group), ('default', 'ИВТ-21'))
+
+        replica_user.group = 'ИВТ-22'
+        replica_user.save()
+        self.assertEqual(replica_user._state.db, 'default')
+        self.assertEqual(CustomUser.objects.get(pk=user.pk).group, 'ИВТ-22')
+
+    def test_replica_connection_is_read_only(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'db.sqlite3')
+        # Настройки соединений из settings, но на отдельном файле: тестовая replica — зеркало default
+        handler = ConnectionHandler({
+            alias: {**settings.DATABASES[alias], 'NAME': path} for alias in ('default', 'replica')
+        })
+        self.addCleanup(handler.close_all)
+        with handler['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE note (text TEXT)')
+            cursor.execute("INSERT INTO note VALUES ('запись')")
+        with handler['replica'].cursor() as cursor:
+            cursor.execute('SELECT text FROM note')
+            self.assertEqual(cursor.fetchall(), [('запись',)])
+            with self.assertRaisesMessage(OperationalError, 'readonly'):
+                cursor.execute("INSERT INTO note VALUES ('чтение')")
+
+
+class SyncTests(TestCase):
+    """/api/sync/: порции по токену, журнал удалений и строки, зафиксированные с опозданием."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        cls.participant = ProjectParticipant.objects.create(project=cls.project, user=cls.student)
+        cls.tasks = [Task.objects.create(project=cls.project, title=f'Задача {i}') for i in range(5)]
+        Comment.objects.create(task=cls.tasks[0], author=cls.user, content='Комментарий')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def sync(self, since=None, client=None):
+        response = (client or self.client).get('/api/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    @override_settings(SYNC_OVERLAP=0)
+    def test_walks_all_changes_in_portions(self):
+        seen, since = [], None
+        with mock.patch.object(SyncView, 'limit', 2):
+            for _ in range(10):
+                page = self.sync(since)
+                seen.extend(task['id'] for task in page['tasks'])
+                since = page['next']
+                if not page['has_more']:
+                    break
+        self.assertEqual(seen, [task.pk for task in self.tasks])
+
+    def test_rejects_malformed_token(self):
+        for values in (['x', 1] * 4, [1, 1] * 4, [None, 1] * 4, [{'a': 1}, 1] * 4, [1, 2]):
+            with self.subTest(values=values):
+                response = self.client.get('/api/sync/', {'since': encode_cursor(values)})
+                self.assertEqual(response.status_code, 400)
+
+    def test_late_commit_is_not_skipped(self):
+        since = self.sync()['next']
+        # Строка, чей updated_at раньше уже выданных: её транзакция зафиксировалась позже
+        late = Task.objects.create(project=self.project, title='Поздняя')
+        Task.objects.filter(pk=late.pk).update(updated_at=self.tasks[0].updated_at)
+        page = self.sync(since)
+        self.assertIn(late.pk, [task['id'] for task in page['tasks']])
+
+    @override_settings(SYNC_OVERLAP=0)
+    def test_deletions_are_reported(self):
+        since = self.sync()['next']
+        task_id = self.tasks[1].pk
+        self.tasks[1].delete()
+        deleted = self.sync(since)['deleted']
+        self.assertIn({'type': 'task', 'id': task_id}, [{'type': d['type'], 'id': d['id']} for d in deleted])
+
+    def test_removed_participant_learns_about_removal(self):
+        # Токен, а не force_authenticate: каждый запрос получает свой объект пользователя
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.student).key}')
+        since = self.sync(client=client)['next']
+        participant_id = self.participant.pk
+        self.participant.delete()
+        page = self.sync(since, client=client)
+        self.assertEqual(page['tasks'], [])
+        self.assertIn(
+            (DeletedObject.Kind.PARTICIPANT, participant_id),
+            [(d['type'], d['id']) for d in page['deleted']],
+        )
+
+
+class TaskBulkTests(TestCase):
+    """/api/tasks/bulk/: пакет сохраняется целиком или не сохраняется вовсе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.outsider = CustomUser.objects.create_user('outsider', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        cls.foreign = Project.objects.create(
+            title='Чужой', description='', creator=cls.outsider,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        ProjectParticipant.objects.create(project=cls.project, user=cls.student)
+        cls.task = Task.objects.create(project=cls.project, title='Изменить')
+        cls.doomed = Task.objects.create(project=cls.project, title='Удалить')
+        cls.foreign_task = Task.objects.create(project=cls.foreign, title='Чужая')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, data):
+        return self.client.post('/api/tasks/bulk/', data, format='json')
+
+    def test_mixed_batch(self):
+        response = self.post({
+            'create': [{'project': self.project.pk, 'title': 'Новая', 'assignee': self.student.pk}],
+            'update': [{'id': self.task.pk, 'status': Task.Status.DONE}],
+            'delete': [self.doomed.pk],
+        })
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body['create'][0]['task']['assignee'], self.student.pk)
+        self.assertEqual(body['delete'], [{'index': 0, 'id': self.doomed.pk}])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, Task.Status.DONE)
+        self.assertFalse(Task.objects.filter(pk=self.doomed.pk).exists())
+        self.assertTrue(Task.objects.filter(project=self.project, title='Новая').exists())
+
+    def test_item_without_permission_rolls_back_whole_batch(self):
+        response = self.post({
+            'create': [
+                {'project': self.project.pk, 'title': 'Своя'},
+                {'project': self.foreign.pk, 'title': 'В чужой проект'},
+            ],
+            'update': [{'id': self.foreign_task.pk, 'title': 'Взлом'}],
+            'delete': [self.doomed.pk],
+        })
+        self.assertEqual(response.status_code, 400)
+        body = response.json()
+        self.assertEqual([result['index'] for result in body['create']], [1])
+        self.assertIn('project', body['create'][0]['errors'])
+        self.assertEqual(body['update'][0]['errors'], {'id': ['Задача не найдена.']})
+        # Корректные элементы тоже не сохранены
+        self.assertFalse(Task.objects.filter(title='Своя').exists())
+        self.assertTrue(Task.objects.filter(pk=self.doomed.pk).exists())
+        self.foreign_task.refresh_from_db()
+        self.assertEqual(self.foreign_task.title, 'Чужая')
+
+    def test_assignee_must_be_participant(self):
+        response = self.post({'update': [{'id': self.task.pk, 'assignee': self.outsider.pk}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('assignee', response.json()['update'][0]['errors'])
+
+    def test_malformed_bodies_are_rejected(self):
+        for body in ([1, 2], {'create': {}}, {'delete': 'all'}, {'update': [{'id': [1]}]}, {'delete': [{'id': 1}, True]}):
+            with self.subTest(body=body):
+                self.assertEqual(self.post(body).status_code, 400)
+
+
+def take(stream, count=None):
+    """Первые count элементов асинхронного генератора (все, если count не задан)."""
+    async def collect():
+        items = []
+        try:
+            async for item in stream:
+                items.append(item)
+                if len(items) == count:
+                    break
+        finally:
+            await stream.aclose()
+        return items
+    return async_to_sync(collect)()
+
+
+class ProjectEventTests(TestCase):
+    """События доски: доставка, продолжение по Last-Event-ID, reset и поток SSE."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.outsider = CustomUser.objects.create_user('outsider', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        cls.participant = ProjectParticipant.objects.create(project=cls.project, user=cls.student)
+        cls.task = Task.objects.create(project=cls.project, title='Задача')
+
+    def setUp(self):
+        # Исключение участника запоминается в кэше членства, откат транзакции теста его не сбрасывает
+        invalidate_membership(self.student.pk)
+        self.backend = events.LocalBackend()
+        patcher = mock.patch('api.events.get_backend', return_value=self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_local_backend_replays_and_delivers(self):
+        self.backend.publish(self.project.pk, events.TASK_CREATED, {'id': 1})
+        last_event_id = self.backend.current_id(self.project.pk)
+        self.backend.publish(self.project.pk, events.TASK_UPDATED, {'id': 1})
+        self.backend.publish(self.project.pk + 1, events.TASK_UPDATED, {'id': 2})
+
+        async def scenario():
+            stream = self.backend.subscribe(self.project.pk, last_event_id, timeout=0.01)
+            try:
+                replayed = await anext(stream)
+                self.backend.publish(self.project.pk, events.TASK_DELETED, {'id': 1})
+                return replayed, await anext(stream), await anext(stream)
+            finally:
+                await stream.aclose()
+
+        replayed, delivered, idle = async_to_sync(scenario)()
+        self.assertEqual((replayed.type, replayed.data), (events.TASK_UPDATED, {'id': 1}))
+        self.assertEqual((delivered.type, delivered.data), (events.TASK_DELETED, {'id': 1}))
+        self.assertIsNone(idle)
+
+    def test_local_backend_resets_unknown_or_evicted_ids(self):
+        self.backend.history_size = 2
+        self.backend.publish(self.project.pk, events.TASK_CREATED, {'id': 1})
+        evicted = self.backend.current_id(self.project.pk)
+        for _ in range(3):
+            self.backend.publish(self.project.pk, events.TASK_UPDATED, {'id': 1})
+        for last_event_id in (evicted, 'deadbeef-1'):
+            event, = take(self.backend.subscribe(self.project.pk, last_event_id, timeout=0.01), 1)
+            self.assertEqual(event.type, events.RESET)
+            self.assertIsNone(event.id)
+
+    def test_database_backend_replays_and_resets(self):
+        backend = events.DatabaseBackend()
+        backend.poll_interval = 0.01
+        for i in range(3):
+            backend.publish(self.project.pk, events.TASK_UPDATED, {'id': i})
+        first, second, third = ProjectEvent.objects.filter(project_id=self.project.pk).order_by('id')
+
+        replayed = take(backend.subscribe(self.project.pk, str(first.pk), timeout=0.01), 3)
+        self.assertEqual([event.id for event in replayed[:2]], [str(second.pk), str(third.pk)])
+        self.assertIsNone(replayed[2])
+
+        # События после last_event_id уже удалены из журнала
+        ProjectEvent.objects.filter(pk__in=[first.pk, second.pk]).delete()
+        event, = take(backend.subscribe(self.project.pk, str(first.pk), timeout=0.01), 1)
+        self.assertEqual(event.type, events.RESET)
+
+    def stream(self, user, **headers):
+        token = Token.objects.create(user=user)
+        request = AsyncRequestFactory().get(
+            f'/api/async/projects/{self.project.pk}/events/',
+            headers={'Authorization': f'Token {token.key}', **headers},
+        )
+        return async_to_sync(async_views.project_events_view)(request, pk=self.project.pk)
+
+    def test_stream_replays_from_last_event_id(self):
+        last_event_id = self.backend.current_id(self.project.pk)
+        self.backend.publish(self.project.pk, events.TASK_STATUS, {'id': self.task.pk, 'status': 'done'})
+        self.backend.publish(self.project.pk, events.RESET, {})
+        response = self.stream(self.student, **{'Last-Event-ID': last_event_id})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = [chunk.decode() for chunk in take(response.streaming_content)]
+        self.assertEqual(chunks[0], 'retry: 3000\n\n')
+        self.assertIn('event: task.status\ndata: {"id":%d,"status":"done"}' % self.task.pk, chunks[1])
+        # reset завершает поток: клиент перезагружает состояние целиком
+        self.assertIn('event: reset', chunks[2])
+        self.assertEqual(len(chunks), 3)
+
+    @override_settings(PROJECT_EVENTS_HEARTBEAT=0.01)
+    def test_stream_closes_after_participant_removal(self):
+        response = self.stream(self.student)
+        self.participant.delete()
+        self.assertEqual([chunk.decode() for chunk in take(response.streaming_content)], ['retry: 3000\n\n'])
+
+    def test_stream_requires_membership(self):
+        self.assertEqual(self.stream(self.outsider).status_code, 403)
+
+    def test_bulk_operations_publish_task_events(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/tasks/bulk/', {
+                'create': [{'project': self.project.pk, 'title': 'Новая'}],
+                'update': [{'id': self.task.pk, 'status': Task.Status.DONE}],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        published = [event for _, event in self.backend._history[self.project.pk]]
+        self.assertEqual([event.type for event in published], [events.TASK_CREATED, events.TASK_STATUS])
+        self.assertEqual(published[1].data['previous_status'], Task.Status.TODO)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post('/api/tasks/bulk/', {'delete': [self.task.pk]}, format='json')
+        deleted = self.backend._history[self.project.pk][-1][1]
+        self.assertEqual((deleted.type, deleted.data), (events.TASK_DELETED, {'id': self.task.pk}))
+
+
+class AsyncViewTests(TestCase):
+    """Асинхронные представления /api/async/: токен из кэша, членство, 403 и 404."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.outsider = CustomUser.objects.create_user('outsider', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        ProjectParticipant.objects.create(project=cls.project, user=cls.student)
+        cls.task = Task.objects.create(project=cls.project, title='Задача')
+        cls.tokens = {user.pk: Token.objects.create(user=user).key for user in (cls.user, cls.student, cls.outsider)}
+
+    def setUp(self):
+        token_cache.clear()
+        invalidate_membership(self.user.pk, self.student.pk, self.outsider.pk)
+
+    def get(self, view, user=None, key=None, **kwargs):
+        key = key or self.tokens[user.pk]
+        request = AsyncRequestFactory().get('/api/async/', headers={'Authorization': f'Token {key}'})
+        return async_to_sync(view)(request, **kwargs)
+
+    def test_token_is_cached_between_requests(self):
+        self.assertEqual(self.get(async_views.task_list_view, self.student).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(async_views.task_list_view, self.student)
+        self.assertEqual([task['id'] for task in json.loads(response.content)['results']], [self.task.pk])
+        self.assertFalse([query for query in queries.captured_queries if 'authtoken_token' in query['sql']])
+
+        response = self.get(async_views.task_list_view, key='0' * 40)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_membership_is_loaded_once_through_cache(self):
+        with mock.patch('api.membership._aload', wraps=membership._aload) as load:
+            for _ in range(2):
+                response = self.get(async_views.task_detail_view, self.student, pk=self.task.pk)
+                self.assertEqual(response.status_code, 200)
+        # Каждый запрос получает свою копию пользователя, членство — из общего кэша
+        load.assert_called_once_with(self.student.pk)
+
+    def test_non_member_is_forbidden(self):
+        self.assertEqual(self.get(async_views.task_detail_view, self.outsider, pk=self.task.pk).status_code, 403)
+        self.assertEqual(self.get(async_views.project_detail_view, self.outsider, pk=self.project.pk).status_code, 403)
+        response = self.get(async_views.project_list_view, self.outsider)
+        self.assertEqual(json.loads(response.content)['results'], [])
+        self.assertEqual(self.get(async_views.task_detail_view, self.student, pk=0).status_code, 404)
+
+    def test_deleted_project_is_hidden(self):
+        delete_project(self.project)
+        for user in (self.user, self.student):
+            with self.subTest(user=user.username):
+                response = self.get(async_views.project_detail_view, user, pk=self.project.pk)
+                self.assertEqual(response.status_code, 404)
+                response = self.get(async_views.task_detail_view, user, pk=self.task.pk)
+                self.assertEqual(response.status_code, 403)
+                self.assertEqual(json.loads(self.get(async_views.task_list_view, user).content)['results'], [])
+
+
+class ConditionalRequestTests(TestCase):
+    """ETag задач: 304 на If-None-Match, 412 на устаревший If-Match, 428 без него."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        cls.task = Task.objects.create(project=cls.project, title='Задача')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f'/api/tasks/{self.task.pk}/'
+
+    def touch(self):
+        """Параллельная правка: задача меняется в БД, загруженный объект устаревает."""
+        Task.objects.filter(pk=self.task.pk).update(updated_at=self.task.updated_at + timedelta(seconds=1))
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_stale_if_match_returns_412(self):
+        etag = get_etag(self.task)
+        self.touch()
+        response = self.client.patch(self.url, {'title': 'Новое'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'Задача')
+
+    def test_change_between_load_and_transaction_returns_412(self):
+        etag = get_etag(self.task)
+        get_object = TaskDetailView.get_object
+
+        def load_then_change(view):
+            # Задача прочитана с тем же ETag, но до транзакции её успели изменить
+            instance = get_object(view)
+            self.touch()
+            return instance
+
+        with mock.patch.object(TaskDetailView, 'get_object', load_then_change):
+            response = self.client.patch(self.url, {'title': 'Новое'}, format='json', HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, 412)
+            response = self.client.delete(self.url, HTTP_IF_MATCH=etag)
+            self.assertEqual(response.status_code, 412)
+        self.assertTrue(Task.objects.filter(pk=self.task.pk, title='Задача').exists())
+
+    def test_matching_if_match_updates(self):
+        response = self.client.patch(self.url, {'title': 'Новое'}, format='json', HTTP_IF_MATCH=get_etag(self.task))
+        self.assertEqual(response.status_code, 200)
+        self.task.refresh_from_db()
+        self.assertEqual(response['ETag'], get_etag(self.task))
+
+    @override_settings(ETAG_REQUIRE_IF_MATCH=True)
+    def test_missing_if_match_returns_428(self):
+        self.assertEqual(self.client.patch(self.url, {'title': 'Новое'}, format='json').status_code, 428)
+        self.assertEqual(self.client.delete(self.url).status_code, 428)
+        response = self.client.patch(self.url, {'title': 'Новое'}, format='json', HTTP_IF_MATCH=get_etag(self.task))
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_form_rechecks_version_in_transaction(self):
+        data = {
+            'title': 'Новое', 'description': '', 'status': self.task.status,
+            'version': self.task.updated_at.isoformat(),
+        }
+        form = TaskForm(data, instance=self.task)
+        self.assertTrue(form.is_valid())
+        self.touch()
+        self.assertFalse(form.check_version())
+        self.assertIn('version', form.errors)
+
+
+class MetricsTests(TestCase):
+    """/metrics: доступ и сбор снимков рабочих процессов."""
+
+    def test_access(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        with override_settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+        staff = CustomUser.objects.create_user('admin', password='password123', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    def test_snapshot_of_previous_process_with_same_pid(self):
+        own = metrics.registry.snapshot()
+        previous = {
+            'pid': own['pid'], 'started': own['started'] - 1000,
+            'counters': [['http_requests_total', [['route', 'x']], 3]],
+            'histograms': [], 'gauges': [['http_requests_in_flight', [], 5]],
+        }
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            with open(os.path.join(directory, f'{own["pid"]}-{previous["started"]}.json'), 'w') as target:
+                json.dump(previous, target)
+            metrics.registry.flush(directory)
+            snapshots = metrics.collect()
+        # Снимок процесса с тем же pid не принят за свой, его счётчики учтены, а выполняющиеся запросы — нет
+        self.assertEqual(len(snapshots), 2)
+        counters, _, gauges = metrics.merge(snapshots)
+        self.assertEqual(counters[('http_requests_total', (('route', 'x'),))], 3)
+        self.assertEqual(gauges[('http_requests_in_flight', ())], own['gauges'][0][2])
+
+
+class MembershipCacheTests(TestCase):
+    """Кэш членства: сброс при изменениях и чтение в обход кэша для долгих соединений."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+
+    def fresh_student(self):
+        # Новый объект — как в новом запросе, без членства, запомненного на пользователе
+        return CustomUser.objects.get(pk=self.student.pk)
+
+    def test_participant_changes_invalidate_cache(self):
+        self.assertFalse(is_project_member(self.fresh_student(), self.project))
+        participant = ProjectParticipant.objects.create(project=self.project, user=self.student)
+        self.assertTrue(is_project_member(self.fresh_student(), self.project))
+        participant.delete()
+        self.assertFalse(is_project_member(self.fresh_student(), self.project))
+
+    def test_refresh_bypasses_cache(self):
+        student = self.fresh_student()
+        self.assertFalse(async_to_sync(ais_project_member)(student, self.project))
+        # Участника добавил другой процесс: локальный кэш не сброшен
+        with mock.patch('api.signals.invalidate_membership'):
+            ProjectParticipant.objects.create(project=self.project, user=self.student)
+        self.assertFalse(async_to_sync(ais_project_member)(self.fresh_student(), self.project))
+        self.assertTrue(async_to_sync(ais_project_member)(student, self.project, refresh=True))
+        # Прочитанное с refresh=True обновило и кэш
+        self.assertTrue(is_project_member(self.fresh_student(), self.project))
+
+
+class TokenCacheTests(TestCase):
+    """Кэш токенов: сброс при выходе, деактивации и смене пароля."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('student', password='password123')
+
+    def setUp(self):
+        token_cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self):
+        return self.client.get('/api/projects/').status_code
+
+    def test_deleted_token_is_rejected(self):
+        self.assertEqual(self.get(), 200)
+        self.token.delete()
+        self.assertEqual(self.get(), 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.get(), 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get(), 401)
+
+    def test_password_change_drops_cached_user(self):
+        self.assertEqual(self.get(), 200)
+        self.assertIsNotNone(token_cache.get(self.token.key))
+        self.user.set_password('another-password')
+        self.user.save()
+        self.assertIsNone(token_cache.get(self.token.key))
+        self.assertEqual(self.get(), 200)
+        self.assertTrue(token_cache.get(self.token.key)[0].check_password('another-password'))
+
+    def test_update_without_signals_expires_with_timeout(self):
+        self.assertEqual(self.get(), 200)
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        # update() сигналов не отправляет: до истечения таймаута токен ещё принимается
+        self.assertEqual(self.get(), 200)
+        expired = time.monotonic() + token_cache.timeout + 1
+        with mock.patch('api.cache.time.monotonic', return_value=expired):
+            self.assertEqual(self.get(), 401)
+
+
+class DeletionSignalTests(TestCase):
+    """Сигналы удаления и сохранения: журнал /api/sync/ без запроса на каждую строку каскада."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+
+    def create_task(self, comments):
+        task = Task.objects.create(project=self.project, title='Задача')
+        Comment.objects.bulk_create([Comment(task=task, author=self.user, content='Текст') for _ in range(comments)])
+        return task
+
+    def test_task_cascade_queries_do_not_grow_with_comments(self):
+        counts = []
+        for comments in (1, 10):
+            task = self.create_task(comments)
+            with CaptureQueriesContext(connection) as queries:
+                task.delete()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        tombstones = DeletedObject.objects.filter(project_id=self.project.pk)
+        self.assertEqual(tombstones.filter(kind=DeletedObject.Kind.TASK).count(), 2)
+        self.assertEqual(tombstones.filter(kind=DeletedObject.Kind.COMMENT).count(), 11)
+
+    def test_queryset_delete_logs_every_row(self):
+        tasks = [self.create_task(3) for _ in range(2)]
+        Task.objects.filter(pk__in=[task.pk for task in tasks]).delete()
+        tombstones = DeletedObject.objects.filter(project_id=self.project.pk)
+        self.assertEqual(tombstones.filter(kind=DeletedObject.Kind.TASK).count(), 2)
+        self.assertEqual(tombstones.filter(kind=DeletedObject.Kind.COMMENT).count(), 6)
+
+    def test_single_comment_deletion(self):
+        task = self.create_task(1)
+        comment = Comment.objects.get(task=task)
+        comment_id = comment.pk
+        comment.delete()
+        self.assertTrue(DeletedObject.objects.filter(kind=DeletedObject.Kind.COMMENT, object_id=comment_id).exists())
+
+    def test_owner_is_fetched_only_when_changed(self):
+        participant = ProjectParticipant.objects.create(project=self.project, user=self.student)
+        participant = ProjectParticipant.objects.get(pk=participant.pk)
+        with mock.patch('api.signals.invalidate_membership') as invalidate:
+            with CaptureQueriesContext(connection) as queries:
+                participant.save()
+            self.assertEqual([query['sql'].split()[0] for query in queries], ['UPDATE'])
+            invalidate.assert_called_with(self.student.pk, None)
+            participant.user = self.user
+            participant.save()
+            invalidate.assert_called_with(self.user.pk, self.student.pk)
+
+
+class SearchTests(TestCase):
+    """Поиск FTS5: ранжирование, подсветка, экранирование, триггеры индекса и триграммы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        cls.other = Project.objects.create(
+            title='Другой', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+
+    def task(self, title, description='', project=None):
+        return Task.objects.create(project=project or self.project, title=title, description=description)
+
+    def found(self, text, project_ids=None):
+        if project_ids is None:
+            project_ids = [self.project.pk]
+        return [row['id'] for row in search_tasks(text, project_ids)]
+
+    def test_ranking_by_column_weight(self):
+        in_comment = self.task('Подготовка')
+        Comment.objects.create(task=in_comment, author=self.user, content='Нужен квантовый расчёт')
+        in_description = self.task('Расчёты', 'Квантовый отжиг')
+        in_title = self.task('Квантовый компьютер')
+        self.assertEqual(self.found('квантовый'), [in_title.pk, in_description.pk, in_comment.pk])
+
+    def test_prefix_and_scope(self):
+        own = self.task('Лабораторная работа')
+        self.task('Лабораторная работа', project=self.other)
+        self.assertEqual(self.found('лаборат раб'), [own.pk])
+        self.assertEqual(self.found('лаборат', []), [])
+        self.assertEqual(len(self.found('лаборат', [self.project.pk, self.other.pk])), 2)
+
+    def test_highlight_escapes_html(self):
+        task = self.task('<b>Отчёт</b> & "план"', 'Сдать отчёт до <i>пятницы</i>')
+        row, = search_tasks('отчёт', [self.project.pk])
+        self.assertEqual(row['id'], task.pk)
+        self.assertEqual(row['title_highlight'], '&lt;b&gt;<mark>Отчёт</mark>&lt;/b&gt; &amp; &quot;план&quot;')
+        row, = search_tasks('пятниц', [self.project.pk])
+        self.assertEqual(row['snippet'], 'Сдать отчёт до &lt;i&gt;<mark>пятницы</mark>&lt;/i&gt;')
+
+    def test_query_operators_are_escaped(self):
+        task = self.task('Отчёт NEAR сроки')
+        self.assertEqual(build_match_query('отчёт" OR title:* NEAR('), '"отчёт"* "OR"* "title"* "NEAR"*')
+        self.assertEqual(self.found('"отчёт) NEAR (сроки'), [task.pk])
+        self.assertEqual(self.found('*()"'), [])
+
+    def test_triggers_keep_index_in_sync(self):
+        task = self.task('Черновик')
+        self.assertEqual(self.found('черновик'), [task.pk])
+
+        task.title = 'Финальная версия'
+        task.save()
+        self.assertEqual(self.found('черновик'), [])
+        self.assertEqual(self.found('финальная'), [task.pk])
+        Task.objects.filter(pk=task.pk).update(description='Рецензия')
+        self.assertEqual(self.found('рецензия'), [task.pk])
+
+        comment = Comment.objects.create(task=task, author=self.user, content='Проверено куратором')
+        self.assertEqual(self.found('куратором'), [task.pk])
+        comment.content = 'Проверено деканатом'
+        comment.save()
+        self.assertEqual(self.found('куратором'), [])
+        self.assertEqual(self.found('деканатом'), [task.pk])
+        comment.delete()
+        self.assertEqual(self.found('деканатом'), [])
+
+        task_id = task.pk
+        task.delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM task_search WHERE rowid = %s', [task_id])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_user_search_prefix_then_trigram(self):
+        sandra = CustomUser.objects.create_user('sandra', password='password123')
+        alessandro = CustomUser.objects.create_user('alessandro', password='password123')
+        names = lambda term: [row['username'] for row in search_users(term)]
+        # Совпадения по началу — первыми, затем по подстроке
+        self.assertEqual(names('san'), ['sandra', 'alessandro'])
+        # Короче трёх символов триграммы не используются: только начало строки
+        self.assertEqual(names('sa'), ['sandra'])
+        self.assertEqual(names('ssan'), ['alessandro'])
+        self.assertEqual(names('ss'), [])
+
+        CustomUser.objects.filter(pk=alessandro.pk).update(username='alex')
+        self.assertEqual(names('ssan'), [])
+        sandra.delete()
+        self.assertEqual(names('andr'), [])
+
+
+class UserAutocompleteTests(TestCase):
+    """/api/users/autocomplete/: только для автора проекта, без текущих участников."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.candidate = CustomUser.objects.create_user('stranger', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        ProjectParticipant.objects.create(project=cls.project, user=cls.student)
+
+    def get(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/users/autocomplete/', params)
+
+    def test_requires_project_creator(self):
+        self.assertEqual(self.get(self.user, q='st').status_code, 403)
+        self.assertEqual(self.get(self.student, q='st', project=self.project.pk).status_code, 403)
+        self.assertEqual(self.get(self.candidate, q='st', project=self.project.pk).status_code, 403)
+
+    def test_excludes_participants(self):
+        response = self.get(self.user, q='st', project=self.project.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([user['id'] for user in response.json()['results']], [self.candidate.pk])
+
+    def test_max_code_point(self):
+        self.assertEqual(_prefix_range('a' + chr(sys.maxunicode)), ('a' + chr(sys.maxunicode), 'b'))
+        self.assertEqual(_prefix_range(chr(sys.maxunicode)), (chr(sys.maxunicode), None))
+        self.assertEqual(search_users(chr(sys.maxunicode)), [])
+
+
+calls = []
+
+
+@job('tests.record', max_attempts=2)
+def record_job(value, fail=False):
+    calls.append(value)
+    if fail:
+        raise RuntimeError('сбой')
+    return {'value': value}
+
+
+class JobQueueTests(TestCase):
+    """Очередь фоновых задач: захват, повторы, идемпотентность и завершение по попытке."""
+
+    def setUp(self):
+        calls.clear()
+
+    def run_once(self, worker='worker'):
+        claimed = claim(1, worker=worker)
+        self.assertEqual(len(claimed), 1)
+        return execute(claimed[0])
+
+    def test_success(self):
+        queued = enqueue('tests.record', {'value': 1})
+        self.assertTrue(self.run_once())
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.result, queued.attempts), (Job.Status.DONE, {'value': 1}, 1))
+        self.assertEqual(claim(1), [])
+
+    def test_retry_with_backoff_then_failure(self):
+        queued = enqueue('tests.record', {'value': 1, 'fail': True})
+        before = timezone.now()
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.assertFalse(self.run_once())
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Job.Status.QUEUED)
+        self.assertGreaterEqual(queued.run_after, before + retry_delay(1))
+        self.assertIn('сбой', queued.last_error)
+        # Пока задержка не прошла, задачу не взять
+        self.assertEqual(claim(1), [])
+        Job.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.assertFalse(self.run_once())
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Job.Status.FAILED, 2))
+
+    def test_dedup_returns_queued_job(self):
+        first = enqueue('tests.record', {'value': 1}, dedup_key='key')
+        second = enqueue('tests.record', {'value': 2}, dedup_key='key')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_dedup_during_run_requeues_after_completion(self):
+        first = enqueue('tests.record', {'value': 1}, dedup_key='key')
+        claim(1, worker='worker')
+        # Постановка во время выполнения: обработчик мог уже пройти свою проверку
+        self.assertEqual(enqueue('tests.record', {'value': 1}, dedup_key='key').pk, first.pk)
+        execute(first.pk)
+        first.refresh_from_db()
+        self.assertEqual((first.status, first.rerun, first.attempts), (Job.Status.QUEUED, False, 0))
+        self.run_once()
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.Status.DONE)
+        self.assertEqual(calls, [1, 1])
+
+    def test_expired_claim_does_not_overwrite_next_attempt(self):
+        queued = enqueue('tests.record', {'value': 1})
+        [job_id] = claim(1, worker='slow')
+        stale = Job.objects.get(pk=job_id)
+        # Срок видимости истёк, задачу взял другой обработчик
+        Job.objects.filter(pk=job_id).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(requeue_expired(), 1)
+        self.assertEqual(claim(1, worker='fast'), [job_id])
+        self.assertFalse(_finish(stale, status=Job.Status.DONE, finished_at=timezone.now(), result={'stale': True}))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.locked_by, queued.attempts), (Job.Status.RUNNING, 'fast', 2))
+        self.assertTrue(execute(job_id))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.result), (Job.Status.DONE, {'value': 1}))
+
+
+@override_settings(PROJECT_PURGE_BATCH_SIZE=2, PROJECT_PURGE_PAUSE=0)
+class ProjectDeletionTests(TestCase):
+    """Удаление проекта: сразу пропадает отовсюду, содержимое удаляется порциями."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        ProjectParticipant.objects.create(project=cls.project, user=cls.student)
+        cls.tasks = [Task.objects.create(project=cls.project, title=f'Задача {i}') for i in range(5)]
+        Comment.objects.bulk_create([
+            Comment(task=task, author=cls.student, content='Текст') for task in cls.tasks for _ in range(2)
+        ])
+        blob = FileBlob.objects.create(sha256='0' * 64, file='blobs/test', size=1)
+        cls.attachment = FileAttachment.objects.create(
+            task=cls.tasks[0], uploaded_by=cls.user, blob=blob, file=blob.file.name, filename='test.txt',
+        )
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        return client
+
+    def test_soft_deleted_project_disappears(self):
+        delete_project(self.project)
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertTrue(Project.all_objects.filter(pk=self.project.pk).exists())
+        for user in (self.user, self.student):
+            client = self.client_for(user)
+            self.assertEqual(client.get('/api/projects/').json()['results'], [])
+            self.assertEqual(client.get(f'/api/projects/{self.project.pk}/').status_code, 404)
+            self.assertEqual(client.get('/api/tasks/').json()['results'], [])
+            self.assertEqual(client.get(f'/api/tasks/{self.tasks[0].pk}/').status_code, 403)
+        tombstones = DeletedObject.objects.filter(project_id=self.project.pk)
+        self.assertEqual(set(tombstones.values_list('kind', 'user_id')), {
+            (DeletedObject.Kind.PROJECT, self.user.pk), (DeletedObject.Kind.PROJECT, self.student.pk),
+        })
+
+    def test_tasks_of_deleted_project_are_read_only(self):
+        delete_project(self.project)
+        tombstones = DeletedObject.objects.count()
+        task = self.tasks[0]
+        self.client.force_login(self.user)
+        for url in (f'/tasks/{task.pk}/edit/', f'/tasks/{task.pk}/delete/', f'/tasks/{task.pk}/status/'):
+            self.assertEqual(self.client.post(url, {'title': 'Новое', 'status': 'done'}).status_code, 404)
+        self.assertEqual(self.client.get(f'/tasks/{task.pk}/').status_code, 404)
+        task.refresh_from_db()
+        self.assertEqual((task.title, task.status), ('Задача 0', Task.Status.TODO))
+        self.assertEqual(DeletedObject.objects.count(), tombstones)
+
+    def test_purge_in_batches(self):
+        delete_project(self.project)
+        tombstones = DeletedObject.objects.count()
+        with mock.patch('api.deletion.time.sleep') as sleep:
+            counts = purge_project(self.project.pk)
+        self.assertEqual(counts['tasks'], 5)
+        self.assertEqual(counts['comments'], 10)
+        # Порции по 2 строки, пауза после каждой: вложение — 1, комментарии — 5, задачи — 3, участник — 1
+        self.assertEqual(sleep.call_count, 1 + 5 + 3 + 1)
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        for model in (Task, Comment, ProjectParticipant, FileAttachment):
+            self.assertFalse(model.objects.exists())
+        # Журнал удалений по строкам не пишется, содержимое файла собирается фоновой задачей
+        self.assertEqual(DeletedObject.objects.count(), tombstones)
+        self.assertTrue(Job.objects.filter(
+            name='files.collect_blob', payload={'blob_id': self.attachment.blob_id},
+        ).exists())
+
+
+class UploadTests(TestCase):
+    """Загрузка по частям, хранение по SHA-256 и отдача файлов (Range, nginx/Apache)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.outsider = CustomUser.objects.create_user('outsider', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        cls.task = Task.objects.create(project=cls.project, title='Задача')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        paths = override_settings(
+            MEDIA_ROOT=os.path.join(directory.name, 'media'),
+            UPLOAD_SESSION_DIR=os.path.join(directory.name, 'sessions'),
+            UPLOAD_CHUNK_MAX_SIZE=4,
+        )
+        paths.enable()
+        self.addCleanup(paths.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, filename='report.txt'):
+        session = self.client.post(
+            '/api/uploads/', {'task': self.task.pk, 'filename': filename, 'size': len(content)}, format='json',
+        ).json()
+        url = f'/api/uploads/{session["id"]}/'
+        for start in range(0, len(content), 4):
+            chunk = content[start:start + 4]
+            response = self.client.put(
+                url, chunk, content_type='application/octet-stream',
+                HTTP_CONTENT_RANGE=f'bytes {start}-{start + len(chunk) - 1}/{len(content)}',
+            )
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(url).json()['received'], len(content))
+        return complete_upload(UploadSession.objects.get(pk=session['id']))
+
+    def test_chunks_are_assembled(self):
+        attachment = self.upload(b'0123456789')
+        self.assertEqual(attachment.blob.sha256, hashlib.sha256(b'0123456789').hexdigest())
+        with attachment.file.open('rb') as source:
+            self.assertEqual(source.read(), b'0123456789')
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_chunk_must_continue_from_received_offset(self):
+        session = self.client.post(
+            '/api/uploads/', {'task': self.task.pk, 'filename': 'a.txt', 'size': 8}, format='json',
+        ).json()
+        response = self.client.put(
+            f'/api/uploads/{session["id"]}/', b'4567', content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes 4-7/8',
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 0)
+
+    def test_same_content_is_stored_once(self):
+        first = self.upload(b'same content')
+        second = self.upload(b'same content', filename='copy.txt')
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(FileBlob.objects.count(), 1)
+        self.assertEqual(len(os.listdir(os.path.dirname(first.blob.file.path))), 1)
+
+    def test_collector_keeps_reused_blob(self):
+        first = self.upload(b'reused')
+        blob_id = first.blob_id
+        first.delete()
+        # Содержимое без ссылок снова загружено до того, как до него дошёл сборщик
+        second = self.upload(b'reused')
+        self.assertEqual(second.blob_id, blob_id)
+        self.assertEqual(collect_blob(blob_id), {'deleted': False})
+        second.delete()
+        self.assertEqual(collect_blob(blob_id), {'deleted': True})
+        self.assertFalse(FileBlob.objects.filter(pk=blob_id).exists())
+
+    def download(self, attachment, user=None, **headers):
+        client = APIClient()
+        client.force_authenticate(user or self.user)
+        return client.get(f'/api/files/{attachment.pk}/download/', **headers)
+
+    def test_range_requests(self):
+        attachment = self.upload(b'0123456789')
+        self.assertEqual(self.download(attachment, self.outsider).status_code, 404)
+        response = self.download(attachment, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        response = self.download(attachment, HTTP_RANGE='bytes=20-30')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+        etag = self.download(attachment)['ETag']
+        self.assertEqual(self.download(attachment, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_asgi_streams_file_through_async_iterator(self):
+        attachment = self.upload(b'0123456789')
+
+        def download(**headers):
+            request = AsyncRequestFactory().get(f'/api/files/{attachment.pk}/download/', **headers)
+            force_authenticate(request, self.user)
+            return FileDownloadView.as_view()(request, pk=attachment.pk)
+
+        async def collect(response):
+            try:
+                return b''.join([chunk async for chunk in response.streaming_content])
+            finally:
+                response.close()
+
+        with mock.patch('api.downloads.ASGI_CHUNK_SIZE', 3):
+            response = download()
+            self.assertTrue(response.is_async)
+            self.assertEqual(response['Content-Length'], '10')
+            self.assertEqual(async_to_sync(collect)(response), b'0123456789')
+
+            response = download(headers={'Range': 'bytes=2-5'})
+            self.assertEqual(response.status_code, 206)
+            self.assertTrue(response.is_async)
+            self.assertEqual(async_to_sync(collect)(response), b'2345')
+
+    def test_server_offload_headers(self):
+        attachment = self.upload(b'0123456789')
+        with override_settings(FILE_DOWNLOAD_MODE='x-accel', FILE_DOWNLOAD_ACCEL_PREFIX='/protected-media/'):
+            response = self.download(attachment)
+            self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + attachment.file.name)
+            self.assertEqual(response.content, b'')
+        with override_settings(FILE_DOWNLOAD_MODE='x-sendfile'):
+            response = self.download(attachment)
+            self.assertEqual(response['X-Sendfile'], attachment.file.path)
+
+
+class RequestTimingTests(TestCase):
+    """Server-Timing: только при DEBUG или сотрудникам; сериализация замеряется без подмены DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.staff = CustomUser.objects.create_user('admin', password='password123', is_staff=True)
+        for owner in (cls.user, cls.staff):
+            Project.objects.create(
+                title='Проект', description='', creator=owner,
+                start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+            )
+
+    def get(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/projects/')
+
+    def test_header_only_for_staff_or_debug(self):
+        self.assertNotIn('Server-Timing', self.get(self.user))
+        self.assertIn('Server-Timing', self.get(self.staff))
+        with override_settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.get(self.user))
+
+    def test_serializers_are_timed(self):
+        with mock.patch('api.serializers.timed', wraps=timed) as timer:
+            ProjectSerializer(Project.objects.all(), many=True).data
+            ProjectSerializer(Project.objects.first()).data
+        self.assertEqual([call.args for call in timer.call_args_list], [('ser',), ('ser',)])
+        self.assertIsInstance(ProjectSerializer(many=True), TimedListSerializer)
+
+
+class ExportTests(TestCase):
+    """Потоковая выгрузка проекта: под ASGI тело отдаётся асинхронным итератором."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        Task.objects.bulk_create([Task(project=cls.project, title=f'Задача {i}') for i in range(5)])
+
+    def url(self, export_format):
+        return f'/api/projects/{self.project.pk}/export/{export_format}/'
+
+    def test_wsgi_streams_sync_iterator(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(self.url('csv'))
+        self.assertFalse(response.is_async)
+        self.assertEqual(b''.join(response.streaming_content).decode().count('\n'), 6)
+
+    def test_asgi_streams_async_iterator(self):
+        request = AsyncRequestFactory().get(self.url('ndjson'))
+        force_authenticate(request, self.user)
+        response = ProjectExportView.as_view()(request, project_id=self.project.pk, export_format='ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+
+        async def collect():
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        lines = async_to_sync(collect)().decode().splitlines()
+        self.assertEqual([json.loads(line)['type'] for line in lines], ['task'] * 5)
+
+    def test_async_iterator_matches_sync_output(self):
+        async def collect():
+            return [chunk async for chunk in aiter_chunks(stream_csv(self.project, 'tasks'))]
+
+        self.assertEqual(async_to_sync(collect)(), list(stream_csv(self.project, 'tasks')))
+
+
+class ImportTests(TestCase):
+    """Импорт задач и участников из CSV/JSONL порциями с отчётом по строкам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('teacher', password='password123', role='teacher')
+        cls.student = CustomUser.objects.create_user('student', password='password123')
+        cls.newcomer = CustomUser.objects.create_user('newcomer', password='password123')
+        cls.project = Project.objects.create(
+            title='Проект', description='', creator=cls.user,
+            start_date=date(2025, 9, 1), end_date=date(2025, 12, 31),
+        )
+        ProjectParticipant.objects.create(project=cls.project, user=cls.student, role='student')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, name, content, kind='tasks'):
+        return self.client.post(
+            f'/api/projects/{self.project.pk}/import/',
+            {'file': SimpleUploadedFile(name, content.encode()), 'kind': kind},
+        )
+
+    def test_csv_tasks_report_bad_rows(self):
+        content = (
+            'title,assignee,status\n'
+            'Первая,student,todo\n'
+            ',student,todo\n'
+            'Чужая,newcomer,todo\n'
+            'Без исполнителя,,done\n'
+        )
+        response = self.post('tasks.csv', content)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['created'], 2)
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4])
+        self.assertIn('title', report['errors'][0]['errors'])
+        self.assertIn('assignee', report['errors'][1]['errors'])
+        self.assertEqual(
+            set(Task.objects.filter(project=self.project).values_list('title', 'assignee__username')),
+            {('Первая', 'student'), ('Без исполнителя', None)},
+        )
+
+    def test_jsonl_rows_are_inserted_in_batches(self):
+        lines = [json.dumps({'title': f'Задача {i}', 'assignee': 'student'}) for i in range(5)]
+        lines.insert(2, '{не json')
+        rows = read_rows(SimpleUploadedFile('tasks.jsonl', '\n'.join(lines).encode()).open('rb'), 'jsonl')
+        # Имена исполнителей разрешаются одним запросом на порцию, а не на строку
+        with CaptureQueriesContext(connection) as queries:
+            report = import_rows(self.project, rows, 'tasks', batch_size=2)
+        self.assertEqual(report['created'], 5)
+        self.assertEqual(report['errors'], [{'row': 3, 'errors': {'non_field_errors': ['Некорректный JSON.']}}])
+        user_lookups = [query for query in queries.captured_queries if 'api_customuser' in query['sql']]
+        self.assertEqual(len(user_lookups), 3)
+
+    def test_participants_skip_members_and_refresh_membership(self):
+        # Членство закэшировано до импорта: bulk_create не шлёт сигналов
+        self.assertFalse(is_project_member(self.newcomer, self.project))
+        content = 'username,role\nstudent,student\nnewcomer,student\nnewcomer,student\nghost,student\n'
+        report = self.post('people.csv', content, kind='participants').json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['skipped'], 2)
+        self.assertEqual([error['row'] for error in report['errors']], [5])
+        self.assertEqual(ProjectParticipant.objects.filter(project=self.project).count(), 2)
+        # Новый объект пользователя — как в следующем запросе: читает членство из кэша
+        self.assertTrue(is_project_member(CustomUser.objects.get(pk=self.newcomer.pk), self.project))
+
+    def test_typed_json_values_are_reported(self):
+        lines = [
+            {'title': 'Список', 'assignee': ['student']},
+            {'title': 'Нормальная', 'assignee': 'student'},
+            {'title': 'Объект', 'assignee': {'a': 1}},
+        ]
+        content = '\n'.join(json.dumps(line) for line in lines)
+        response = self.post('tasks.jsonl', content)
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(
+            report['errors'],
+            [{'row': 1, 'errors': {'assignee': ['Ожидалась строка.']}},
+             {'row': 3, 'errors': {'assignee': ['Ожидалась строка.']}}],
+        )
+
+        lines = [{'username': {'a': 1}}, {'username': 'newcomer', 'role': ['student']}, {'username': 'newcomer'}]
+        content = '\n'.join(json.dumps(line) for line in lines)
+        response = self.post('people.jsonl', content, kind='participants')
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([list(error['errors']) for error in report['errors']], [['username'], ['role']])
+
+    def test_created_excludes_participants_added_concurrently(self):
+        def rows():
+            # Участника добавили параллельно, после того как импорт прочитал состав проекта
+            ProjectParticipant.objects.create(project=self.project, user=self.newcomer, role='student')
+            yield 2, {'username': 'newcomer'}
+
+        report = import_rows(self.project, rows(), 'participants')
+        self.assertEqual(report, {'created': 0, 'skipped': 1, 'errors': []})
+
+    def test_only_creator_can_import(self):
+        self.client.force_authenticate(self.student)
+        response = self.post('tasks.csv', 'title\nЗадача\n')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Task.objects.filter(project=self.project).exists())
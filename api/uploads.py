@@ -0,0 +1,235 @@
+"""
+Хранение файлов задач по содержимому и загрузка по частям.
+
+Содержимое каждого файла лежит один раз в blobs/<aa>/<bb>/<sha256>
+(модель FileBlob), а FileAttachment ссылается на него. Большие файлы
+загружаются через /api/uploads/ частями: части пишутся прямо в файл
+сессии на диске, поэтому память рабочего процесса не зависит от размера
+файла, а прерванную загрузку можно продолжить с принятого смещения.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .jobs import job
+from .models import FileAttachment, FileBlob, UploadSession
+
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+def chunk_max_size():
+    return getattr(settings, 'UPLOAD_CHUNK_MAX_SIZE', 8 * 1024 * 1024)
+
+
+def blob_name(sha256):
+    return f'blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+class _LocalFile(File):
+    """Файл на диске, который FileSystemStorage может переместить, а не копировать."""
+
+    def __init__(self, path):
+        super().__init__(open(path, 'rb'), name=os.path.basename(path))
+        self._path = path
+
+    def temporary_file_path(self):
+        return self._path
+
+
+def _store_blob(sha256, size, content, attach):
+    """
+    Находит или сохраняет FileBlob с содержимым content и в той же транзакции
+    вызывает attach(blob), который создаёт ссылку на него; возвращает результат
+    attach. Если такое содержимое уже есть, content не сохраняется.
+
+    Найденная строка блокируется до коммита, как и в collect_blob(): сборщик
+    не удалит содержимое между тем, как его нашли, и появлением ссылки.
+    """
+    while True:
+        with transaction.atomic():
+            blob = FileBlob.objects.select_for_update().filter(sha256=sha256).first()
+            if blob is not None:
+                return attach(blob)
+        # Новое содержимое сохраняется вне транзакции: перенос большого файла не держит блокировку записи
+        name = default_storage.save(blob_name(sha256), content)
+        try:
+            with transaction.atomic():
+                return attach(FileBlob.objects.create(sha256=sha256, file=name, size=size))
+        except IntegrityError:
+            # Тот же файл параллельно сохранила другая загрузка — ссылаемся на её FileBlob
+            default_storage.delete(name)
+
+
+def attach_file(task, user, uploaded):
+    """Прикрепляет файл из multipart-запроса (UploadedFile) к задаче, сохраняя содержимое один раз."""
+    digest = hashlib.sha256()
+    for chunk in uploaded.chunks():
+        digest.update(chunk)
+    uploaded.seek(0)
+    return _store_blob(digest.hexdigest(), uploaded.size, uploaded, lambda blob: FileAttachment.objects.create(
+        task=task, uploaded_by=user, blob=blob, file=blob.file.name, filename=os.path.basename(uploaded.name),
+    ))
+
+
+# Загрузка по частям
+
+class UploadError(Exception):
+    """Часть или загрузка не приняты; offset — сколько байт принято на самом деле."""
+
+    def __init__(self, message, offset, status=409):
+        super().__init__(message)
+        self.offset = offset
+        self.status = status
+
+
+def session_path(session):
+    # Вне MEDIA_ROOT: недокачанные файлы не должны раздаваться по /media/
+    directory = getattr(settings, 'UPLOAD_SESSION_DIR', settings.BASE_DIR / 'upload_sessions')
+    return os.path.join(directory, str(session.pk))
+
+
+def start_upload(task, user, filename, size):
+    session = UploadSession.objects.create(
+        task=task, uploaded_by=user, filename=os.path.basename(filename), size=size,
+    )
+    path = session_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Дописывает часть длиной length из stream с позиции offset.
+
+    Часть должна начинаться ровно там, где закончилась принятая: иначе
+    UploadError с текущим смещением, с которого клиенту нужно продолжить.
+    Данные читаются из stream блоками и сразу пишутся на диск.
+    """
+    if offset != session.received:
+        raise UploadError('Часть должна начинаться с принятого смещения.', session.received)
+    if length > chunk_max_size() or offset + length > session.size:
+        raise UploadError('Слишком большая часть.', session.received, status=413)
+
+    with open(session_path(session), 'r+b') as target:
+        target.seek(offset)
+        remaining = length
+        while remaining:
+            block = stream.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            target.write(block)
+            remaining -= len(block)
+        if remaining:
+            raise UploadError('Часть передана не полностью.', session.received, status=400)
+        target.truncate()
+
+    # Условное обновление: из двух одновременных запросов с одной частью засчитывается один
+    updated = UploadSession.objects.filter(pk=session.pk, received=offset).update(
+        received=offset + length, updated_at=timezone.now(),
+    )
+    if not updated:
+        session.refresh_from_db(fields=['received'])
+        raise UploadError('Часть уже принята другим запросом.', session.received)
+    session.received = offset + length
+    return session
+
+
+def complete_upload(session):
+    """Проверяет размер, считает SHA-256 и прикрепляет файл к задаче. Сессия удаляется."""
+    if session.received != session.size:
+        raise UploadError('Файл загружен не полностью.', session.received)
+
+    path = session_path(session)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+
+    def attach(blob):
+        attachment = FileAttachment.objects.create(
+            task_id=session.task_id, uploaded_by_id=session.uploaded_by_id,
+            blob=blob, file=blob.file.name, filename=session.filename,
+        )
+        session.delete()
+        return attachment
+
+    content = _LocalFile(path)
+    try:
+        attachment = _store_blob(digest.hexdigest(), session.size, content, attach)
+    finally:
+        content.close()
+    _remove(path)
+    return attachment
+
+
+@job('uploads.complete', timeout=60 * 60)
+def complete_upload_job(session_id):
+    """Завершение большой загрузки в фоне: хэширование многогигабайтного файла не держит запрос."""
+    session = UploadSession.objects.filter(pk=session_id).first()
+    if session is None:
+        # Уже завершена предыдущей попыткой
+        return None
+    return {'attachment': complete_upload(session).pk}
+
+
+def abort_upload(session):
+    path = session_path(session)
+    session.delete()
+    _remove(path)
+
+
+def _remove(path):
+    # Файл уже перемещён в хранилище или удалён параллельным запросом
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def remove_session_files(sessions):
+    """
+    Удаляет временные файлы сессий загрузки после коммита текущей транзакции —
+    для сессий, строки которых удаляются пакетно, без abort_upload().
+    """
+    paths = [session_path(session) for session in sessions]
+    transaction.on_commit(lambda: [_remove(path) for path in paths])
+
+
+def purge_stale_uploads(max_age=None):
+    """Удаляет загрузки, не получавшие частей дольше max_age. Возвращает их число."""
+    if max_age is None:
+        max_age = timedelta(seconds=getattr(settings, 'UPLOAD_SESSION_TTL', 24 * 60 * 60))
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - max_age)
+    count = 0
+    for session in stale.iterator():
+        abort_upload(session)
+        count += 1
+    return count
+
+
+@job('uploads.purge_stale')
+def purge_stale_uploads_job():
+    return {'deleted': purge_stale_uploads()}
+
+
+@job('files.collect_blob')
+def collect_blob(blob_id):
+    """Удаляет содержимое, на которое больше не ссылается ни одно вложение."""
+    with transaction.atomic():
+        # Блокировка строки — та же, под которой _store_blob() находит содержимое и создаёт ссылку
+        blob = FileBlob.objects.select_for_update().filter(pk=blob_id).first()
+        if blob is None or FileAttachment.objects.filter(blob_id=blob_id).exists():
+            return {'deleted': False}
+        name = blob.file.name
+        blob.delete()
+        # Файл удаляется только после коммита: откат оставит и строку, и файл
+        transaction.on_commit(lambda: default_storage.delete(name))
+    return {'deleted': True}
+
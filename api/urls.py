@@ -9,9 +9,11 @@ from api.views import (
 
     create_project_view,
     project_detail_view,
+    project_board_column_view,
     edit_project_view,
     delete_project_view,
     project_tasks_view,
+    search_view,
 
     project_participants_view,
     remove_participant_view,
@@ -24,14 +26,19 @@ from api.views import (
 
     # API
     ProjectListCreateView, ProjectDetailView,
-    TaskListCreateView, TaskDetailView,
+    TaskListCreateView, TaskDetailView, TaskBulkView,
     CommentCreateView,
-    FileUploadView,
+    FileUploadView, FileDownloadView, UploadSessionCreateView, UploadSessionView, UploadCompleteView, JobDetailView,
+    SyncView,
+    TaskSearchView, UserAutocompleteView,
+    ProjectExportView, ProjectImportView,
     ProjectParticipantListCreateView, ProjectParticipantUpdateDeleteView,
     LeaveProjectView as ApiLeaveProjectView,
-    RegisterView, ChangePasswordView,
+    RegisterView, ChangePasswordView, TokenLogoutView, TokenCacheStatsView, FragmentCacheStatsView,
+    metrics_view,
 )
 
+from api import async_views
 from api.forms import BootstrapAuthenticationForm
 
 from student_project_manager.views import LeaveProjectView
@@ -53,19 +60,43 @@ urlpatterns = [
     path('api/auth/token/', obtain_auth_token, name='api-token-auth'),
     path('api/auth/register/', RegisterView.as_view(), name='api-register'),
     path('api/auth/change-password/', ChangePasswordView.as_view(), name='api-change-password'),
+    path('api/auth/logout/', TokenLogoutView.as_view(), name='api-logout'),
+    path('api/auth/token-cache/', TokenCacheStatsView.as_view(), name='api-token-cache-stats'),
+    path('api/fragment-cache/', FragmentCacheStatsView.as_view(), name='api-fragment-cache-stats'),
+    path('metrics', metrics_view, name='metrics'),
     path('api/projects/', ProjectListCreateView.as_view(), name='project-list'),
     path('api/projects/<int:pk>/', ProjectDetailView.as_view(), name='project-detail'),
     path('api/projects/<int:project_id>/participants/', ProjectParticipantListCreateView.as_view(), name='api-project-participants'),
+    path('api/projects/<int:project_id>/export/<str:export_format>/', ProjectExportView.as_view(), name='api-project-export'),
+    path('api/projects/<int:project_id>/import/', ProjectImportView.as_view(), name='api-project-import'),
     path('api/projects/<int:project_id>/leave/', ApiLeaveProjectView.as_view(), name='api-leave-project'),
     path('api/participants/<int:pk>/', ProjectParticipantUpdateDeleteView.as_view(), name='api-participant-detail'),
     path('api/tasks/', TaskListCreateView.as_view(), name='api-task-list'),
+    path('api/tasks/bulk/', TaskBulkView.as_view(), name='api-task-bulk'),
     path('api/tasks/<int:pk>/', TaskDetailView.as_view(), name='api-task-detail'),
     path('api/comments/', CommentCreateView.as_view(), name='api-comment-create'),
     path('api/files/', FileUploadView.as_view(), name='api-file-upload'),
+    path('api/files/<int:pk>/download/', FileDownloadView.as_view(), name='api-file-download'),
+    path('api/uploads/', UploadSessionCreateView.as_view(), name='api-upload-create'),
+    path('api/uploads/<uuid:pk>/', UploadSessionView.as_view(), name='api-upload'),
+    path('api/uploads/<uuid:pk>/complete/', UploadCompleteView.as_view(), name='api-upload-complete'),
+    path('api/jobs/<int:pk>/', JobDetailView.as_view(), name='api-job-detail'),
+    path('api/sync/', SyncView.as_view(), name='api-sync'),
+    path('api/search/', TaskSearchView.as_view(), name='api-search'),
+    path('api/users/autocomplete/', UserAutocompleteView.as_view(), name='api-user-autocomplete'),
+
+    # Асинхронное API чтения (ASGI)
+    path('api/async/projects/', async_views.project_list_view, name='api-async-project-list'),
+    path('api/async/projects/<int:pk>/', async_views.project_detail_view, name='api-async-project-detail'),
+    path('api/async/projects/<int:pk>/events/', async_views.project_events_view, name='api-project-events'),
+    path('api/async/tasks/', async_views.task_list_view, name='api-async-task-list'),
+    path('api/async/tasks/<int:pk>/', async_views.task_detail_view, name='api-async-task-detail'),
 
     # Проекты
     path('projects/create/', create_project_view, name='create-project'),
     path('projects/<int:pk>/view/', project_detail_view, name='project-view'),
+    path('projects/<int:pk>/board/<str:status>/', project_board_column_view, name='project-board-column'),
+    path('search/', search_view, name='search'),
     path('projects/<int:pk>/edit/', edit_project_view, name='edit-project'),
     path('projects/<int:pk>/delete/', delete_project_view, name='delete-project'),
     path('projects/<int:project_id>/tasks/all/', project_tasks_view, name='project-tasks'),
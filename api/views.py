@@ -1,3 +1,9 @@
+import hashlib
+import hmac
+import re
+from datetime import timedelta
+from functools import partial
+
 from django.shortcuts import render, redirect, get_object_or_404
 
 # Create your views here.
@@ -5,15 +11,39 @@ from rest_framework import generics, permissions, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.exceptions import PermissionDenied
-
-from .models import Project, ProjectParticipant, Task, Comment, FileAttachment, CustomUser
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.exceptions import APIException, PermissionDenied
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.authtoken.models import Token
+
+from . import events
+from .authentication import CachedTokenAuthentication, token_cache
+from .models import Project, ProjectParticipant, Task, Comment, FileAttachment, CustomUser, DeletedObject, UploadSession, Job
 from .permissions import IsProjectParticipantOrCreator, IsTaskProjectParticipant
+from .membership import (
+    CREATOR, get_project_ids, get_project_role, get_project_roles, is_participant, is_project_member,
+)
+from .exports import EXPORT_COLUMNS, stream_csv, stream_ndjson, streaming_content
+from .imports import IMPORT_KINDS, detect_format, import_rows, read_rows
 from .serializers import (
-    ProjectSerializer, ProjectParticipantSerializer, TaskSerializer,
-    CommentSerializer, FileAttachmentSerializer,
+    ProjectSerializer, ProjectParticipantSerializer, TaskSerializer, TaskBulkItemSerializer,
+    CommentSerializer, FileAttachmentSerializer, UploadSessionSerializer, JobSerializer, DeletedObjectSerializer,
     RegisterSerializer, ChangePasswordSerializer,
 )
+from .fastpath import build_values_plan, render_values
+from .fragments import fragment_stats
+from .metrics import render as render_metrics
+from .deletion import delete_project
+from .downloads import serve_attachment
+from .jobs import enqueue
+from .uploads import (
+    UploadError, abort_upload, attach_file, chunk_max_size, complete_upload, start_upload, write_chunk,
+)
+from .generations import bump_generation
+from .search import filter_tasks_by_text, search_tasks, search_users
+from .pagination import (
+    KeysetPagination, decode_cursor, decode_token, encode_cursor, get_position, keyset_filter, position_from_values,
+)
 from .forms import CustomUserCreationForm, ProjectForm, TaskForm, CommentForm, TaskFileForm, AddParticipantForm
 
 from django.contrib.auth.decorators import login_required
@@ -24,19 +54,129 @@ from django.views.generic.edit import CreateView
 from django.views.decorators.http import require_POST
 
 from django.urls import reverse_lazy
-from django.db.models import Q
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Count, F, Max, Q, Window
+from django.db.models.functions import Coalesce, Greatest, RowNumber
 from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import parse_etags
+from django.utils.functional import SimpleLazyObject
+
+class SparseFieldsMixin:
+    """
+    Применяет ?fields= и ?expand= к запросу списка: only() и select_related().
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+        ordering = getattr(self, 'keyset_ordering', KeysetPagination.ordering)
+        required = [field.lstrip('-') for field in ordering]
+        return self.get_serializer_class().optimize_queryset(queryset, self.request, required)
+
+class FastListMixin:
+    """
+    GET списка без экземпляров моделей и ModelSerializer на каждую строку:
+    запрос через .values(), вывод — заранее подготовленными конвертерами полей
+    (api/fastpath.py). Результат совпадает с обычным сериализатором; при ?expand=
+    используется стандартный путь.
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer()
+        plan = None if serializer.get_expand(request) else build_values_plan(serializer)
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        ordering = getattr(self, 'keyset_ordering', KeysetPagination.ordering)
+        columns = {column for _, column, _ in plan} | {field.lstrip('-') for field in ordering}
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(render_values(page, plan))
+        return Response(render_values(queryset, plan))
+
+def make_etag(model, pk, updated_at):
+    raw = f'{model._meta.label}:{pk}:{updated_at.isoformat()}'
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+def get_etag(instance):
+    """Строгий ETag объекта по его updated_at."""
+    return make_etag(instance, instance.pk, instance.updated_at)
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'Объект был изменён другим пользователем. Загрузите его заново.'
+    default_code = 'precondition_failed'
+
+class PreconditionRequired(APIException):
+    status_code = status.HTTP_428_PRECONDITION_REQUIRED
+    default_detail = 'Изменение требует заголовка If-Match с ETag объекта.'
+    default_code = 'precondition_required'
+
+class ConditionalRequestMixin:
+    """
+    ETag для детальных представлений: If-None-Match на GET отвечает 304
+    без сериализации, If-Match на PUT/PATCH/DELETE — 412 при устаревшей версии.
+    При ETAG_REQUIRE_IF_MATCH изменение без If-Match отклоняется с 428.
+    """
+
+    def check_if_match(self, instance):
+        """
+        Вызывается в транзакции записи. Версия перечитывается из БД под
+        блокировкой строки: instance загружен до транзакции, и два запроса
+        с одним ETag иначе оба прошли бы проверку.
+        """
+        if_match = self.request.headers.get('If-Match')
+        if if_match is None:
+            if getattr(settings, 'ETAG_REQUIRE_IF_MATCH', False):
+                raise PreconditionRequired()
+            return
+        etags = parse_etags(if_match)
+        if '*' in etags:
+            return
+        current = (
+            type(instance)._base_manager.select_for_update().filter(pk=instance.pk)
+            .values_list('updated_at', flat=True).first()
+        )
+        if current is None or make_etag(instance, instance.pk, current) not in etags:
+            raise PreconditionFailed()
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = get_etag(instance)
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in etags or '*' in etags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers={'ETag': etag})
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response['ETag'] = get_etag(self._updated_instance)
+        return response
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            self.check_if_match(serializer.instance)
+            self._updated_instance = serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self.check_if_match(instance)
+            instance.delete()
 
 # Project
-class ProjectListCreateView(generics.ListCreateAPIView):
+class ProjectListCreateView(FastListMixin, SparseFieldsMixin, generics.ListCreateAPIView):
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        created = Project.objects.filter(creator=user)
-        participating = Project.objects.filter(participants__user=user)
-        return (created | participating).distinct()
+        return Project.objects.filter(id__in=get_project_ids(self.request.user))
 
     def perform_create(self, serializer):
         project = serializer.save(creator=self.request.user)
@@ -48,23 +188,25 @@ class ProjectListCreateView(generics.ListCreateAPIView):
             role='lead'
         )
 
-class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProjectDetailView(ConditionalRequestMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [permissions.IsAuthenticated, IsProjectParticipantOrCreator]
 
+    def perform_destroy(self, instance):
+        # Проект только отмечается удалённым, содержимое удаляет фоновая задача
+        with transaction.atomic():
+            self.check_if_match(instance)
+            delete_project(instance)
+
 # Task
-class TaskListCreateView(generics.ListCreateAPIView):
+class TaskListCreateView(FastListMixin, SparseFieldsMixin, generics.ListCreateAPIView):
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        return Task.objects.filter(
-            project__participants__user=user
-        ).distinct() | Task.objects.filter(
-            project__creator=user
-        ).distinct()
+        # Список id проектов берём из кэша членства: запрос идёт по индексу project_id
+        return Task.objects.filter(project_id__in=get_project_ids(self.request.user))
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -74,11 +216,129 @@ class TaskListCreateView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save()
 
-class TaskDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TaskDetailView(ConditionalRequestMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [permissions.IsAuthenticated, IsTaskProjectParticipant]
 
+class TaskBulkView(APIView):
+    """
+    Пакетное создание, частичное изменение и удаление задач.
+
+    Тело запроса: {"create": [{...}], "update": [{"id": 1, ...}], "delete": [1, 2]}.
+    Права и членство исполнителей проверяются несколькими запросами на весь пакет,
+    запись — bulk_create/bulk_update в одной транзакции. Если хотя бы один элемент
+    некорректен, ничего не сохраняется и возвращается 400 с результатами по элементам.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    max_items = 1000
+    batch_size = 500
+
+    @staticmethod
+    def task_id(value):
+        # id из тела запроса: только целое число (bool — тоже int, но не id)
+        return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({"detail": "Тело запроса должно быть объектом."}, status=status.HTTP_400_BAD_REQUEST)
+        creates = request.data.get('create', [])
+        updates = request.data.get('update', [])
+        deletes = request.data.get('delete', [])
+
+        if not all(isinstance(items, list) for items in (creates, updates, deletes)):
+            return Response({"detail": "Поля create, update и delete должны быть списками."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(creates) + len(updates) + len(deletes) > self.max_items:
+            return Response({"detail": f"Не более {self.max_items} элементов за запрос."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        project_ids = get_project_ids(request.user)
+        results = {'create': [], 'update': [], 'delete': []}
+        errors = []
+
+        def fail(kind, index, detail):
+            errors.append(index)
+            results[kind].append({'index': index, 'errors': detail})
+
+        # Существующие задачи для update/delete — одним запросом
+        existing_ids = [item.get('id') for item in updates if isinstance(item, dict)] + deletes
+        existing = Task.objects.in_bulk([pk for pk in map(self.task_id, existing_ids) if pk is not None])
+
+        # 1. Проверка полей и прав на проект
+        new_tasks, changed_tasks, changed_fields = [], [], {'updated_at'}
+        now = timezone.now()
+        for index, item in enumerate(creates):
+            serializer = TaskBulkItemSerializer(data=item)
+            if not serializer.is_valid():
+                fail('create', index, serializer.errors)
+            elif serializer.validated_data['project_id'] not in project_ids:
+                fail('create', index, {'project': ["Вы не являетесь участником проекта."]})
+            else:
+                new_tasks.append((index, Task(**serializer.validated_data)))
+
+        for index, item in enumerate(updates):
+            task = existing.get(self.task_id(item.get('id'))) if isinstance(item, dict) else None
+            if task is None or task.project_id not in project_ids:
+                fail('update', index, {'id': ["Задача не найдена."]})
+                continue
+            serializer = TaskBulkItemSerializer(task, data=item, partial=True)
+            if not serializer.is_valid():
+                fail('update', index, serializer.errors)
+            elif serializer.validated_data.get('project_id', task.project_id) not in project_ids:
+                fail('update', index, {'project': ["Вы не являетесь участником проекта."]})
+            else:
+                for field, value in serializer.validated_data.items():
+                    setattr(task, field, value)
+                # bulk_update не вызывает pre_save, поэтому auto_now выставляем сами
+                task.updated_at = now
+                changed_fields.update(serializer.validated_data)
+                changed_tasks.append((index, task))
+
+        delete_ids = []
+        for index, pk in enumerate(deletes):
+            task = existing.get(self.task_id(pk))
+            if task is None or task.project_id not in project_ids:
+                fail('delete', index, {'id': ["Задача не найдена."]})
+            else:
+                delete_ids.append((index, pk))
+
+        # 2. Исполнители должны состоять в проекте задачи — один запрос на пакет
+        assigned = [(kind, index, task) for kind, items in (('create', new_tasks), ('update', changed_tasks))
+                    for index, task in items if task.assignee_id is not None]
+        participants = set(ProjectParticipant.objects.filter(
+            project_id__in={task.project_id for _, _, task in assigned},
+            user_id__in={task.assignee_id for _, _, task in assigned},
+        ).values_list('project_id', 'user_id')) if assigned else set()
+        for kind, index, task in assigned:
+            if (task.project_id, task.assignee_id) not in participants:
+                fail(kind, index, {'assignee': ["Назначенный пользователь не состоит в проекте."]})
+
+        if errors:
+            for items in results.values():
+                items.sort(key=lambda result: result['index'])
+            return Response(results, status=status.HTTP_400_BAD_REQUEST)
+
+        # 3. Запись всего пакета в одной транзакции
+        with transaction.atomic():
+            Task.objects.bulk_create([task for _, task in new_tasks], batch_size=self.batch_size)
+            if changed_tasks:
+                Task.objects.bulk_update([task for _, task in changed_tasks], list(changed_fields),
+                                         batch_size=self.batch_size)
+            if delete_ids:
+                Task.objects.filter(pk__in=[pk for _, pk in delete_ids]).delete()
+            # Удаление отправляет сигналы само, bulk_create/bulk_update — нет
+            for _, task in new_tasks:
+                events.publish_task(task, created=True)
+            for _, task in changed_tasks:
+                events.publish_task(task)
+            bump_generation(*(task.project_id for _, task in new_tasks + changed_tasks))
+
+        results['create'] = [{'index': index, 'task': TaskSerializer(task).data} for index, task in new_tasks]
+        results['update'] = [{'index': index, 'task': TaskSerializer(task).data} for index, task in changed_tasks]
+        results['delete'] = [{'index': index, 'id': pk} for index, pk in delete_ids]
+        return Response(results, status=status.HTTP_200_OK)
+
 # Comment
 class CommentCreateView(generics.CreateAPIView):
     queryset = Comment.objects.all()
@@ -86,29 +346,145 @@ class CommentCreateView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        serializer.save(author=self.request.user)
 
 # FileAttachment
 class FileUploadView(generics.ListCreateAPIView):
-    queryset = FileAttachment.objects.all()
     serializer_class = FileAttachmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('uploaded_at', 'id')
+
+    def get_queryset(self):
+        return FileAttachment.objects.filter(
+            task__project_id__in=get_project_ids(self.request.user)
+        ).select_related('uploaded_by', 'blob')
+
+    def perform_create(self, serializer):
+        serializer.save(uploaded_by=self.request.user)
+
+class FileDownloadView(APIView):
+    """
+    Скачивание файла задачи участником проекта. Поддерживает Range (докачку),
+    If-None-Match/If-Modified-Since и отдачу через nginx/Apache (api/downloads.py).
+    ?inline=1 — показать в браузере вместо сохранения.
+    """
+    # Сессия — для ссылок на странице задачи
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        attachment = get_object_or_404(FileAttachment.objects.select_related('blob', 'task'), pk=pk)
+        # Чужим файлам — 404, чтобы не раскрывать их существование
+        if not is_project_member(request.user, attachment.task.project_id):
+            raise Http404
+        return serve_attachment(request, attachment, as_attachment=not request.GET.get('inline'))
+
+# Загрузка файла по частям: POST /api/uploads/ -> PUT /api/uploads/<id>/ (части
+# с заголовком Content-Range) -> POST /api/uploads/<id>/complete/
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+def upload_error_response(error):
+    return Response({'detail': str(error), 'received': error.offset}, status=error.status)
+
+class UploadSessionCreateView(generics.CreateAPIView):
+    serializer_class = UploadSessionSerializer
+    # Сессия — для загрузки со страницы задачи
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        data = serializer.validated_data
+        serializer.instance = start_upload(data['task'], self.request.user, data['filename'], data['size'])
+
+class UploadSessionView(APIView):
+    """
+    GET — сколько байт уже принято (для продолжения прерванной загрузки),
+    PUT — очередная часть, DELETE — отмена загрузки.
+    """
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    # Тело PUT читается потоком в write_chunk(), без разбора парсерами
+    parser_classes = []
+
+    def get_session(self, request, pk):
+        return get_object_or_404(UploadSession, pk=pk, uploaded_by=request.user)
+
+    def get(self, request, pk):
+        return Response(UploadSessionSerializer(self.get_session(request, pk)).data)
+
+    def put(self, request, pk):
+        session = self.get_session(request, pk)
+        match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+        if match is None:
+            return Response(
+                {'detail': 'Нужен заголовок Content-Range: bytes <начало>-<конец>/<размер>.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        start, end, total = map(int, match.groups())
+        length = end - start + 1
+        if total != session.size or length <= 0 or int(request.headers.get('Content-Length') or 0) != length:
+            return Response(
+                {'detail': 'Content-Range не совпадает с размером файла или тела запроса.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            write_chunk(session, start, request.stream, length)
+        except UploadError as error:
+            return upload_error_response(error)
+        return Response(UploadSessionSerializer(session).data)
+
+    def delete(self, request, pk):
+        abort_upload(self.get_session(request, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class UploadCompleteView(APIView):
+    """Завершает загрузку: файл прикрепляется к задаче, одинаковое содержимое хранится один раз."""
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        session = get_object_or_404(UploadSession, pk=pk, uploaded_by=request.user)
+        if session.received != session.size:
+            return upload_error_response(UploadError('Файл загружен не полностью.', session.received))
+
+        # Файл больше одной части хэшируется и переносится в хранилище в фоне:
+        # клиент получает 202 и следит за задачей по ссылке из Location
+        if session.size > chunk_max_size():
+            job = enqueue(
+                'uploads.complete', {'session_id': str(session.pk)},
+                dedup_key=f'upload:{session.pk}', user=request.user, priority=10,
+            )
+            data = JobSerializer(job, context={'request': request}).data
+            return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+        try:
+            attachment = complete_upload(session)
+        except UploadError as error:
+            return upload_error_response(error)
+        serializer = FileAttachmentSerializer(attachment, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+class JobDetailView(generics.RetrieveAPIView):
+    """Состояние фоновой задачи, поставленной текущим пользователем."""
+    serializer_class = JobSerializer
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user)
 
 # ProjectParticipant
-class ProjectParticipantListCreateView(generics.ListCreateAPIView):
+class ProjectParticipantListCreateView(SparseFieldsMixin, generics.ListCreateAPIView):
     serializer_class = ProjectParticipantSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('id',)
 
     def get_queryset(self):
         project_id = self.kwargs['project_id']
         project = Project.objects.get(pk=project_id)
 
         # Проверка прав доступа
-        user = self.request.user
-        if not (user == project.creator or ProjectParticipant.objects.filter(project=project, user=user).exists()):
+        if not is_project_member(self.request.user, project):
             raise PermissionDenied("Нет доступа к проекту.")
 
         return ProjectParticipant.objects.filter(project=project)
@@ -167,6 +543,222 @@ class LeaveProjectView(APIView):
         else:
             return Response({"detail": "Вы не являетесь участником проекта."}, status=status.HTTP_400_BAD_REQUEST)
 
+# Выгрузка данных проекта
+class ProjectExportView(APIView):
+    """
+    Потоковая выгрузка задач, комментариев и файлов проекта.
+
+    /export/csv/?type=tasks|comments|files — CSV одного вида объектов,
+    /export/ndjson/ — все три вида, по JSON-объекту на строку.
+    Данные читаются порциями, поэтому память не зависит от размера проекта.
+    """
+    # Сессия — для ссылки со страницы проекта, токен — для скриптов
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+    allowed_roles = {CREATOR, ProjectParticipant.Role.TEACHER, ProjectParticipant.Role.LEAD}
+
+    def get(self, request, project_id, export_format):
+        project = get_object_or_404(Project, pk=project_id)
+        if get_project_role(request.user, project) not in self.allowed_roles:
+            raise PermissionDenied("Выгрузка доступна только руководителям и преподавателям проекта.")
+
+        if export_format == 'csv':
+            kind = request.query_params.get('type', 'tasks')
+            if kind not in EXPORT_COLUMNS:
+                return Response({"detail": "Неизвестный тип выгрузки."}, status=status.HTTP_400_BAD_REQUEST)
+            response = StreamingHttpResponse(
+                streaming_content(request, stream_csv(project, kind)), content_type='text/csv; charset=utf-8',
+            )
+            filename = f'project-{project.pk}-{kind}.csv'
+        elif export_format == 'ndjson':
+            response = StreamingHttpResponse(
+                streaming_content(request, stream_ndjson(project)), content_type='application/x-ndjson',
+            )
+            filename = f'project-{project.pk}.ndjson'
+        else:
+            return Response({"detail": "Поддерживаются форматы csv и ndjson."}, status=status.HTTP_404_NOT_FOUND)
+
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+# Загрузка данных проекта
+class ProjectImportView(APIView):
+    """
+    Импорт задач или участников из CSV/JSONL (multipart: file, kind=tasks|participants).
+    Файл разбирается построчно, ответ — отчёт с ошибками по строкам.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, project_id):
+        project = get_object_or_404(Project, pk=project_id)
+        if project.creator != request.user:
+            raise PermissionDenied("Только автор проекта может импортировать данные.")
+
+        uploaded = request.FILES.get('file')
+        kind = request.data.get('kind', 'tasks')
+        if uploaded is None:
+            return Response({"file": ["Файл не передан."]}, status=status.HTTP_400_BAD_REQUEST)
+        if kind not in IMPORT_KINDS:
+            return Response({"kind": ["Допустимо: tasks или participants."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('format') or detect_format(uploaded.name)
+        if file_format not in ('csv', 'jsonl'):
+            return Response({"format": ["Поддерживаются csv и jsonl."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = import_rows(project, read_rows(uploaded.open('rb'), file_format), kind)
+        return Response(report, status=status.HTTP_200_OK)
+
+# Поиск
+class TaskSearchView(APIView):
+    """
+    Полнотекстовый поиск задач по названию, описанию и комментариям во всех
+    проектах пользователя (или в одном: ?project=<id>). Результаты упорядочены
+    по релевантности; title_highlight и snippet — HTML с совпадениями в <mark>.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 20
+    max_page_size = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"q": ["Укажите поисковый запрос."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        project_ids = get_project_ids(request.user)
+        project = request.query_params.get('project')
+        if project:
+            project_ids = {int(project)} & project_ids if project.isdigit() else set()
+
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', self.page_size)), 1), self.max_page_size)
+        except ValueError:
+            return Response({"detail": "page и page_size должны быть числами."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Лишняя строка показывает, есть ли следующая страница
+        results = search_tasks(query, project_ids, limit=page_size + 1, offset=(page - 1) * page_size)
+        next_link = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            next_link = replace_query_param(request.build_absolute_uri(), 'page', page + 1)
+        return Response({'next': next_link, 'results': results})
+
+class UserAutocompleteView(APIView):
+    """
+    Подсказки пользователей по началу или части username, email и группы
+    для добавления участника в проект ?project=<id>. Доступны только автору
+    проекта — единственному, кто может добавлять участников, — и не включают
+    тех, кто уже участвует в проекте. Не более 20 результатов.
+    """
+    # Сессия — для виджета формы добавления участника
+    authentication_classes = [SessionAuthentication, CachedTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        project = request.query_params.get('project', '')
+        if not project.isdigit() or get_project_role(request.user, int(project)) != CREATOR:
+            raise PermissionDenied('Подсказки доступны только автору проекта.')
+        users = CustomUser.objects.exclude(
+            id__in=ProjectParticipant.objects.filter(project_id=int(project)).values('user_id'),
+        )
+
+        results = search_users(request.query_params.get('q', ''), users)
+        roles = dict(CustomUser.Role.choices)
+        for user in results:
+            user['label'] = f"{user['username']} ({user['group'] or roles.get(user['role'], user['role'])})"
+        return Response({'results': results})
+
+# Синхронизация
+class SyncView(APIView):
+    """
+    Изменения в проектах пользователя с момента ?since=<token>: задачи,
+    комментарии, участники и журнал удалений.
+
+    Каждый вид объектов читается по индексу (updated_at, id) от своей позиции
+    в токене, не более limit строк. Если has_more — клиент сразу запрашивает
+    следующую порцию с since=next. Без since возвращается всё с начала.
+
+    updated_at ставится до фиксации транзакции, поэтому строка может стать
+    видна уже после того, как позиция ушла дальше её времени. Позиция в токене
+    поэтому не продвигается дальше чем на SYNC_OVERLAP секунд назад от текущего
+    времени: изменения последних секунд отдаются повторно при каждом запросе
+    (клиент применяет их идемпотентно), а поздно зафиксированные строки попадают
+    в это окно.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    limit = 500
+
+    def decode_positions(self, token, sources):
+        flat = decode_token(token, 2 * len(sources))
+        if flat is None:
+            return None
+        positions = []
+        for (_, queryset, field, _), index in zip(sources, range(0, len(flat), 2)):
+            pair = flat[index:index + 2]
+            if pair == [None, None]:
+                positions.append(None)
+                continue
+            position = position_from_values(queryset.model, (field, 'id'), pair)
+            if position is None:
+                return None
+            positions.append(position)
+        return positions
+
+    def get_sources(self, user):
+        project_ids = get_project_ids(user)
+        return [
+            ('tasks', Task.objects.filter(project_id__in=project_ids),
+             'updated_at', TaskSerializer),
+            ('comments', Comment.objects.filter(task__project_id__in=project_ids),
+             'updated_at', CommentSerializer),
+            ('participants', ProjectParticipant.objects.filter(project_id__in=project_ids),
+             'updated_at', ProjectParticipantSerializer),
+            # Удаление собственной записи участника и удаление проекта целиком видны и после потери доступа
+            ('deleted', DeletedObject.objects.filter(
+                Q(project_id__in=project_ids)
+                | Q(kind__in=[DeletedObject.Kind.PARTICIPANT, DeletedObject.Kind.PROJECT], user_id=user.pk)
+            ), 'deleted_at', DeletedObjectSerializer),
+        ]
+
+    def get(self, request):
+        sources = self.get_sources(request.user)
+
+        # Токен — позиции (время, id) для каждого вида объектов подряд
+        positions = [None] * len(sources)
+        token = request.query_params.get('since')
+        if token:
+            positions = self.decode_positions(token, sources)
+            if positions is None:
+                return Response({"detail": "Неверный токен синхронизации."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Граница окна повторной выдачи; (время, 0) — перед всеми строками с этим временем
+        settled = [timezone.now() - timedelta(seconds=getattr(settings, 'SYNC_OVERLAP', 30)), 0]
+        data, has_more, next_positions = {}, False, []
+        for (name, queryset, field, serializer_class), position in zip(sources, positions):
+            ordering = (field, 'id')
+            queryset = queryset.order_by(*ordering)
+            if position is not None:
+                queryset = queryset.filter(keyset_filter(ordering, position))
+
+            rows = list(queryset[:self.limit + 1])
+            full = len(rows) > self.limit
+            rows = rows[:self.limit]
+            data[name] = serializer_class(rows, many=True).data
+
+            next_position = position
+            if rows:
+                next_position = min(get_position(rows[-1], ordering), settled)
+                if position is not None:
+                    next_position = max(next_position, position)
+            # Если вся порция внутри окна, позиция не сдвигается: остаток придёт
+            # следующими обычными запросами, а не немедленным повтором того же ответа
+            has_more = has_more or (full and next_position != position)
+            next_positions.append(next_position)
+
+        data['next'] = encode_cursor([value for position in next_positions for value in (position or [None, None])])
+        data['has_more'] = has_more
+        return Response(data)
+
 # Регистрация и смена пароля
 class RegisterView(generics.CreateAPIView):
     queryset = CustomUser.objects.all()
@@ -195,22 +787,89 @@ class ChangePasswordView(generics.UpdateAPIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class TokenLogoutView(APIView):
+    """Выход из API: токен удаляется, сигнал сбрасывает его из кэша аутентификации."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        Token.objects.filter(user=request.user).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class TokenCacheStatsView(APIView):
+    """Счётчики кэша токенов текущего процесса."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(token_cache.stats())
+
+class FragmentCacheStatsView(APIView):
+    """Попадания и промахи кэша фрагментов страниц в текущем процессе."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(fragment_stats.stats())
+
+def metrics_allowed(request):
+    """
+    Доступ к /metrics: сотрудник, Authorization: Bearer <METRICS_TOKEN>
+    или REMOTE_ADDR из METRICS_ALLOWED_IPS.
+    """
+    if request.user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.headers.get('Authorization', '')
+    if token and authorization.startswith('Bearer ') and hmac.compare_digest(
+        authorization[len('Bearer '):].encode(), token.encode(),
+    ):
+        return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+def metrics_view(request):
+    """Метрики всех рабочих процессов в текстовом формате Prometheus (api/metrics.py)."""
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 class UserRegisterView(CreateView):
     model = CustomUser
     form_class = CustomUserCreationForm
     template_name = 'api/register.html'
     success_url = reverse_lazy('login')
 
+def get_dashboard_projects(user, project_ids, today):
+    """
+    Проекты пользователя со сводкой одним запросом: число задач по статусам,
+    просроченные, открытые задачи самого пользователя и время последнего изменения.
+    """
+    open_tasks = ~Q(tasks__status=Task.Status.DONE)
+    return (
+        Project.objects.filter(id__in=project_ids)
+        .only('id', 'title', 'creator_id', 'updated_at')
+        .annotate(
+            todo_count=Count('tasks', filter=Q(tasks__status=Task.Status.TODO)),
+            in_progress_count=Count('tasks', filter=Q(tasks__status=Task.Status.IN_PROGRESS)),
+            done_count=Count('tasks', filter=Q(tasks__status=Task.Status.DONE)),
+            overdue_count=Count('tasks', filter=open_tasks & Q(tasks__due_date__lt=today)),
+            my_open_count=Count('tasks', filter=open_tasks & Q(tasks__assignee=user)),
+            # MAX() в SQLite с NULL даёт NULL, поэтому проект без задач — через Coalesce
+            last_activity=Greatest('updated_at', Coalesce(Max('tasks__updated_at'), 'updated_at')),
+        )
+        .order_by('-last_activity', '-id')
+    )
+
 @login_required
 def dashboard_view(request):
     user = request.user
+    roles = get_project_roles(user)
+    today = timezone.localdate()
 
-    created_projects = Project.objects.filter(creator=user)
-    joined_projects = Project.objects.filter(participants__user=user).exclude(creator=user)
-
+    # Фрагмент кэшируется по пользователю, набору его проектов и их поколениям;
+    # запрос ленивый и выполняется, только если фрагмента нет в кэше
     context = {
-        'created_projects': created_projects,
-        'joined_projects': joined_projects,
+        'projects': get_dashboard_projects(user, roles, today),
+        'project_ids': list(roles),
+        'today': today,
+        'dashboard_cache_timeout': getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 600),
     }
 
     return render(request, 'api/dashboard.html', context)
@@ -255,33 +914,103 @@ def delete_project_view(request, pk):
         return redirect('dashboard')
 
     if request.method == 'POST':
-        project.delete()
+        delete_project(project)
         messages.success(request, 'Проект удалён.')
         return redirect('dashboard')
 
     return render(request, 'api/delete_project.html', {'project': project})
 
+# Канбан-доска
+BOARD_COLUMN_LIMIT = 50
+BOARD_ORDERING = ('created_at', 'id')
+BOARD_HEADINGS = {
+    Task.Status.TODO: '📝 To Do',
+    Task.Status.IN_PROGRESS: '🚧 In Progress',
+    Task.Status.DONE: '✅ Done',
+}
+
+def get_board_queryset(project, limit=BOARD_COLUMN_LIMIT):
+    """
+    Первые limit задач каждого статуса (ROW_NUMBER() в окне по статусу)
+    вместе с исполнителями и полным числом задач колонки (COUNT() в том же окне).
+    """
+    window = {'partition_by': [F('status')]}
+    return (
+        project.tasks.select_related('assignee')
+        .annotate(
+            position=Window(RowNumber(), order_by=[F(field).asc() for field in BOARD_ORDERING], **window),
+            column_total=Window(Count('id'), **window),
+        )
+        .filter(position__lte=limit)
+        .order_by(*BOARD_ORDERING)
+    )
+
+def get_column_queryset(project, status):
+    return project.tasks.select_related('assignee').filter(status=status).order_by(*BOARD_ORDERING)
+
+def get_board(project, limit=BOARD_COLUMN_LIMIT):
+    """
+    Колонки доски одним запросом (get_board_queryset). Остаток колонки
+    догружается по курсору через project_board_column_view.
+    """
+    columns = {
+        status: {'status': status, 'heading': BOARD_HEADINGS[status], 'tasks': [], 'total': 0, 'cursor': None}
+        for status in Task.Status.values
+    }
+    for task in get_board_queryset(project, limit):
+        column = columns[task.status]
+        column['tasks'].append(task)
+        column['total'] = task.column_total
+
+    for column in columns.values():
+        if column['total'] > len(column['tasks']):
+            column['cursor'] = encode_cursor(get_position(column['tasks'][-1], BOARD_ORDERING))
+    return list(columns.values())
+
 @login_required
 def project_detail_view(request, pk):
     project = get_object_or_404(Project, pk=pk)
-    is_participant = project.participants.filter(user=request.user).exists()
 
     # Только участники или создатель могут смотреть
-    if project.creator != request.user and not project.participants.filter(user=request.user).exists():
+    if not is_project_member(request.user, project):
         return redirect('dashboard')
 
-    tasks = Task.objects.filter(project=project)
+    # Id последнего события берём до чтения задач: поток SSE продолжит с него без пропусков
+    last_event_id = events.get_backend().current_id(project.pk)
 
     context = {
         'project': project,
-        'tasks_todo': tasks.filter(status=Task.Status.TODO),
-        'tasks_in_progress': tasks.filter(status=Task.Status.IN_PROGRESS),
-        'tasks_done': tasks.filter(status=Task.Status.DONE),
-        'is_participant': is_participant,
+        'last_event_id': last_event_id,
+        # Доска строится, только если её фрагмента нет в кэше: шаблон вызывает функцию сам
+        'columns': partial(get_board, project),
+        'is_participant': is_participant(request.user, project),
     }
 
     return render(request, 'api/project_detail.html', context)
 
+@login_required
+def project_board_column_view(request, pk, status):
+    """Следующая порция задач колонки доски (HTML-фрагмент для кнопки «Показать ещё»)."""
+    project = get_object_or_404(Project, pk=pk)
+    if not is_project_member(request.user, project) or status not in Task.Status.values:
+        raise Http404
+
+    tasks = get_column_queryset(project, status)
+    position = decode_cursor(request.GET.get('cursor', ''), BOARD_ORDERING, Task)
+    if position is None:
+        raise Http404
+    tasks = list(tasks.filter(keyset_filter(BOARD_ORDERING, position))[:BOARD_COLUMN_LIMIT + 1])
+
+    cursor = None
+    if len(tasks) > BOARD_COLUMN_LIMIT:
+        tasks = tasks[:BOARD_COLUMN_LIMIT]
+        cursor = encode_cursor(get_position(tasks[-1], BOARD_ORDERING))
+
+    return render(request, 'api/partials/board_column.html', {
+        'project': project,
+        'column': {'status': status, 'tasks': tasks, 'cursor': cursor},
+    })
+
 @login_required
 def project_participants_view(request, project_id):
     project = get_object_or_404(Project, pk=project_id)
@@ -307,9 +1036,13 @@ def project_participants_view(request, project_id):
         'form': form
     })
 
+def get_active_task(task_id):
+    """Задача или 404, если её нет или проект отмечен удалённым (delete_project)."""
+    return get_object_or_404(Task.objects.select_related('project'), pk=task_id, project__deleted_at__isnull=True)
+
 @login_required
 def remove_participant_view(request, pk):
-    participant = get_object_or_404(ProjectParticipant, pk=pk)
+    participant = get_object_or_404(ProjectParticipant, pk=pk, project__deleted_at__isnull=True)
 
     # Только автор проекта может удалять
     if participant.project.creator != request.user:
@@ -325,7 +1058,7 @@ def create_task_view(request, project_id):
     form = TaskForm(request.POST or None, user=request.user, project=project)
 
     # Только участники или автор проекта могут создавать задачи
-    if project.creator != request.user and not project.participants.filter(user=request.user).exists():
+    if not is_project_member(request.user, project):
         return redirect('dashboard')
 
     if request.method == 'POST':
@@ -341,7 +1074,7 @@ def create_task_view(request, project_id):
 
 @login_required
 def edit_task_view(request, task_id):
-    task = get_object_or_404(Task, pk=task_id)
+    task = get_active_task(task_id)
     project = task.project
     form = TaskForm(request.POST or None, instance=task, user=request.user, project=project)
 
@@ -351,15 +1084,17 @@ def edit_task_view(request, task_id):
 
     if request.method == 'POST':
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Задача обновлена.')
-            return redirect('project-view', pk=project.pk)
+            with transaction.atomic():
+                saved = form.check_version() and form.save()
+            if saved:
+                messages.success(request, 'Задача обновлена.')
+                return redirect('project-view', pk=project.pk)
 
     return render(request, 'api/edit_task.html', {'form': form, 'task': task})
 
 @login_required
 def delete_task_view(request, task_id):
-    task = get_object_or_404(Task, pk=task_id)
+    task = get_active_task(task_id)
     project = task.project
 
     # Только создатель проекта или исполнитель может удалить задачу
@@ -375,10 +1110,10 @@ def delete_task_view(request, task_id):
 
 @login_required
 def task_detail_view(request, task_id):
-    task = get_object_or_404(Task, pk=task_id)
+    task = get_active_task(task_id)
     project = task.project
 
-    if request.user != project.creator and not project.participants.filter(user=request.user).exists():
+    if not is_project_member(request.user, project):
         return redirect('dashboard')
 
     comment_form = CommentForm()
@@ -398,10 +1133,7 @@ def task_detail_view(request, task_id):
         elif 'file' in request.FILES:
             file_form = TaskFileForm(request.POST, request.FILES)
             if file_form.is_valid():
-                uploaded_file = file_form.save(commit=False)
-                uploaded_file.task = task
-                uploaded_file.uploaded_by = request.user
-                uploaded_file.save()
+                attach_file(task, request.user, file_form.cleaned_data['file'])
                 messages.success(request, 'Файл успешно загружен.')
                 return redirect('task-detail-view', task_id=task.id)
 
@@ -414,12 +1146,13 @@ def task_detail_view(request, task_id):
         'form': comment_form,
         'file_form': file_form,
         'files': files,
+        'upload_chunk_size': chunk_max_size(),
     })
 
 @require_POST
 @login_required
 def update_task_status_view(request, task_id):
-    task = get_object_or_404(Task, pk=task_id)
+    task = get_active_task(task_id)
     project = task.project
 
     # Только автор проекта или исполнитель может менять статус
@@ -434,38 +1167,48 @@ def update_task_status_view(request, task_id):
 
     return redirect('task-detail-view', task_id=task.id)
 
-@login_required
-def project_tasks_view(request, project_id):
-    project = get_object_or_404(Project, pk=project_id)
-
-    # Только участники или создатель проекта
-    if request.user != project.creator and not project.participants.filter(user=request.user).exists():
-        return redirect('dashboard')
-
+def filter_project_tasks(project, query=None, status_filter=None, assignee_id=None):
+    """
+    Задачи проекта с фильтрами страницы project_tasks_view.
+    Используется также командой check_query_plans.
+    """
     tasks = project.tasks.select_related('assignee').all()
 
-    # Поиск по названию
-    query = request.GET.get('q')
+    # Полнотекстовый поиск по названию, описанию и комментариям
     if query:
-        tasks = tasks.filter(title__icontains=query)
+        tasks = filter_tasks_by_text(tasks, query)
 
     # Фильтрация по статусу (через ?status=done и т.п.)
-    status_filter = request.GET.get('status')
     if status_filter in [choice[0] for choice in Task.Status.choices]:
         tasks = tasks.filter(status=status_filter)
 
     # Фильтрация по исполнителю
-    assignee_id = request.GET.get('assignee')
     if assignee_id and assignee_id.isdigit():
         tasks = tasks.filter(assignee__id=assignee_id)
 
+    return tasks
+
+@login_required
+def project_tasks_view(request, project_id):
+    project = get_object_or_404(Project, pk=project_id)
+
+    # Только участники или создатель проекта
+    if not is_project_member(request.user, project):
+        return redirect('dashboard')
+
+    last_event_id = events.get_backend().current_id(project.pk)
+    query = request.GET.get('q')
+    status_filter = request.GET.get('status')
+    assignee_id = request.GET.get('assignee')
+    tasks = filter_project_tasks(project, query, status_filter, assignee_id)
+
     # Участники проекта (для фильтра по исполнителю)
     participants = project.participants.select_related('user').all()
 
-    # Пагинация
+    # Пагинация. Страница считается, только если таблицы нет в кэше фрагментов
     paginator = Paginator(tasks, 10)  # 10 задач на страницу
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = SimpleLazyObject(lambda: paginator.get_page(page_number))
 
     return render(request, 'api/project_tasks.html', {
         'project': project,
@@ -476,4 +1219,31 @@ def project_tasks_view(request, project_id):
         'participants': participants,
         'Task': Task,
         'page_obj': page_obj,
+        'page_number': page_number,
+        'last_event_id': last_event_id,
+    })
+
+@login_required
+def search_view(request):
+    """Поиск задач во всех проектах пользователя."""
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    per_page = 20
+    results = search_tasks(query, get_project_ids(request.user), limit=per_page + 1, offset=(page - 1) * per_page)
+    has_next = len(results) > per_page
+    results = results[:per_page]
+
+    statuses = dict(Task.Status.choices)
+    for result in results:
+        result['status_display'] = statuses.get(result['status'], result['status'])
+
+    return render(request, 'api/search.html', {
+        'query': query,
+        'results': results,
+        'page': page,
+        'has_next': has_next,
     })
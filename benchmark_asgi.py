@@ -0,0 +1,125 @@
+"""
+Сравнение синхронного API под WSGI и асинхронного под ASGI.
+
+Запуск серверов (в отдельных терминалах):
+
+    gunicorn student_project_manager.wsgi -w 4 --threads 8 -b 127.0.0.1:8000
+    uvicorn student_project_manager.asgi:application --workers 4 --port 8001
+
+Затем:
+
+    python benchmark_asgi.py --token <токен> \
+        --wsgi http://127.0.0.1:8000/api/tasks/ \
+        --asgi http://127.0.0.1:8001/api/async/tasks/ \
+        --concurrency 200 --duration 10
+
+Для каждого адреса выводятся запросы в секунду, p50/p99 задержки и число ошибок.
+Клиент написан на asyncio без сторонних зависимостей, соединения keep-alive.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Соединение закрыто сервером')
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def _client(url, token, deadline, latencies, errors):
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    request = (
+        f'GET {path} HTTP/1.1\r\n'
+        f'Host: {parts.netloc}\r\n'
+        f'Authorization: Token {token}\r\n'
+        'Connection: keep-alive\r\n\r\n'
+    ).encode()
+
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError) as exc:
+            errors.append(type(exc).__name__)
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run(url, token, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _client(url, token, deadline, latencies, errors) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def report(name, url, latencies, errors, elapsed):
+    if not latencies:
+        print(f'{name:5} {url}: нет успешных ответов, ошибок {len(errors)}')
+        return
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f'{name:5} {url}\n'
+        f'      запросов/с: {len(latencies) / elapsed:8.1f}   '
+        f'p50: {statistics.median(ordered) * 1000:7.1f} мс   '
+        f'p99: {p99 * 1000:7.1f} мс   ошибок: {len(errors)}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--token', required=True, help='Токен API (api/auth/token/)')
+    parser.add_argument('--wsgi', default='http://127.0.0.1:8000/api/tasks/')
+    parser.add_argument('--asgi', default='http://127.0.0.1:8001/api/async/tasks/')
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+
+    for name, url in (('WSGI', args.wsgi), ('ASGI', args.asgi)):
+        latencies, errors, elapsed = asyncio.run(run(url, args.token, args.concurrency, args.duration))
+        report(name, url, latencies, errors, elapsed)
+
+
+if __name__ == '__main__':
+    main()
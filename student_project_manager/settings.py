@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Первым: в замер попадают запросы сессий и аутентификации (api/instrumentation.py)
+    'api.instrumentation.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,7 +59,8 @@ ROOT_URLCONF = 'student_project_manager.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        'BACKEND': 'api.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'api' / 'templates'],  # или os.path.join(BASE_DIR, 'api', 'templates'),
         'APP_DIRS': True,
         'OPTIONS': {
@@ -76,11 +79,79 @@ WSGI_APPLICATION = 'student_project_manager.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# PRAGMA каждого нового соединения. WAL: читатели не блокируют писателя и не
+# ждут его. synchronous=NORMAL в WAL не теряет целостности, только последние
+# транзакции при отключении питания. mmap_size и cache_size (в КиБ при
+# отрицательном значении) держат горячие страницы в памяти, temp_store —
+# временные таблицы сортировок и группировок.
+SQLITE_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL;'
+    'PRAGMA mmap_size=268435456;'
+    'PRAGMA cache_size=-65536;'
+    'PRAGMA temp_store=MEMORY;'
+)
+# Сколько секунд соединение ждёт блокировку (busy_timeout), прежде чем
+# выдать «database is locked»
+SQLITE_TIMEOUT = 20
+
 DATABASES = {
+    # Запись. BEGIN IMMEDIATE берёт блокировку записи в начале транзакции:
+    # писатели выстраиваются в очередь на busy_timeout, а не получают
+    # «database is locked» при повышении блокировки посреди транзакции.
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_TIMEOUT,
+            'init_command': 'PRAGMA journal_mode=WAL;' + SQLITE_PRAGMAS,
+        },
+    },
+    # Чтение (api/routers.py): тот же файл, соединение только для чтения
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': SQLITE_TIMEOUT,
+            'init_command': SQLITE_PRAGMAS + 'PRAGMA query_only=ON;',
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['api.routers.ReadReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'student-project-manager',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # HTML-фрагменты страниц и поколения проектов (api/fragments.py, api/generations.py).
+    # По умолчанию — в памяти процесса. FRAGMENT_CACHE_DIR включает файловый кэш,
+    # общий для всех рабочих процессов: иначе процесс не узнает об изменениях,
+    # сделанных в соседнем, и будет отдавать устаревшие фрагменты
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['FRAGMENT_CACHE_DIR'],
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    } if os.environ.get('FRAGMENT_CACHE_DIR') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'student-project-manager-fragments',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
 }
 
 
@@ -131,13 +202,108 @@ AUTH_USER_MODEL = 'api.CustomUser'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Загрузка файлов по частям (api/uploads.py). Каталог сессий лучше держать на том же
+# диске, что и MEDIA_ROOT: тогда готовый файл перемещается в хранилище без копирования
+UPLOAD_SESSION_DIR = BASE_DIR / 'upload_sessions'
+UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+# Отдача файлов задач (api/downloads.py): 'python' — FileResponse (os.sendfile через
+# wsgi.file_wrapper), 'x-accel' — nginx, 'x-sendfile' — Apache/lighttpd. Для nginx:
+#   location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+FILE_DOWNLOAD_MODE = 'python'
+FILE_DOWNLOAD_ACCEL_PREFIX = '/protected-media/'
+
+# Очередь фоновых задач (api/jobs.py, manage.py run_jobs)
+JOB_WORKERS = 4
+JOB_POLL_INTERVAL = 1.0
+JOB_VISIBILITY_TIMEOUT = 300
+JOB_MAX_ATTEMPTS = 5
+JOB_RETENTION = 7 * 24 * 60 * 60
+
+# Удаление проекта фоновой задачей (api/deletion.py): строк за транзакцию и пауза между ними, секунд
+PROJECT_PURGE_BATCH_SIZE = 500
+PROJECT_PURGE_PAUSE = 0.05
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Кэш членства пользователей в проектах (api/membership.py). С кэшем в памяти
+# (LocMemCache) изменение сбрасывает запись только в своём процессе, остальные
+# рабочие процессы видят исключение из проекта не позже чем через таймаут.
+# Для немедленного сброса во всех процессах укажите общий кэш (Redis, Memcached)
+MEMBERSHIP_CACHE_ALIAS = 'default'
+MEMBERSHIP_CACHE_TIMEOUT = 10
+
+# Кэш фрагментов страниц ({% fragment %}); инвалидируется поколениями проектов (api/generations.py)
+GENERATION_CACHE_ALIAS = 'fragments'
+FRAGMENT_CACHE_ALIAS = 'fragments'
+FRAGMENT_CACHE_TIMEOUT = 600
+DASHBOARD_CACHE_TIMEOUT = 600
+
+# Кэш токенов API в памяти процесса (api/authentication.py). Удаление токена и
+# сохранение пользователя сбрасывают его только в своём процессе; другие рабочие
+# процессы и изменения через QuerySet.update() ждут истечения таймаута
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TIMEOUT = 30
+
+# События доски проекта (SSE, api/events.py). LocalBackend работает в пределах
+# одного процесса; при нескольких рабочих процессах нужен api.events.DatabaseBackend
+PROJECT_EVENTS_BACKEND = 'api.events.LocalBackend'
+PROJECT_EVENTS_HEARTBEAT = 15
+
+# Изменение проекта или задачи через API без If-Match отклоняется с 428
+# (api/views.py, ConditionalRequestMixin); по умолчанию — разрешено, как раньше
+ETAG_REQUIRE_IF_MATCH = False
+
+# Синхронизация (/api/sync/): сколько секунд изменений отдаётся повторно, чтобы
+# не пропустить строки, зафиксированные позже, чем проставлен их updated_at
+SYNC_OVERLAP = 30
+
+# Стоимость запросов (api/instrumentation.py): бюджет числа SQL-запросов и времени
+# ответа в секундах; для отдельных URL (имя из api/urls.py) — свой бюджет
+REQUEST_QUERY_BUDGET = 50
+REQUEST_TIME_BUDGET = 1.0
+REQUEST_BUDGET_OVERRIDES = {
+    'api-task-bulk': {'queries': 200},
+    'api-project-import': {'time': 30.0},
+}
+
+# Метрики /metrics (api/metrics.py). METRICS_DIR — общий каталог снимков рабочих
+# процессов (очищать при перезапуске); без него /metrics показывает один процесс.
+# Метрики видят сотрудники (is_staff) и запросы с Authorization: Bearer <METRICS_TOKEN>.
+# METRICS_ALLOWED_IPS сверяется с REMOTE_ADDR: за nginx или другим обратным прокси
+# это адрес прокси, и любой внешний запрос пройдёт проверку — адреса указывать,
+# только если Django принимает соединения напрямую
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+METRICS_ALLOWED_IPS = []
+
+# Строки лога api.requests: INFO — каждый запрос, WARNING — только превысившие бюджет
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }
 
 LOGIN_URL = '/login/'
@@ -16,13 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 
+# Файлы из MEDIA_ROOT не раздаются напрямую: доступ к ним проверяет
+# api.views.FileDownloadView (/api/files/<id>/download/)
 urlpatterns = ([
     path('admin/', admin.site.urls),
     path('', include('api.urls'))
 ])
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)